@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     
     # Local apps
@@ -92,6 +93,16 @@ DATABASES = {
 }
 
 
+# Hash de senhas: o primeiro hasher é usado nas senhas novas; as senhas
+# existentes (PBKDF2) são convertidas no próximo login
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,13 +150,23 @@ AUTH_USER_MODEL = 'core.Usuario'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.UsuarioJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
+    # Mesma saída do JSONRenderer/JSONParser; usam o orjson se estiver instalado
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # JWT Configuration
@@ -159,6 +180,27 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Intervalo (segundos) em que cada processo reconfere no banco se o usuário do
+# token continua ativo e com o mesmo perfil; 0 usa apenas as claims do token
+JWT_USUARIO_CACHE_TIMEOUT = 60
+
+# Revogação de refresh tokens (core/revogacao.py): bloom filter por processo
+# dimensionado para CAPACIDADE tokens com TAXA_ERRO de falsos positivos,
+# sincronizado com o banco no máximo a cada SINCRONIZACAO segundos, relendo as
+# revogações dos últimos SOBREPOSICAO segundos (transações que demoram a commitar)
+TOKEN_REVOGACAO_CAPACIDADE = 100000
+TOKEN_REVOGACAO_TAXA_ERRO = 0.01
+TOKEN_REVOGACAO_SINCRONIZACAO = 1
+TOKEN_REVOGACAO_SOBREPOSICAO = 60
+TOKEN_REVOGACAO_LRU = 10000
+
+# Limpeza de tokens expirados: rode `limpar_tokens --loop` (ou o comando em um
+# agendador externo). Com INTERVALO > 0, cada processo que atende requisições
+# também limpa a cada INTERVALO segundos em uma thread própria; LOTE é o
+# tamanho de cada transação
+TOKEN_LIMPEZA_INTERVALO = 0
+TOKEN_LIMPEZA_LOTE = 1000
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -170,3 +212,28 @@ CORS_ALLOW_CREDENTIALS = True
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Importação de CSV em segundo plano (threads por processo) e tempo (segundos)
+# sem progresso após o qual um job em 'processando' é considerado interrompido
+IMPORTACAO_CSV_WORKERS = 2
+IMPORTACAO_CSV_TIMEOUT = 1800
+
+# Dias em que as exclusões de registros ficam disponíveis para a sincronização
+# incremental da fila de validação (ver comando limpar_removidos)
+FILA_VALIDACAO_RETENCAO_DIAS = 30
+
+# Segundos que o `sincronizado_em` da fila de validação recua em relação à
+# leitura, para reentregar linhas de transações que commitam depois dela
+FILA_VALIDACAO_SOBREPOSICAO = 60
+
+# Tempo (segundos) das estatísticas do dashboard em cache; alterações nos
+# registros invalidam o cache antes disso. A invalidação só alcança todos os
+# processos com um cache compartilhado (o LocMemCache padrão é por processo)
+DASHBOARD_CACHE_TIMEOUT = 30
+
+# Login: limite de falhas por email/matrícula e por IP dentro da janela de
+# bloqueio. Os contadores ficam no cache padrão: com o LocMemCache o limite
+# vale por processo (worker); com um cache compartilhado, para todos
+LOGIN_MAX_FALHAS = 5
+LOGIN_MAX_FALHAS_IP = 50
+LOGIN_BLOQUEIO_SEGUNDOS = 900
@@ -0,0 +1,261 @@
+"""
+Benchmark dos índices das listagens e do dashboard
+
+Cria um banco de teste (em memória no SQLite), popula com registros em volume
+e compara o plano de execução e o tempo de cada consulta com e sem os índices
+declarados em Meta.indexes (migração 0004_indices_consultas).
+
+Execute: python benchmark_indices.py [--linhas 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time as clock
+from datetime import date, time, timedelta
+
+import django
+
+# Configura Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Count, Q
+from django.test.utils import (
+    CaptureQueriesContext, setup_test_environment, teardown_test_environment
+)
+
+from core.models import (
+    Usuario, Obra, Equipamento, RegistroEquipamento, RegistroMaoObra, AtividadeEquipe
+)
+from core.views import obras_do_encarregado
+
+MODELOS = [RegistroEquipamento, RegistroMaoObra, AtividadeEquipe]
+
+TOTAL_EQUIPAMENTOS = 1000
+TOTAL_MOTORISTAS = 200
+TOTAL_APONTADORES = 100
+TOTAL_ENCARREGADOS = 50
+TOTAL_OBRAS = 20
+LOTE = 5000
+REPETICOES = 5
+DATA_INICIAL = date(2022, 1, 1)
+
+
+def criar_cadastros():
+    """Cria usuários, obras e equipamentos de apoio"""
+    usuarios = [
+        Usuario(matricula=f'{prefixo}{i:05d}', nome=f'{tipo} {i}', tipo_usuario=tipo)
+        for prefixo, tipo, total in [
+            ('MOT', 'motorista', TOTAL_MOTORISTAS),
+            ('APT', 'apontador', TOTAL_APONTADORES),
+            ('ENC', 'encarregado', TOTAL_ENCARREGADOS),
+        ]
+        for i in range(total)
+    ]
+    Usuario.objects.bulk_create(usuarios)
+
+    Obra.objects.bulk_create([
+        Obra(
+            codigo=f'OBR-{i:03d}', nome=f'Obra {i}', local='BR-101',
+            km_inicial=0, km_final=10,
+            data_inicio=DATA_INICIAL, data_prevista_fim=date(2030, 12, 31)
+        )
+        for i in range(TOTAL_OBRAS)
+    ])
+    obras = list(Obra.objects.values_list('id', flat=True))
+
+    Equipamento.objects.bulk_create([
+        Equipamento(
+            nome=f'Equipamento {i}', tipo='caminhao', modelo='Atego', placa=f'EQP{i:05d}',
+            fabricante='Mercedes', ano=2020, obra_id=obras[i % TOTAL_OBRAS]
+        )
+        for i in range(TOTAL_EQUIPAMENTOS)
+    ])
+
+    return {
+        'motoristas': list(Usuario.objects.filter(tipo_usuario='motorista').values_list('id', flat=True)),
+        'apontadores': list(Usuario.objects.filter(tipo_usuario='apontador').values_list('id', flat=True)),
+        'encarregados': list(Usuario.objects.filter(tipo_usuario='encarregado').values_list('id', flat=True)),
+        'obras': obras,
+        'equipamentos': list(Equipamento.objects.values_list('id', flat=True)),
+    }
+
+
+def popular(modelo, total, fabricar):
+    """Insere `total` linhas em lotes, sem manter todas as instâncias em memória"""
+    inicio = clock.perf_counter()
+    for offset in range(0, total, LOTE):
+        modelo.objects.bulk_create(
+            [fabricar(i) for i in range(offset, min(offset + LOTE, total))],
+            batch_size=LOTE
+        )
+    print(f"  ✅ {total:,} {modelo._meta.verbose_name_plural} em {clock.perf_counter() - inicio:.1f}s")
+
+
+def popular_dados(linhas, ids):
+    equipamentos = ids['equipamentos']
+    motoristas = ids['motoristas']
+    apontadores = ids['apontadores']
+    encarregados = ids['encarregados']
+    obras = ids['obras']
+
+    # Um registro por equipamento/dia (unique_together); ~5% pendentes de validação
+    popular(RegistroEquipamento, linhas, lambda i: RegistroEquipamento(
+        equipamento_id=equipamentos[i % TOTAL_EQUIPAMENTOS],
+        motorista_id=motoristas[i % TOTAL_MOTORISTAS],
+        data=DATA_INICIAL + timedelta(days=i // TOTAL_EQUIPAMENTOS),
+        horimetro_inicial=100, horimetro_final=108,
+        hora_inicio=time(7, 0), hora_fim=time(15, 0),
+        atividade_principal='Transporte', local='Trecho',
+        validado=i % 20 != 0,
+    ))
+
+    popular(RegistroMaoObra, linhas, lambda i: RegistroMaoObra(
+        apontador_id=apontadores[i % TOTAL_APONTADORES],
+        obra_id=obras[i % TOTAL_OBRAS],
+        data=DATA_INICIAL + timedelta(days=i // TOTAL_EQUIPAMENTOS),
+        hora_inicio=time(7, 0), hora_fim=time(17, 0),
+        total_funcionarios=10, local='Trecho',
+        validado=i % 20 != 0,
+    ))
+
+    popular(AtividadeEquipe, linhas, lambda i: AtividadeEquipe(
+        encarregado_id=encarregados[i % TOTAL_ENCARREGADOS],
+        obra_id=obras[i % TOTAL_OBRAS],
+        descricao='Compactação', local='Trecho',
+        data=DATA_INICIAL + timedelta(days=i // TOTAL_EQUIPAMENTOS),
+        hora_inicio=time(7, 0),
+        status=['planejada', 'em_andamento', 'concluida', 'cancelada'][i % 4],
+    ))
+
+
+def consultas(ids):
+    """
+    Consultas com o mesmo formato das views: filtros das listagens e os
+    agregados condicionais (uma consulta por tabela) de DashboardStatsView
+    """
+    motorista = ids['motoristas'][7]
+    apontador = ids['apontadores'][7]
+    encarregado = ids['encarregados'][7]
+    obra = ids['obras'][7]
+    dia = DATA_INICIAL + timedelta(days=300)
+
+    return [
+        ('registros-equipamentos?motorista=', lambda: list(
+            RegistroEquipamento.objects.filter(motorista_id=motorista)[:50])),
+        ('registros-equipamentos?data=', lambda: list(
+            RegistroEquipamento.objects.filter(data=dia)[:50])),
+        ('registros-equipamentos?validado=false', lambda: list(
+            RegistroEquipamento.objects.filter(validado=False)[:50])),
+        ('dashboard motorista', lambda:
+            RegistroEquipamento.objects.filter(motorista_id=motorista).aggregate(
+                registros_hoje=Count('id', filter=Q(data=dia)),
+                registros_pendentes=Count('id', filter=Q(validado=False)),
+                total_registros=Count('id'),
+            )),
+        ('registros-mao-obra?obra=', lambda: list(
+            RegistroMaoObra.objects.filter(obra_id=obra)[:50])),
+        ('registros-mao-obra?validado=false', lambda: list(
+            RegistroMaoObra.objects.filter(validado=False)[:50])),
+        ('dashboard apontador', lambda:
+            RegistroMaoObra.objects.filter(apontador_id=apontador).aggregate(
+                registros_hoje=Count('id', filter=Q(data=dia)),
+                registros_pendentes=Count('id', filter=Q(validado=False)),
+                total_registros=Count('id'),
+            )),
+        ('dashboard encarregado: atividades', lambda:
+            AtividadeEquipe.objects.filter(encarregado_id=encarregado).aggregate(
+                atividades_hoje=Count('id', filter=Q(data=dia)),
+                atividades_pendentes=Count('id', filter=Q(status='planejada')),
+            )),
+        ('dashboard encarregado: registros_validar', lambda:
+            RegistroMaoObra.objects.filter(
+                validado=False,
+                obra__in=obras_do_encarregado(Usuario(pk=encarregado)).order_by().values('id').distinct()
+            ).count()),
+        ('atividades-equipe?status=', lambda: list(
+            AtividadeEquipe.objects.filter(status='planejada')[:50])),
+    ]
+
+
+def plano(executar):
+    """Captura o plano de execução da consulta disparada por `executar`"""
+    with CaptureQueriesContext(connection) as capturadas:
+        executar()
+    sql = capturadas[-1]['sql']
+    prefixo = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefixo + sql)
+        return ' | '.join(str(linha[-1]) for linha in cursor.fetchall())
+
+
+def medir(executar):
+    melhor = None
+    for _ in range(REPETICOES):
+        inicio = clock.perf_counter()
+        executar()
+        duracao = clock.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor * 1000
+
+
+def rodar(ids, titulo):
+    print(f"\n{'='*60}")
+    print(f"📊 {titulo}")
+    print(f"{'='*60}")
+    resultados = {}
+    for nome, executar in consultas(ids):
+        resultados[nome] = (plano(executar), medir(executar))
+        print(f"\n🔎 {nome}")
+        print(f"   plano: {resultados[nome][0]}")
+        print(f"   tempo: {resultados[nome][1]:.2f} ms")
+    return resultados
+
+
+def alterar_indices(criar):
+    with connection.schema_editor() as editor:
+        for modelo in MODELOS:
+            for indice in modelo._meta.indexes:
+                if criar:
+                    editor.add_index(modelo, indice)
+                else:
+                    editor.remove_index(modelo, indice)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=1_000_000, help='Linhas por tabela')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    nome_banco = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"\n🚀 Populando banco de teste ({connection.vendor})...\n")
+        ids = criar_cadastros()
+
+        # Popula sem os índices novos (mais rápido) e mede o cenário anterior
+        alterar_indices(criar=False)
+        popular_dados(args.linhas, ids)
+        connection.cursor().execute('ANALYZE')
+        sem_indices = rodar(ids, 'Sem os índices compostos/parciais')
+
+        alterar_indices(criar=True)
+        connection.cursor().execute('ANALYZE')
+        com_indices = rodar(ids, 'Com os índices compostos/parciais')
+
+        print(f"\n{'='*60}")
+        print("📋 RESUMO")
+        print(f"{'='*60}")
+        for nome in sem_indices:
+            antes, depois = sem_indices[nome][1], com_indices[nome][1]
+            print(f"{nome:<45} {antes:>10.2f} ms → {depois:>8.2f} ms  ({antes / max(depois, 1e-6):.0f}x)")
+    finally:
+        connection.creation.destroy_test_db(nome_banco, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark do renderer/parser JSON da API
+
+Monta páginas reais de RegistroEquipamentoSerializer e DiarioObraSerializer
+em um banco de teste e compara o JSONRenderer/JSONParser do DRF com o
+FastJSONRenderer/FastJSONParser (core/renderers.py, core/parsers.py),
+conferindo que os bytes gerados são idênticos.
+
+Execute: python benchmark_json.py [--pagina 50] [--repeticoes 200]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time as clock
+from datetime import date, time, timedelta
+
+import django
+
+# Configura Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.models import (
+    Usuario, Obra, Equipamento, RegistroEquipamento, AtividadeEquipe, DiarioObra
+)
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from core.serializers import RegistroEquipamentoSerializer, DiarioObraSerializer
+
+DATA_INICIAL = date(2025, 1, 1)
+
+
+def popular(pagina):
+    """Cria registros e diários suficientes para uma página de cada listagem"""
+    motorista = Usuario.objects.create_user(matricula='MOT001', nome='João Motorista', tipo_usuario='motorista')
+    encarregado = Usuario.objects.create_user(matricula='ENC001', nome='José Encarregado', tipo_usuario='encarregado')
+    funcionarios = [
+        Usuario.objects.create_user(matricula=f'FUN{i:03d}', nome=f'Funcionário {i}', tipo_usuario='apontador')
+        for i in range(10)
+    ]
+    obra = Obra.objects.create(
+        codigo='OBR-001', nome='Duplicação BR-101', local='BR-101 km 10 ao km 25',
+        km_inicial=10, km_final=25, data_inicio=DATA_INICIAL, data_prevista_fim=date(2026, 12, 31)
+    )
+    equipamentos = [
+        Equipamento.objects.create(
+            nome=f'Caminhão Basculante {i}', tipo='caminhao', modelo='Atego 2426', placa=f'ABC{i:04d}',
+            fabricante='Mercedes-Benz', ano=2020, obra=obra, motorista_atual=motorista
+        )
+        for i in range(5)
+    ]
+
+    registros = RegistroEquipamento.objects.bulk_create([
+        RegistroEquipamento(
+            equipamento=equipamentos[i % len(equipamentos)], motorista=motorista,
+            data=DATA_INICIAL + timedelta(days=i // len(equipamentos)),
+            horimetro_inicial='1520.5', horimetro_final='1528.7',
+            hora_inicio=time(7, 0), hora_fim=time(16, 30),
+            atividade_principal='Transporte de material', local='Trecho km 12',
+            observacoes='Sem ocorrências', validado=i % 3 == 0
+        )
+        for i in range(pagina * 4)
+    ])
+
+    for i in range(pagina):
+        diario = DiarioObra.objects.create(
+            encarregado=encarregado, obra=obra, data=DATA_INICIAL + timedelta(days=i),
+            total_funcionarios=12, funcionarios_presentes=10, atividades_concluidas=3,
+            condicoes_climaticas='Ensolarado', observacoes='Dia produtivo, frente de serviço liberada'
+        )
+        for j in range(3):
+            atividade = AtividadeEquipe.objects.create(
+                encarregado=encarregado, obra=obra, descricao=f'Compactação de base {j}',
+                local='Trecho km 14', data=diario.data, hora_inicio=time(7, 0), hora_fim=time(17, 0),
+                status='concluida'
+            )
+            atividade.funcionarios.set(funcionarios)
+            diario.atividades.add(atividade)
+        diario.equipamentos.set(registros[i * 4:i * 4 + 4])
+
+
+def paginas(pagina):
+    registros = RegistroEquipamentoSerializer(
+        RegistroEquipamento.objects.com_totais().select_related('equipamento', 'motorista', 'apontador')[:pagina],
+        many=True
+    ).data
+    diarios = DiarioObraSerializer(
+        DiarioObra.objects.select_related('encarregado', 'obra').prefetch_related(
+            Prefetch(
+                'atividades',
+                queryset=AtividadeEquipe.objects.select_related('encarregado', 'obra').prefetch_related('funcionarios')
+            ),
+            Prefetch(
+                'equipamentos',
+                queryset=RegistroEquipamento.objects.select_related('equipamento', 'motorista', 'apontador')
+            )
+        )[:pagina],
+        many=True
+    ).data
+    return [
+        ('registros-equipamentos', {'count': len(registros), 'next': None, 'previous': None, 'results': registros}),
+        ('diarios-obra', {'count': len(diarios), 'next': None, 'previous': None, 'results': diarios}),
+    ]
+
+
+def medir(executar, repeticoes):
+    melhor = None
+    for _ in range(5):
+        inicio = clock.perf_counter()
+        for _ in range(repeticoes):
+            executar()
+        duracao = (clock.perf_counter() - inicio) / repeticoes
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor * 1000
+
+
+def comparar(nome, antes, depois):
+    print(f"   {nome:<10} {antes:>8.3f} ms → {depois:>8.3f} ms  ({antes / max(depois, 1e-9):.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pagina', type=int, default=50, help='Itens por página')
+    parser.add_argument('--repeticoes', type=int, default=200, help='Execuções por medição')
+    args = parser.parse_args()
+
+    backend = 'orjson' if renderers.orjson is not None else 'json (orjson não instalado)'
+    setup_test_environment()
+    nome_banco = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"\n🚀 Populando banco de teste ({connection.vendor})...")
+        popular(args.pagina)
+        print(f"📦 Backend do FastJSONRenderer: {backend}")
+
+        for nome, dados in paginas(args.pagina):
+            padrao = JSONRenderer().render(dados)
+            rapido = FastJSONRenderer().render(dados)
+            assert padrao == rapido, f'{nome}: saída diferente do JSONRenderer'
+            assert JSONParser().parse(io.BytesIO(padrao)) == FastJSONParser().parse(io.BytesIO(padrao))
+
+            print(f"\n🔎 {nome} ({args.pagina} itens, {len(padrao) / 1024:.1f} KiB, bytes idênticos)")
+            comparar('render', medir(lambda: JSONRenderer().render(dados), args.repeticoes),
+                     medir(lambda: FastJSONRenderer().render(dados), args.repeticoes))
+            comparar('parse', medir(lambda: JSONParser().parse(io.BytesIO(padrao)), args.repeticoes),
+                     medir(lambda: FastJSONParser().parse(io.BytesIO(padrao)), args.repeticoes))
+    finally:
+        connection.creation.destroy_test_db(nome_banco, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
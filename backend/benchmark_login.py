@@ -0,0 +1,95 @@
+"""
+Benchmark de logins por segundo (um processo = um núcleo)
+
+Cria usuários com senha em PBKDF2 (como a base atual) em um banco de teste e
+mede POST /api/auth/login em três cenários:
+
+1. Antes: PBKDF2 como hasher preferido
+2. Primeiro login após a mudança: verifica o PBKDF2 e recalcula em scrypt
+3. Logins seguintes: scrypt (ScryptPasswordHasher do Django)
+
+Em todos os cenários o usuário é lido do banco a cada login (core/login.py),
+então a diferença medida vem só do hasher.
+
+Execute: python benchmark_login.py [--usuarios 30]
+"""
+
+import argparse
+import os
+import sys
+import time as clock
+
+import django
+
+# Configura Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+from rest_framework.test import APIClient
+
+from core.models import Usuario
+
+SENHA = 'senha-do-turno-123'
+PBKDF2_PRIMEIRO = ['django.contrib.auth.hashers.PBKDF2PasswordHasher'] + [
+    hasher for hasher in settings.PASSWORD_HASHERS
+    if hasher != 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+]
+
+
+def criar_usuarios(total):
+    senha_pbkdf2 = make_password(SENHA, hasher='pbkdf2_sha256')
+    Usuario.objects.bulk_create([
+        Usuario(matricula=f'MOT{i:05d}', nome=f'Motorista {i}', tipo_usuario='motorista', password=senha_pbkdf2)
+        for i in range(total)
+    ])
+    return list(Usuario.objects.values_list('matricula', flat=True))
+
+
+def rodada(matriculas):
+    """Faz um login por matrícula e retorna logins/segundo"""
+    client = APIClient()
+    inicio = clock.perf_counter()
+    for matricula in matriculas:
+        response = client.post('/api/auth/login', {'matricula': matricula, 'password': SENHA}, format='json')
+        assert response.status_code == 200, response.content
+    return len(matriculas) / (clock.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=30, help='Usuários (logins por rodada)')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    nome_banco = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"\n🚀 Criando {args.usuarios} usuários com senha PBKDF2...")
+        matriculas = criar_usuarios(args.usuarios)
+
+        print(f"\n{'='*60}")
+        print("📊 LOGINS POR SEGUNDO (1 núcleo)")
+        print(f"{'='*60}")
+
+        with override_settings(PASSWORD_HASHERS=PBKDF2_PRIMEIRO):
+            antes = rodada(matriculas)
+        print(f"Antes (PBKDF2):                       {antes:>8.1f} logins/s")
+
+        primeiro = rodada(matriculas)
+        print(f"Primeiro login (PBKDF2 → scrypt):     {primeiro:>8.1f} logins/s")
+
+        depois = rodada(matriculas)
+        print(f"Logins seguintes (scrypt):            {depois:>8.1f} logins/s  ({depois / antes:.1f}x)")
+    finally:
+        connection.creation.destroy_test_db(nome_banco, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark da latência do refresh com a blacklist de tokens crescendo
+
+Preenche as tabelas do token_blacklist em um banco de teste e mede
+POST /api/auth/refresh com a checagem padrão do simplejwt (consulta à tabela)
+e com o filtro em memória de core/revogacao.py.
+
+Execute: python benchmark_tokens.py [--revogados 200000] [--refreshes 200]
+"""
+
+import argparse
+import os
+import sys
+import time as clock
+import uuid
+from datetime import timedelta
+
+import django
+
+# Configura Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.authentication import UsuarioRefreshToken
+from core.models import Usuario
+from core.revogacao import limpar_tokens_expirados, reiniciar_frente
+
+
+def popular(usuario, total, lote=10000):
+    """Tokens revogados: metade já expirada (candidata à limpeza)"""
+    agora = timezone.now()
+    for inicio in range(0, total, lote):
+        tokens = OutstandingToken.objects.bulk_create([
+            OutstandingToken(
+                user=usuario, jti=uuid.uuid4().hex, token='x',
+                expires_at=agora + timedelta(days=-1 if i % 2 else 7)
+            )
+            for i in range(inicio, min(inicio + lote, total))
+        ])
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens])
+
+
+def rodada(usuario, total):
+    """Renova uma cadeia de refresh tokens e retorna a latência média (ms)"""
+    client = APIClient()
+    refresh = str(UsuarioRefreshToken.for_user(usuario))
+    inicio = clock.perf_counter()
+    for _ in range(total):
+        response = client.post('/api/auth/refresh', {'refresh': refresh}, format='json')
+        assert response.status_code == 200, response.content
+        refresh = response.data['refresh']
+    return (clock.perf_counter() - inicio) / total * 1000
+
+
+def medir(usuario, total):
+    original = UsuarioRefreshToken.check_blacklist
+    UsuarioRefreshToken.check_blacklist = RefreshToken.check_blacklist
+    try:
+        padrao = rodada(usuario, total)
+    finally:
+        UsuarioRefreshToken.check_blacklist = original
+    reiniciar_frente()
+    rodada(usuario, 1)
+    return padrao, rodada(usuario, total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--revogados', type=int, default=200000, help='Tokens revogados na tabela')
+    parser.add_argument('--refreshes', type=int, default=200, help='Refreshes por medição')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    nome_banco = connection.creation.create_test_db(verbosity=0)
+    try:
+        usuario = Usuario.objects.create_user(
+            matricula='MOT00001', nome='Motorista', tipo_usuario='motorista', password='senha123'
+        )
+
+        print(f"\n{'='*60}")
+        print("📊 LATÊNCIA MÉDIA DO REFRESH (ms)")
+        print(f"{'='*60}")
+        print(f"{'Revogados':>12} {'Tabela':>10} {'Filtro':>10}")
+
+        padrao, filtro = medir(usuario, args.refreshes)
+        print(f"{BlacklistedToken.objects.count():>12} {padrao:>10.2f} {filtro:>10.2f}")
+
+        print(f"\n🚀 Inserindo {args.revogados} tokens revogados...")
+        popular(usuario, args.revogados)
+        padrao, filtro = medir(usuario, args.refreshes)
+        print(f"{BlacklistedToken.objects.count():>12} {padrao:>10.2f} {filtro:>10.2f}")
+
+        inicio = clock.perf_counter()
+        removidos = limpar_tokens_expirados()
+        print(f"\n🧹 {removidos} tokens expirados removidos em {clock.perf_counter() - inicio:.1f}s")
+        padrao, filtro = medir(usuario, args.refreshes)
+        print(f"{BlacklistedToken.objects.count():>12} {padrao:>10.2f} {filtro:>10.2f}")
+    finally:
+        connection.creation.destroy_test_db(nome_banco, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,8 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
     Usuario, Obra, Equipamento, Contrato, CriterioMedicao,
     CategoriaAtividade, Atividade, RegistroEquipamento,
-    RegistroMaoObra, ServicoExecutado, AtividadeEquipe, DiarioObra
+    RegistroMaoObra, ServicoExecutado, AtividadeEquipe, DiarioObra,
+    ImportacaoCSV, ResumoDiarioEquipamento, ResumoMensalEquipamento
 )
 
 
@@ -176,3 +177,33 @@ class DiarioObraAdmin(admin.ModelAdmin):
     search_fields = ['obra__nome', 'encarregado__nome']
     ordering = ['-data']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(ImportacaoCSV)
+class ImportacaoCSVAdmin(admin.ModelAdmin):
+    """Admin para modelo ImportacaoCSV"""
+    
+    list_display = ['id', 'tipo', 'status', 'usuario', 'linhas_processadas', 'sucesso', 'erros', 'created_at']
+    list_filter = ['status', 'tipo']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'updated_at', 'iniciado_em', 'finalizado_em']
+
+
+@admin.register(ResumoDiarioEquipamento)
+class ResumoDiarioEquipamentoAdmin(admin.ModelAdmin):
+    """Admin para modelo ResumoDiarioEquipamento"""
+    
+    list_display = ['data', 'equipamento', 'obra', 'horas_trabalhadas', 'horimetro_trabalhado', 'total_registros', 'registros_validados']
+    list_filter = ['obra', 'data']
+    ordering = ['-data']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ResumoMensalEquipamento)
+class ResumoMensalEquipamentoAdmin(admin.ModelAdmin):
+    """Admin para modelo ResumoMensalEquipamento"""
+    
+    list_display = ['mes', 'equipamento', 'obra', 'dias', 'horas_trabalhadas', 'horimetro_trabalhado', 'total_registros', 'registros_validados']
+    list_filter = ['obra', 'mes']
+    ordering = ['-mes']
+    readonly_fields = ['updated_at']
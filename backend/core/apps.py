@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+    
+    def ready(self):
+        from django.core.checks import register
+        from django.core.signals import request_started
+        
+        from . import signals
+        from .revogacao import iniciar_limpeza_periodica
+        
+        # Só em `manage.py check --deploy`
+        register(signals.verificar_cache_dashboard, deploy=True)
+        
+        # Limpeza de tokens opcional (TOKEN_LIMPEZA_INTERVALO > 0), iniciada na
+        # primeira requisição de cada processo que atende requisições
+        request_started.connect(iniciar_limpeza_periodica, dispatch_uid='core.limpeza_tokens')
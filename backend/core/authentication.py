@@ -0,0 +1,161 @@
+"""
+Autenticação JWT sem consulta ao banco por requisição
+
+Os tokens emitidos no login/registro (UsuarioRefreshToken) carregam
+tipo_usuario, nome e matrícula. UsuarioJWTAuthentication monta a partir
+dessas claims um usuário leve (UsuarioToken), suficiente para as checagens de
+perfil das views. O modelo completo só é buscado quando a view lê um atributo
+que não está no token (ex.: email) ou chama get_usuario().
+
+Com JWT_USUARIO_CACHE_TIMEOUT > 0, o estado do usuário (ativo, perfil, nome,
+matrícula) é conferido no banco no máximo uma vez por período em cada
+processo, de modo que desativações e mudanças de perfil valem sem esperar o
+token expirar. Com 0, apenas as claims são usadas.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import Usuario
+from .revogacao import registrar_revogacao, token_revogado
+
+CLAIMS_USUARIO = ('tipo_usuario', 'nome', 'matricula')
+CAMPOS_ESTADO = ('is_active',) + CLAIMS_USUARIO
+
+# Estado dos usuários por processo: user_id -> (expira_em, estado)
+_estados = OrderedDict()
+_estados_lock = threading.Lock()
+MAX_ESTADOS = 10000
+
+
+class UsuarioRefreshToken(RefreshToken):
+    """RefreshToken com os dados de perfil do usuário nas claims"""
+
+    @classmethod
+    def for_user(cls, user):
+        # Pula o BlacklistMixin.for_user: ele grava o OutstandingToken antes
+        # das claims de perfil, com uma string diferente da entregue ao cliente
+        token = super(BlacklistMixin, cls).for_user(user)
+        for claim in CLAIMS_USUARIO:
+            token[claim] = getattr(user, claim)
+        OutstandingToken.objects.create(
+            user=user,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token['exp']),
+        )
+        return token
+
+    def check_blacklist(self):
+        # Consulta pelo filtro do processo (core/revogacao.py) em vez da tabela
+        if token_revogado(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        resultado = super().blacklist()
+        registrar_revogacao(self.payload[api_settings.JTI_CLAIM])
+        return resultado
+
+
+class UsuarioToken(TokenUser):
+    """
+    Usuário montado a partir das claims do token
+
+    Atributos que não estão no token são lidos do Usuario completo, carregado
+    do banco no primeiro acesso.
+    """
+
+    @property
+    def is_admin(self):
+        return self.tipo_usuario == 'admin'
+
+    @property
+    def is_apontador(self):
+        return self.tipo_usuario == 'apontador'
+
+    @property
+    def is_encarregado(self):
+        return self.tipo_usuario == 'encarregado'
+
+    @property
+    def is_motorista(self):
+        return self.tipo_usuario == 'motorista'
+
+    @cached_property
+    def usuario(self):
+        return Usuario.objects.get(pk=self.id)
+
+    def __str__(self):
+        return f'{self.nome} ({self.matricula})' if self.matricula else str(self.nome)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.usuario, attr)
+
+
+def get_usuario(user):
+    """Usuario completo para o usuário da requisição (UsuarioToken ou modelo)"""
+    return user.usuario if isinstance(user, UsuarioToken) else user
+
+
+def get_estado_usuario(user_id, timeout):
+    """Campos de CAMPOS_ESTADO do usuário, com cache em memória do processo"""
+    agora = time.monotonic()
+    with _estados_lock:
+        item = _estados.get(user_id)
+        if item and item[0] > agora:
+            _estados.move_to_end(user_id)
+            return item[1]
+
+    estado = Usuario.objects.filter(pk=user_id).values(*CAMPOS_ESTADO).first()
+    with _estados_lock:
+        _estados[user_id] = (agora + timeout, estado)
+        _estados.move_to_end(user_id)
+        while len(_estados) > MAX_ESTADOS:
+            _estados.popitem(last=False)
+    return estado
+
+
+def descartar_estado_usuario(user_id) -> None:
+    with _estados_lock:
+        _estados.pop(user_id, None)
+
+
+class UsuarioJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que monta o usuário a partir das claims do token"""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token sem identificação do usuário')
+
+        # Tokens emitidos antes das claims de perfil usam o caminho padrão
+        if any(claim not in validated_token for claim in CLAIMS_USUARIO):
+            return super().get_user(validated_token)
+
+        user = UsuarioToken(validated_token)
+        timeout = getattr(settings, 'JWT_USUARIO_CACHE_TIMEOUT', 60)
+        if timeout:
+            estado = get_estado_usuario(user.id, timeout)
+            if estado is None:
+                raise AuthenticationFailed('Usuário não encontrado', code='user_not_found')
+            if not estado['is_active']:
+                raise AuthenticationFailed('Usuário inativo', code='user_inactive')
+            # O estado atual prevalece sobre as claims emitidas no login
+            user.__dict__.update(estado)
+        return user
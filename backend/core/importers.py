@@ -1,12 +1,19 @@
 """
 Módulo para importação de dados via CSV
 """
+import codecs
 import csv
 import io
+import tempfile
+import threading
+import zipfile
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Any
-from django.db import transaction
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
 from django.core.exceptions import ValidationError
 
 from .models import (
@@ -14,6 +21,8 @@ from .models import (
     CategoriaAtividade, Atividade, RegistroEquipamento,
     RegistroMaoObra, AtividadeEquipe, DiarioObra
 )
+from .resumos import atualizar_resumos
+from .signals import invalidate_dashboard
 
 
 class CSVImportError(Exception):
@@ -21,38 +30,185 @@ class CSVImportError(Exception):
     pass
 
 
+def _latin1_fallback(error: UnicodeDecodeError):
+    """Decodifica como latin-1 os bytes que não são UTF-8 válido"""
+    return error.object[error.start:error.end].decode('latin-1'), error.end
+
+
+codecs.register_error('latin1_fallback', _latin1_fallback)
+
+
+class ReferenceResolver:
+    """
+    Cache das referências (chaves estrangeiras) usadas durante uma importação.
+    
+    Cada chave é consultada no máximo uma vez, inclusive as que não existem no
+    banco; `prefetch` resolve várias chaves de uma vez com uma consulta `__in`.
+    """
+    
+    LOOKUPS = {
+        'obra': (Obra, 'codigo'),
+        'equipamento': (Equipamento, 'placa'),
+        'usuario': (Usuario, 'matricula'),
+        'usuario_email': (Usuario, 'email'),
+        'categoria': (CategoriaAtividade, 'nome'),
+    }
+    
+    def __init__(self):
+        self.cache: Dict[Tuple[str, Optional[str]], Dict[Any, Any]] = defaultdict(dict)
+        # Entradas criadas dentro da transação corrente
+        self.created: List[Tuple[Tuple[str, Optional[str]], Any]] = []
+    
+    def prefetch(self, kind: str, keys: Iterable[Any], tipo: Optional[str] = None) -> None:
+        """Carrega com uma única consulta as chaves ainda não consultadas"""
+        cache = self.cache[(kind, tipo)]
+        missing = {key for key in keys if key and key not in cache}
+        if not missing:
+            return
+        
+        model, field = self.LOOKUPS[kind]
+        queryset = model.objects.order_by()
+        if tipo:
+            queryset = queryset.filter(tipo_usuario=tipo)
+        
+        found = queryset.in_bulk(missing, field_name=field)
+        for key in missing:
+            cache[key] = found.get(key)
+    
+    def get(self, kind: str, key: Any, tipo: Optional[str] = None) -> Any:
+        """Retorna o objeto da chave (ou None se não existir)"""
+        cache = self.cache[(kind, tipo)]
+        if key not in cache:
+            self.prefetch(kind, [key], tipo)
+        return cache.get(key)
+    
+    def obra(self, codigo: str) -> Optional[Obra]:
+        return self.get('obra', codigo)
+    
+    def equipamento(self, placa: str) -> Optional[Equipamento]:
+        return self.get('equipamento', placa)
+    
+    def usuario(self, matricula: str, tipo: Optional[str] = None) -> Optional[Usuario]:
+        return self.get('usuario', matricula, tipo)
+    
+    def usuario_por_email(self, email: str) -> Optional[Usuario]:
+        return self.get('usuario_email', email)
+    
+    def categoria(self, nome: str) -> CategoriaAtividade:
+        """Busca ou cria a categoria"""
+        categoria = self.get('categoria', nome)
+        if categoria is None:
+            categoria, created = CategoriaAtividade.objects.get_or_create(nome=nome)
+            self.cache[('categoria', None)][nome] = categoria
+            if created:
+                self.created.append((('categoria', None), nome))
+        return categoria
+    
+    def commit(self) -> None:
+        """A transação foi confirmada: os objetos criados passam a valer"""
+        self.created = []
+    
+    def rollback(self) -> None:
+        """A transação foi desfeita: esquece os objetos criados nela"""
+        for cache_key, key in self.created:
+            self.cache[cache_key].pop(key, None)
+        self.created = []
+
+
 class BaseCSVImporter:
     """Classe base para importadores CSV"""
     
     required_fields: List[str] = []
     model = None
     
-    def __init__(self, csv_file):
+    # Bytes lidos do início do arquivo para detectar o encoding
+    sniff_size = 64 * 1024
+    # A cada quantas linhas o progress_callback é chamado
+    progress_interval = 500
+    # Linhas gravadas por transação (1 = uma transação por linha)
+    chunk_size = 500
+    # Colunas com referências a outras tabelas: coluna -> (tipo de lookup, tipo_usuario)
+    references: Dict[str, Tuple[str, Optional[str]]] = {}
+    # Resolve as referências de cada lote com uma consulta por tabela
+    prefetch = True
+    # Linhas por lote na validação (dry_run), que não abre transações
+    dry_run_chunk_size = 5000
+    
+    def __init__(self, csv_file, progress_callback=None, dry_run=False):
         self.csv_file = csv_file
+        self.progress_callback = progress_callback
+        self.dry_run = dry_run
         self.errors = []
         self.success_count = 0
         self.skip_count = 0
+        self.total_count = 0
+        self.bytes_read = 0
+        self.resolver = ReferenceResolver()
     
-    def parse_csv(self) -> List[Dict[str, Any]]:
-        """Parse do arquivo CSV"""
+    def detect_encoding(self) -> str:
+        """Detecta UTF-8 ou latin-1 a partir do início do arquivo"""
+        prefix = self.csv_file.read(self.sniff_size)
+        self.csv_file.seek(0)
+        
         try:
-            # Tenta detectar encoding
-            content = self.csv_file.read()
-            
-            # Tenta UTF-8 primeiro
-            try:
-                decoded = content.decode('utf-8')
-            except UnicodeDecodeError:
-                # Fallback para latin-1
-                decoded = content.decode('latin-1')
-            
-            # Cria StringIO para o csv.DictReader
-            csv_io = io.StringIO(decoded)
-            reader = csv.DictReader(csv_io)
-            
-            return list(reader)
+            # final=False ignora um caractere multibyte cortado no fim do prefixo
+            codecs.getincrementaldecoder('utf-8')().decode(prefix, final=False)
+            return 'utf-8-sig'
+        except UnicodeDecodeError:
+            return 'latin-1'
+    
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        """Lê o CSV de forma incremental, sem carregar o arquivo inteiro na memória"""
+        stream = self.csv_file
+        if not stream.seekable():
+            stream = io.BytesIO(stream.read())
+        self.csv_file = stream
+        
+        try:
+            encoding = self.detect_encoding()
+            raw = getattr(stream, 'file', stream)
+            text = io.TextIOWrapper(
+                raw,
+                encoding=encoding,
+                errors='latin1_fallback',
+                newline=''
+            )
         except Exception as e:
             raise CSVImportError(f"Erro ao ler arquivo CSV: {str(e)}")
+        
+        try:
+            reader = csv.DictReader(text)
+            while True:
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    raise CSVImportError(f"Erro ao ler arquivo CSV: {str(e)}")
+                self.total_count += 1
+                if self.progress_callback and self.total_count % self.progress_interval == 0:
+                    self.bytes_read = raw.tell()
+                    self.progress_callback(self)
+                yield row
+            self.bytes_read = raw.tell()
+        finally:
+            # Evita que o TextIOWrapper feche o arquivo enviado
+            text.detach()
+    
+    def iter_chunks(self, size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+        """Agrupa as linhas em lotes de (número da linha, linha)"""
+        chunk = []
+        for idx, row in enumerate(self.iter_rows(), start=2):  # Linha 2 (1 é o header)
+            chunk.append((idx, row))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def parse_csv(self) -> List[Dict[str, Any]]:
+        """Parse do arquivo CSV"""
+        return list(self.iter_rows())
     
     def validate_row(self, row: Dict[str, Any], row_number: int) -> bool:
         """Valida uma linha do CSV"""
@@ -65,37 +221,129 @@ class BaseCSVImporter:
                 return False
         return True
     
-    def process_row(self, row: Dict[str, Any]) -> Any:
-        """Processa uma linha do CSV - deve ser implementado nas subclasses"""
+    def prefetch_references(self, rows: List[Dict[str, Any]]) -> None:
+        """Pré-carrega no resolver todas as referências das linhas do lote"""
+        for column, (kind, tipo) in self.references.items():
+            self.resolver.prefetch(kind, (row.get(column) for row in rows), tipo)
+    
+    def clean_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Converte e valida a linha sem gravar nada - deve ser implementado nas subclasses.
+        Retorna (lookup, defaults) para o update_or_create.
+        """
         raise NotImplementedError
     
-    def import_data(self) -> Dict[str, Any]:
-        """Importa dados do CSV"""
-        rows = self.parse_csv()
-        
-        for idx, row in enumerate(rows, start=2):  # Linha 2 (1 é o header)
-            if not self.validate_row(row, idx):
-                self.skip_count += 1
-                continue
-            
+    def process_row(self, row: Dict[str, Any], lookup: Dict[str, Any], defaults: Dict[str, Any]) -> Any:
+        """Grava uma linha já convertida por clean_row - deve ser implementado nas subclasses"""
+        raise NotImplementedError
+    
+    def flush_chunk(self) -> None:
+        """Grava, dentro da transação do lote, o que as linhas acumularam"""
+        pass
+    
+    def discard_chunk(self) -> None:
+        """Descarta o que foi acumulado por um lote que falhou"""
+        pass
+    
+    def get_result(self) -> Dict[str, Any]:
+        """Resumo da importação"""
+        return {
+            'success': self.success_count,
+            'errors': len(self.errors),
+            'skipped': self.skip_count,
+            'total': self.total_count,
+            'error_details': self.errors
+        }
+    
+    def clean_chunk(self, chunk: List[Tuple[int, Dict[str, Any]]]) -> List[tuple]:
+        """
+        Converte as linhas do lote fora de qualquer transação. Linhas com erro
+        de formato ou referência inexistente entram direto no relatório.
+        Retorna (número da linha, linha, lookup, defaults) das linhas válidas.
+        """
+        cleaned = []
+        for idx, row in chunk:
             try:
-                with transaction.atomic():
-                    self.process_row(row)
-                    self.success_count += 1
+                cleaned.append((idx, row, *self.clean_row(row)))
             except Exception as e:
                 self.errors.append({
                     'row': idx,
                     'error': str(e)
                 })
                 self.skip_count += 1
+        return cleaned
+    
+    def process_chunk(self, chunk: List[tuple]) -> None:
+        """
+        Grava um lote de linhas já convertidas em uma única transação. Se o
+        banco recusar o lote, ele é dividido ao meio recursivamente até isolar
+        as linhas com erro.
+        """
+        if not chunk:
+            return
         
-        return {
-            'success': self.success_count,
-            'errors': len(self.errors),
-            'skipped': self.skip_count,
-            'total': len(rows),
-            'error_details': self.errors
-        }
+        try:
+            with transaction.atomic():
+                for idx, row, lookup, defaults in chunk:
+                    self.process_row(row, lookup, defaults)
+                self.flush_chunk()
+            self.resolver.commit()
+            self.success_count += len(chunk)
+        except Exception as e:
+            self.discard_chunk()
+            self.resolver.rollback()
+            if len(chunk) == 1:
+                self.errors.append({
+                    'row': chunk[0][0],
+                    'error': str(e)
+                })
+                self.skip_count += 1
+                return
+            
+            middle = len(chunk) // 2
+            self.process_chunk(chunk[:middle])
+            self.process_chunk(chunk[middle:])
+    
+    def validate_data(self) -> Dict[str, Any]:
+        """
+        Valida o CSV sem gravar nada: campos obrigatórios, formatos e referências.
+        As referências de cada lote são resolvidas com uma consulta por tabela.
+        """
+        for chunk in self.iter_chunks(self.dry_run_chunk_size):
+            valid = []
+            for idx, row in chunk:
+                if not self.validate_row(row, idx):
+                    self.skip_count += 1
+                    continue
+                valid.append((idx, row))
+            
+            self.prefetch_references([row for idx, row in valid])
+            self.success_count += len(self.clean_chunk(valid))
+        
+        self.errors.sort(key=lambda error: error['row'])
+        
+        return {**self.get_result(), 'dry_run': True}
+    
+    def import_data(self) -> Dict[str, Any]:
+        """Importa dados do CSV em lotes de `chunk_size` linhas por transação"""
+        if self.dry_run:
+            return self.validate_data()
+        
+        for chunk in self.iter_chunks(self.chunk_size):
+            valid = []
+            for idx, row in chunk:
+                if not self.validate_row(row, idx):
+                    self.skip_count += 1
+                    continue
+                valid.append((idx, row))
+            
+            if self.prefetch:
+                self.prefetch_references([row for idx, row in valid])
+            self.process_chunk(self.clean_chunk(valid))
+        
+        self.errors.sort(key=lambda error: error['row'])
+        
+        return self.get_result()
 
 
 class ObraCSVImporter(BaseCSVImporter):
@@ -108,20 +356,17 @@ class ObraCSVImporter(BaseCSVImporter):
     
     required_fields = ['codigo', 'nome', 'local', 'km_inicial', 'km_final', 'data_inicio', 'data_prevista_fim']
     model = Obra
+    references = {'responsavel_email': ('usuario_email', None)}
     
-    def process_row(self, row: Dict[str, Any]) -> Obra:
+    def clean_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Busca responsável se fornecido
         responsavel = None
         if row.get('responsavel_email'):
-            try:
-                responsavel = Usuario.objects.get(email=row['responsavel_email'])
-            except Usuario.DoesNotExist:
-                pass
-        
-        # Verifica se já existe
-        obra, created = Obra.objects.update_or_create(
-            codigo=row['codigo'],
-            defaults={
+            responsavel = self.resolver.usuario_por_email(row['responsavel_email'])
+        
+        return (
+            {'codigo': row['codigo']},
+            {
                 'nome': row['nome'],
                 'local': row['local'],
                 'km_inicial': Decimal(row['km_inicial'].replace(',', '.')),
@@ -132,6 +377,10 @@ class ObraCSVImporter(BaseCSVImporter):
                 'status': row.get('status', 'planejamento')
             }
         )
+    
+    def process_row(self, row: Dict[str, Any], lookup: Dict[str, Any], defaults: Dict[str, Any]) -> Obra:
+        # Atualiza se o código já existe
+        obra, created = Obra.objects.update_or_create(**lookup, defaults=defaults)
         return obra
 
 
@@ -145,30 +394,25 @@ class EquipamentoCSVImporter(BaseCSVImporter):
     
     required_fields = ['nome', 'tipo', 'modelo', 'placa', 'fabricante', 'ano']
     model = Equipamento
+    references = {
+        'obra_codigo': ('obra', None),
+        'motorista_matricula': ('usuario', 'motorista'),
+    }
     
-    def process_row(self, row: Dict[str, Any]) -> Equipamento:
+    def clean_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Busca obra se fornecido
         obra = None
         if row.get('obra_codigo'):
-            try:
-                obra = Obra.objects.get(codigo=row['obra_codigo'])
-            except Obra.DoesNotExist:
-                pass
+            obra = self.resolver.obra(row['obra_codigo'])
         
         # Busca motorista se fornecido
         motorista = None
         if row.get('motorista_matricula'):
-            try:
-                motorista = Usuario.objects.get(
-                    matricula=row['motorista_matricula'],
-                    tipo_usuario='motorista'
-                )
-            except Usuario.DoesNotExist:
-                pass
+            motorista = self.resolver.usuario(row['motorista_matricula'], 'motorista')
         
-        equipamento, created = Equipamento.objects.update_or_create(
-            placa=row['placa'],
-            defaults={
+        return (
+            {'placa': row['placa']},
+            {
                 'nome': row['nome'],
                 'tipo': row['tipo'],
                 'modelo': row['modelo'],
@@ -180,6 +424,9 @@ class EquipamentoCSVImporter(BaseCSVImporter):
                 'motorista_atual': motorista
             }
         )
+    
+    def process_row(self, row: Dict[str, Any], lookup: Dict[str, Any], defaults: Dict[str, Any]) -> Equipamento:
+        equipamento, created = Equipamento.objects.update_or_create(**lookup, defaults=defaults)
         return equipamento
 
 
@@ -194,7 +441,7 @@ class UsuarioCSVImporter(BaseCSVImporter):
     required_fields = ['nome', 'tipo_usuario', 'funcao']
     model = Usuario
     
-    def process_row(self, row: Dict[str, Any]) -> Usuario:
+    def clean_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Verifica se é admin (precisa email) ou outro (precisa matrícula)
         tipo = row['tipo_usuario']
         
@@ -207,9 +454,9 @@ class UsuarioCSVImporter(BaseCSVImporter):
                 raise ValidationError(f'{tipo} precisa de matrícula')
             lookup = {'matricula': row['matricula']}
         
-        usuario, created = Usuario.objects.update_or_create(
-            **lookup,
-            defaults={
+        return (
+            lookup,
+            {
                 'nome': row['nome'],
                 'email': row.get('email', '') or None,
                 'matricula': row.get('matricula', '') or None,
@@ -220,6 +467,9 @@ class UsuarioCSVImporter(BaseCSVImporter):
                 'cargo': row.get('cargo', ''),
             }
         )
+    
+    def process_row(self, row: Dict[str, Any], lookup: Dict[str, Any], defaults: Dict[str, Any]) -> Usuario:
+        usuario, created = Usuario.objects.update_or_create(**lookup, defaults=defaults)
         
         # Define senha se fornecida e usuário novo
         if created and row.get('password'):
@@ -239,32 +489,38 @@ class AtividadeCSVImporter(BaseCSVImporter):
     
     required_fields = ['codigo', 'descricao', 'unidade', 'preco_unitario', 'obra_codigo']
     model = Atividade
+    references = {
+        'categoria_nome': ('categoria', None),
+        'obra_codigo': ('obra', None),
+    }
     
-    def process_row(self, row: Dict[str, Any]) -> Atividade:
-        # Busca ou cria categoria
-        categoria = None
-        if row.get('categoria_nome'):
-            categoria, _ = CategoriaAtividade.objects.get_or_create(
-                nome=row['categoria_nome']
-            )
-        
+    def clean_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Busca obra
-        try:
-            obra = Obra.objects.get(codigo=row['obra_codigo'])
-        except Obra.DoesNotExist:
+        obra = self.resolver.obra(row['obra_codigo'])
+        if obra is None:
             raise ValidationError(f"Obra {row['obra_codigo']} não encontrada")
         
-        atividade, created = Atividade.objects.update_or_create(
-            codigo=row['codigo'],
-            defaults={
+        return (
+            {'codigo': row['codigo']},
+            {
                 'descricao': row['descricao'],
                 'unidade': row['unidade'],
-                'categoria': categoria,
                 'preco_unitario': Decimal(row['preco_unitario'].replace(',', '.')),
                 'obra': obra,
                 'ativa': row.get('ativa', 'true').lower() == 'true'
             }
         )
+    
+    def process_row(self, row: Dict[str, Any], lookup: Dict[str, Any], defaults: Dict[str, Any]) -> Atividade:
+        # Busca ou cria categoria (não é erro se não existir)
+        categoria = None
+        if row.get('categoria_nome'):
+            categoria = self.resolver.categoria(row['categoria_nome'])
+        
+        atividade, created = Atividade.objects.update_or_create(
+            **lookup,
+            defaults={**defaults, 'categoria': categoria}
+        )
         return atividade
 
 
@@ -282,40 +538,130 @@ class RegistroEquipamentoCSVImporter(BaseCSVImporter):
         'atividade_principal', 'local'
     ]
     model = RegistroEquipamento
+    references = {
+        'equipamento_placa': ('equipamento', None),
+        'motorista_matricula': ('usuario', 'motorista'),
+    }
     
-    def process_row(self, row: Dict[str, Any]) -> RegistroEquipamento:
-        # Busca equipamento
-        try:
-            equipamento = Equipamento.objects.get(placa=row['equipamento_placa'])
-        except Equipamento.DoesNotExist:
+    # Colunas atualizadas quando (equipamento, data) já existe
+    update_fields = [
+        'motorista', 'horimetro_inicial', 'horimetro_final', 'hora_inicio',
+        'hora_fim', 'atividade_principal', 'local', 'observacoes', 'updated_at'
+    ]
+    batch_size = 1000
+    
+    def build_instance(self, row: Dict[str, Any]) -> RegistroEquipamento:
+        """Monta o registro (sem salvar) a partir de uma linha do CSV"""
+        equipamento = self.resolver.equipamento(row['equipamento_placa'])
+        if equipamento is None:
             raise ValidationError(f"Equipamento {row['equipamento_placa']} não encontrado")
         
-        # Busca motorista
-        try:
-            motorista = Usuario.objects.get(
-                matricula=row['motorista_matricula'],
-                tipo_usuario='motorista'
-            )
-        except Usuario.DoesNotExist:
+        motorista = self.resolver.usuario(row['motorista_matricula'], 'motorista')
+        if motorista is None:
             raise ValidationError(f"Motorista {row['motorista_matricula']} não encontrado")
         
-        data = datetime.strptime(row['data'], '%d/%m/%Y').date()
-        
-        registro, created = RegistroEquipamento.objects.update_or_create(
+        return RegistroEquipamento(
             equipamento=equipamento,
-            data=data,
-            defaults={
-                'motorista': motorista,
-                'horimetro_inicial': Decimal(row['horimetro_inicial'].replace(',', '.')),
-                'horimetro_final': Decimal(row['horimetro_final'].replace(',', '.')),
-                'hora_inicio': datetime.strptime(row['hora_inicio'], '%H:%M').time(),
-                'hora_fim': datetime.strptime(row['hora_fim'], '%H:%M').time(),
-                'atividade_principal': row['atividade_principal'],
-                'local': row['local'],
-                'observacoes': row.get('observacoes', '')
-            }
+            motorista=motorista,
+            data=datetime.strptime(row['data'], '%d/%m/%Y').date(),
+            horimetro_inicial=Decimal(row['horimetro_inicial'].replace(',', '.')),
+            horimetro_final=Decimal(row['horimetro_final'].replace(',', '.')),
+            hora_inicio=datetime.strptime(row['hora_inicio'], '%H:%M').time(),
+            hora_fim=datetime.strptime(row['hora_fim'], '%H:%M').time(),
+            atividade_principal=row['atividade_principal'],
+            local=row['local'],
+            observacoes=row.get('observacoes', '')
+        )
+    
+    def get_defaults(self, registro: RegistroEquipamento) -> Dict[str, Any]:
+        return {
+            field: getattr(registro, field)
+            for field in self.update_fields if field != 'updated_at'
+        }
+    
+    def clean_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        registro = self.build_instance(row)
+        return (
+            {'equipamento': registro.equipamento, 'data': registro.data},
+            self.get_defaults(registro)
         )
+    
+    def process_row(self, row: Dict[str, Any], lookup: Dict[str, Any], defaults: Dict[str, Any]) -> RegistroEquipamento:
+        """Grava uma linha; usado quando o lote em massa é recusado pelo banco"""
+        registro, created = RegistroEquipamento.objects.update_or_create(**lookup, defaults=defaults)
         return registro
+    
+    def upsert_batch(self, batch: List[tuple]) -> None:
+        """
+        Grava um lote com um único INSERT ... ON CONFLICT (equipamento, data) DO UPDATE.
+        Se o lote falhar no banco, regrava linha a linha para manter o erro por linha.
+        """
+        # Mesma chave repetida no lote: vale a última linha, como no update_or_create
+        unique = {}
+        for idx, registro in batch:
+            unique[(registro.equipamento_id, registro.data)] = registro
+        
+        try:
+            with transaction.atomic():
+                RegistroEquipamento.objects.bulk_create(
+                    list(unique.values()),
+                    update_conflicts=True,
+                    unique_fields=['equipamento', 'data'],
+                    update_fields=self.update_fields,
+                )
+        except Exception:
+            for idx, registro in batch:
+                try:
+                    with transaction.atomic():
+                        self.process_row(
+                            None,
+                            {'equipamento': registro.equipamento, 'data': registro.data},
+                            self.get_defaults(registro)
+                        )
+                    self.success_count += 1
+                except Exception as e:
+                    self.errors.append({
+                        'row': idx,
+                        'error': str(e)
+                    })
+                    self.skip_count += 1
+            return
+        
+        self.success_count += len(batch)
+        # bulk_create não dispara post_save; o lote já está gravado, então uma
+        # falha aqui não deve levar à regravação linha a linha
+        invalidate_dashboard()
+        atualizar_resumos(unique.keys())
+    
+    def import_data(self) -> Dict[str, Any]:
+        """Importa registros resolvendo referências em bloco e gravando em lotes"""
+        if self.dry_run:
+            return self.validate_data()
+        
+        for chunk in self.iter_chunks(self.batch_size):
+            self.prefetch_references([row for idx, row in chunk])
+            
+            batch = []
+            for idx, row in chunk:
+                if not self.validate_row(row, idx):
+                    self.skip_count += 1
+                    continue
+                
+                try:
+                    batch.append((idx, self.build_instance(row)))
+                except Exception as e:
+                    self.errors.append({
+                        'row': idx,
+                        'error': str(e)
+                    })
+                    self.skip_count += 1
+            
+            if batch:
+                self.upsert_batch(batch)
+        
+        self.errors.sort(key=lambda error: error['row'])
+        
+        return self.get_result()
 
 
 class RegistroMaoObraCSVImporter(BaseCSVImporter):
@@ -333,30 +679,40 @@ class RegistroMaoObraCSVImporter(BaseCSVImporter):
         'total_funcionarios', 'hora_inicio', 'hora_fim', 'local'
     ]
     model = RegistroMaoObra
+    references = {
+        'apontador_matricula': ('usuario', 'apontador'),
+        'obra_codigo': ('obra', None),
+    }
+    
+    def __init__(self, csv_file, progress_callback=None, dry_run=False):
+        super().__init__(csv_file, progress_callback, dry_run)
+        # registro_id -> ids dos funcionários presentes, gravados em flush_chunk
+        self.presencas: Dict[int, set] = {}
+    
+    def prefetch_references(self, rows: List[Dict[str, Any]]) -> None:
+        super().prefetch_references(rows)
+        self.resolver.prefetch('usuario', (
+            matricula
+            for row in rows if row.get('funcionarios_matriculas')
+            for matricula in row['funcionarios_matriculas'].split(';')
+        ))
     
-    def process_row(self, row: Dict[str, Any]) -> RegistroMaoObra:
+    def clean_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Busca apontador
-        try:
-            apontador = Usuario.objects.get(
-                matricula=row['apontador_matricula'],
-                tipo_usuario='apontador'
-            )
-        except Usuario.DoesNotExist:
+        apontador = self.resolver.usuario(row['apontador_matricula'], 'apontador')
+        if apontador is None:
             raise ValidationError(f"Apontador {row['apontador_matricula']} não encontrado")
         
         # Busca obra
-        try:
-            obra = Obra.objects.get(codigo=row['obra_codigo'])
-        except Obra.DoesNotExist:
+        obra = self.resolver.obra(row['obra_codigo'])
+        if obra is None:
             raise ValidationError(f"Obra {row['obra_codigo']} não encontrada")
         
         data = datetime.strptime(row['data'], '%d/%m/%Y').date()
         
-        registro, created = RegistroMaoObra.objects.update_or_create(
-            apontador=apontador,
-            obra=obra,
-            data=data,
-            defaults={
+        return (
+            {'apontador': apontador, 'obra': obra, 'data': data},
+            {
                 'total_funcionarios': int(row['total_funcionarios']),
                 'hora_inicio': datetime.strptime(row['hora_inicio'], '%H:%M').time(),
                 'hora_fim': datetime.strptime(row['hora_fim'], '%H:%M').time(),
@@ -364,14 +720,39 @@ class RegistroMaoObraCSVImporter(BaseCSVImporter):
                 'observacoes': row.get('observacoes', '')
             }
         )
+    
+    def process_row(self, row: Dict[str, Any], lookup: Dict[str, Any], defaults: Dict[str, Any]) -> RegistroMaoObra:
+        registro, created = RegistroMaoObra.objects.update_or_create(**lookup, defaults=defaults)
         
         # Adiciona funcionários presentes
         if row.get('funcionarios_matriculas'):
             matriculas = row['funcionarios_matriculas'].split(';')
-            funcionarios = Usuario.objects.filter(matricula__in=matriculas)
-            registro.funcionarios_presentes.set(funcionarios)
+            funcionarios = {self.resolver.usuario(matricula) for matricula in matriculas}
+            funcionarios.discard(None)
+            # Mesma semântica do .set(): a última linha do registro define a lista
+            self.presencas[registro.pk] = {funcionario.pk for funcionario in funcionarios}
         
         return registro
+    
+    def flush_chunk(self) -> None:
+        """Substitui os funcionários presentes do lote com um DELETE e um INSERT"""
+        if not self.presencas:
+            return
+        
+        Presenca = RegistroMaoObra.funcionarios_presentes.through
+        Presenca.objects.filter(registromaoobra_id__in=self.presencas.keys()).delete()
+        Presenca.objects.bulk_create(
+            [
+                Presenca(registromaoobra_id=registro_id, usuario_id=usuario_id)
+                for registro_id, usuarios in self.presencas.items()
+                for usuario_id in usuarios
+            ],
+            ignore_conflicts=True
+        )
+        self.presencas = {}
+    
+    def discard_chunk(self) -> None:
+        self.presencas = {}
 
 
 class DiarioObraCSVImporter(BaseCSVImporter):
@@ -388,30 +769,27 @@ class DiarioObraCSVImporter(BaseCSVImporter):
         'condicoes_climaticas', 'observacoes'
     ]
     model = DiarioObra
+    references = {
+        'encarregado_matricula': ('usuario', 'encarregado'),
+        'obra_codigo': ('obra', None),
+    }
     
-    def process_row(self, row: Dict[str, Any]) -> DiarioObra:
+    def clean_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Busca encarregado
-        try:
-            encarregado = Usuario.objects.get(
-                matricula=row['encarregado_matricula'],
-                tipo_usuario='encarregado'
-            )
-        except Usuario.DoesNotExist:
+        encarregado = self.resolver.usuario(row['encarregado_matricula'], 'encarregado')
+        if encarregado is None:
             raise ValidationError(f"Encarregado {row['encarregado_matricula']} não encontrado")
         
         # Busca obra
-        try:
-            obra = Obra.objects.get(codigo=row['obra_codigo'])
-        except Obra.DoesNotExist:
+        obra = self.resolver.obra(row['obra_codigo'])
+        if obra is None:
             raise ValidationError(f"Obra {row['obra_codigo']} não encontrada")
         
         data = datetime.strptime(row['data'], '%d/%m/%Y').date()
         
-        diario, created = DiarioObra.objects.update_or_create(
-            encarregado=encarregado,
-            obra=obra,
-            data=data,
-            defaults={
+        return (
+            {'encarregado': encarregado, 'obra': obra, 'data': data},
+            {
                 'total_funcionarios': int(row['total_funcionarios']),
                 'funcionarios_presentes': int(row['funcionarios_presentes']),
                 'atividades_concluidas': int(row.get('atividades_concluidas', 0)),
@@ -420,6 +798,9 @@ class DiarioObraCSVImporter(BaseCSVImporter):
                 'observacoes': row['observacoes']
             }
         )
+    
+    def process_row(self, row: Dict[str, Any], lookup: Dict[str, Any], defaults: Dict[str, Any]) -> DiarioObra:
+        diario, created = DiarioObra.objects.update_or_create(**lookup, defaults=defaults)
         return diario
 
 
@@ -435,8 +816,216 @@ IMPORTERS = {
 }
 
 
+# Tipo de importação de um ZIP com vários CSVs
+MULTIPLO = 'multiplo'
+
+# Tipo de importação que fornece cada lookup do ReferenceResolver
+LOOKUP_TIPOS = {
+    'obra': 'obras',
+    'equipamento': 'equipamentos',
+    'usuario': 'usuarios',
+    'usuario_email': 'usuarios',
+}
+
+
 def get_importer(tipo: str):
     """Retorna o importador para o tipo especificado"""
+    if tipo == MULTIPLO:
+        return MultiCSVImporter
     if tipo not in IMPORTERS:
         raise ValueError(f"Tipo de importação inválido: {tipo}")
     return IMPORTERS[tipo]
+
+
+def get_dependencies(tipo: str) -> set:
+    """Tipos que precisam ser importados antes, segundo as referências do importador"""
+    return {
+        LOOKUP_TIPOS[kind]
+        for kind, _ in IMPORTERS[tipo].references.values()
+        if kind in LOOKUP_TIPOS and LOOKUP_TIPOS[kind] != tipo
+    }
+
+
+def tipo_from_filename(filename: str) -> str:
+    """
+    Identifica o tipo pelo nome do arquivo: `obras.csv`, `exemplo_obras.csv`...
+    Vale o tipo mais longo que termina o nome (registros_equipamentos > equipamentos).
+    """
+    stem = filename.replace('\\', '/').rsplit('/', 1)[-1]
+    if not stem.lower().endswith('.csv'):
+        raise CSVImportError(f"Arquivo {filename} deve ser CSV")
+    stem = stem[:-4]
+    
+    matches = [tipo for tipo in IMPORTERS if stem == tipo or stem.endswith(f'_{tipo}')]
+    if not matches:
+        raise CSVImportError(
+            f"Arquivo {filename} não corresponde a nenhum tipo de importação "
+            f"({', '.join(IMPORTERS)})"
+        )
+    return max(matches, key=len)
+
+
+def bundle_files(files) -> tempfile.SpooledTemporaryFile:
+    """Junta vários CSVs enviados em um único ZIP, validando os nomes"""
+    tipos = set()
+    bundle = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+    with zipfile.ZipFile(bundle, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for uploaded in files:
+            tipo = tipo_from_filename(uploaded.name)
+            if tipo in tipos:
+                raise CSVImportError(f"Mais de um arquivo para o tipo {tipo}")
+            tipos.add(tipo)
+            with archive.open(f'{tipo}.csv', 'w') as entry:
+                for chunk in uploaded.chunks():
+                    entry.write(chunk)
+    bundle.seek(0)
+    return bundle
+
+
+class MultiCSVImporter:
+    """
+    Importa um ZIP com um CSV por tipo (ex.: usuarios.csv, obras.csv, ...).
+    
+    Cada tipo começa assim que os tipos de que depende terminam; tipos
+    independentes entre si (ex.: atividades e diarios_obra) rodam em paralelo.
+    O resultado combina os relatórios de todos os arquivos.
+    """
+    
+    def __init__(self, zip_file, progress_callback=None, max_workers=None):
+        self.zip_file = zip_file
+        self.progress_callback = progress_callback
+        self.max_workers = max_workers or getattr(settings, 'IMPORTACAO_CSV_WORKERS', 2)
+        if connection.vendor == 'sqlite':
+            # SQLite aceita um único escritor por vez: threads só disputariam o lock
+            self.max_workers = 1
+        self.importers: Dict[str, BaseCSVImporter] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.order: List[str] = []
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def list_entries(archive: zipfile.ZipFile) -> Dict[str, zipfile.ZipInfo]:
+        """Mapeia tipo -> entrada do ZIP, validando os nomes dos arquivos"""
+        entries = {}
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                continue
+            tipo = tipo_from_filename(info.filename)
+            if tipo in entries:
+                raise CSVImportError(f"Mais de um arquivo para o tipo {tipo}")
+            entries[tipo] = info
+        
+        if not entries:
+            raise CSVImportError("ZIP não contém arquivos CSV")
+        return entries
+    
+    @classmethod
+    def inspect(cls, zip_file) -> Dict[str, zipfile.ZipInfo]:
+        """Valida o ZIP enviado sem importar nada"""
+        try:
+            with zipfile.ZipFile(zip_file) as archive:
+                return cls.list_entries(archive)
+        except zipfile.BadZipFile:
+            raise CSVImportError("Arquivo ZIP inválido")
+        finally:
+            zip_file.seek(0)
+    
+    @property
+    def total_count(self) -> int:
+        return sum(importer.total_count for importer in self.importers.values())
+    
+    @property
+    def bytes_read(self) -> int:
+        return sum(importer.bytes_read for importer in self.importers.values())
+    
+    @property
+    def success_count(self) -> int:
+        return sum(importer.success_count for importer in self.importers.values())
+    
+    @property
+    def skip_count(self) -> int:
+        return sum(importer.skip_count for importer in self.importers.values())
+    
+    @property
+    def errors(self) -> List[Dict[str, Any]]:
+        return [
+            {'tipo': tipo, **error}
+            for tipo, importer in self.importers.items()
+            for error in importer.errors
+        ]
+    
+    def _report_progress(self, importer) -> None:
+        if self.progress_callback:
+            self.progress_callback(self)
+    
+    def _run(self, tipo: str, filename: str, threaded: bool = False) -> None:
+        """Importa um arquivo do ZIP; erros de leitura ficam no relatório do tipo"""
+        try:
+            result = self.importers[tipo].import_data()
+        except CSVImportError as e:
+            result = {'erro': str(e)}
+        finally:
+            if threaded:
+                close_old_connections()
+        
+        with self.lock:
+            self.results[tipo] = {'arquivo': filename, **result}
+            self.order.append(tipo)
+    
+    def import_data(self) -> Dict[str, Any]:
+        """Importa os arquivos do ZIP respeitando as dependências entre os tipos"""
+        try:
+            archive = zipfile.ZipFile(self.zip_file)
+        except zipfile.BadZipFile:
+            raise CSVImportError("Arquivo ZIP inválido")
+        
+        with archive:
+            entries = self.list_entries(archive)
+            # O ZipFile permite ler várias entradas ao mesmo tempo, inclusive em threads
+            streams = {tipo: archive.open(info) for tipo, info in entries.items()}
+            for tipo, stream in streams.items():
+                self.importers[tipo] = IMPORTERS[tipo](stream, progress_callback=self._report_progress)
+            
+            dependencies = {tipo: get_dependencies(tipo) & entries.keys() for tipo in entries}
+            pending = set(entries)
+            done = set()
+            
+            try:
+                if self.max_workers <= 1:
+                    while pending:
+                        tipo = min(t for t in pending if dependencies[t] <= done)
+                        pending.discard(tipo)
+                        self._run(tipo, entries[tipo].filename)
+                        done.add(tipo)
+                else:
+                    with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='importacao-csv') as pool:
+                        running = {}
+                        while pending or running:
+                            for tipo in sorted(t for t in pending if dependencies[t] <= done):
+                                pending.discard(tipo)
+                                future = pool.submit(self._run, tipo, entries[tipo].filename, True)
+                                running[future] = tipo
+                            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                done.add(running.pop(future))
+                                future.result()
+            finally:
+                for stream in streams.values():
+                    stream.close()
+        
+        return self.get_result()
+    
+    def get_result(self) -> Dict[str, Any]:
+        """Relatório combinado de todos os arquivos"""
+        return {
+            'success': self.success_count,
+            'errors': len(self.errors),
+            'skipped': self.skip_count,
+            'total': self.total_count,
+            'ordem': self.order,
+            'arquivos': {
+                tipo: {key: value for key, value in self.results[tipo].items() if key != 'error_details'}
+                for tipo in self.order
+            },
+            'error_details': self.errors
+        }
@@ -0,0 +1,172 @@
+"""
+Execução de importações de CSV em segundo plano
+
+A fila é a própria tabela ImportacaoCSV: um job é criado como 'pendente' e
+qualquer worker (thread do pool ou o comando `processar_importacoes`) pode
+assumi-lo com um UPDATE condicional, o que garante que cada job rode uma vez.
+
+Um job em 'processando' grava o progresso periodicamente (updated_at). Se o
+worker morrer (reinício do servidor, falta de memória), o job deixa de
+avançar e, passado IMPORTACAO_CSV_TIMEOUT, é marcado como 'erro' por
+fail_stale_jobs().
+
+O arquivo enviado só é necessário durante o processamento: ao terminar (com
+sucesso, erro ou interrompido) ele é apagado do storage e o campo `arquivo`
+fica vazio, para que MEDIA_ROOT/importacoes/ não cresça indefinidamente.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .importers import get_importer
+from .models import ImportacaoCSV
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool de threads compartilhado pelo processo"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMPORTACAO_CSV_WORKERS', 2),
+                thread_name_prefix='importacao-csv'
+            )
+        return _executor
+
+
+def enqueue(job: ImportacaoCSV) -> None:
+    """Agenda o job no pool assim que a transação que o criou for confirmada"""
+    transaction.on_commit(lambda: get_executor().submit(_run_in_thread, job.pk))
+
+
+def _run_in_thread(job_id: int) -> None:
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def claim_job(job_id: int) -> bool:
+    """Marca o job como 'processando' se ainda estiver pendente"""
+    return ImportacaoCSV.objects.filter(pk=job_id, status='pendente').update(
+        status='processando',
+        iniciado_em=timezone.now(),
+        updated_at=timezone.now()
+    ) == 1
+
+
+def descartar_arquivo(job: ImportacaoCSV) -> None:
+    """Apaga o arquivo enviado de um job finalizado e limpa o campo"""
+    if not job.arquivo:
+        return
+    try:
+        job.arquivo.delete(save=False)
+    except OSError:
+        logger.exception('Falha ao apagar o arquivo da importação %s', job.pk)
+        return
+    ImportacaoCSV.objects.filter(pk=job.pk).update(arquivo='')
+
+
+def fail_stale_jobs(queryset=None) -> int:
+    """Marca como 'erro' os jobs em 'processando' sem progresso há IMPORTACAO_CSV_TIMEOUT segundos"""
+    if queryset is None:
+        queryset = ImportacaoCSV.objects.all()
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'IMPORTACAO_CSV_TIMEOUT', 1800))
+    count = 0
+    for job in queryset.filter(status='processando', updated_at__lt=limite).only('pk', 'arquivo'):
+        # Confere de novo o estado: o worker pode ter voltado a gravar progresso
+        if ImportacaoCSV.objects.filter(pk=job.pk, status='processando', updated_at__lt=limite).update(
+            status='erro',
+            mensagem_erro='Importação interrompida: o processamento parou (servidor reiniciado?). Envie o arquivo novamente.',
+            finalizado_em=timezone.now(),
+            updated_at=timezone.now()
+        ):
+            descartar_arquivo(job)
+            count += 1
+    return count
+
+
+class ProgressReporter:
+    """Grava o progresso do importador no job, no máximo uma vez por intervalo"""
+
+    def __init__(self, job_id: int, interval: float = 1.0):
+        self.job_id = job_id
+        self.interval = interval
+        self.last_save = 0.0
+
+    def __call__(self, importer) -> None:
+        now = time.monotonic()
+        if now - self.last_save < self.interval:
+            return
+        self.last_save = now
+        ImportacaoCSV.objects.filter(pk=self.job_id).update(
+            linhas_processadas=importer.total_count,
+            bytes_processados=importer.bytes_read,
+            sucesso=importer.success_count,
+            erros=len(importer.errors),
+            ignorados=importer.skip_count,
+            updated_at=timezone.now()
+        )
+
+
+def run_job(job_id: int) -> bool:
+    """Executa um job pendente; retorna False se outro worker já o assumiu"""
+    if not claim_job(job_id):
+        return False
+
+    job = ImportacaoCSV.objects.get(pk=job_id)
+
+    try:
+        ImporterClass = get_importer(job.tipo)
+        with job.arquivo.open('rb') as arquivo:
+            importer = ImporterClass(arquivo, progress_callback=ProgressReporter(job_id))
+            result = importer.import_data()
+    except Exception as e:
+        logger.exception('Falha na importação %s', job_id)
+        ImportacaoCSV.objects.filter(pk=job_id).update(
+            status='erro',
+            mensagem_erro=str(e),
+            finalizado_em=timezone.now(),
+            updated_at=timezone.now()
+        )
+        descartar_arquivo(job)
+        return True
+
+    ImportacaoCSV.objects.filter(pk=job_id).update(
+        status='concluida',
+        linhas_processadas=result['total'],
+        bytes_processados=job.tamanho_arquivo,
+        sucesso=result['success'],
+        erros=result['errors'],
+        ignorados=result['skipped'],
+        resultado=result,
+        finalizado_em=timezone.now(),
+        updated_at=timezone.now()
+    )
+    descartar_arquivo(job)
+    return True
+
+
+def run_pending_jobs() -> int:
+    """Processa todos os jobs pendentes no processo atual; retorna quantos rodaram"""
+    stale = fail_stale_jobs()
+    if stale:
+        logger.warning('%s importação(ões) interrompida(s) marcada(s) como erro', stale)
+    
+    count = 0
+    for job_id in ImportacaoCSV.objects.filter(status='pendente').order_by('created_at').values_list('pk', flat=True):
+        if run_job(job_id):
+            count += 1
+    return count
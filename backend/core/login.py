@@ -0,0 +1,68 @@
+"""
+Apoio ao login: busca do usuário e limite de tentativas com falha
+
+O usuário é lido do banco a cada tentativa (uma consulta pelo índice de
+email/matrícula), então uma troca de senha ou desativação vale em todos os
+processos na hora.
+
+As falhas são contadas por identificador e por IP no cache padrão; ao
+atingir o limite o login é recusado antes de qualquer consulta ou cálculo de
+hash. Com o LocMemCache (padrão) os contadores são de cada processo: o limite
+vale por worker, o que já limita o custo de hash que cada um aceita. Com um
+cache compartilhado (Redis, Memcached, DatabaseCache) ele passa a ser global.
+"""
+import hashlib
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Usuario
+
+
+def _digest(valor: str) -> str:
+    # Mantém as chaves de cache curtas e sem caracteres inválidos
+    return hashlib.md5(valor.encode('utf-8')).hexdigest()
+
+
+def buscar_usuario(campo: str, valor: str) -> Optional[Usuario]:
+    """Usuário pelo email ou matrícula (None se não existir)"""
+    # Uma consulta indexada; sem cache, a senha e o is_active lidos são sempre os atuais
+    return Usuario.objects.filter(**{campo: valor}).first()
+
+
+# ========== LIMITE DE TENTATIVAS ==========
+
+def _chaves_falhas(identificador: str, ip: Optional[str]):
+    chaves = {'usuario': f'login:falhas:{_digest(identificador.strip().lower())}'}
+    if ip:
+        chaves['ip'] = f'login:falhas:ip:{_digest(ip)}'
+    return chaves
+
+
+def get_bloqueio_segundos() -> int:
+    return getattr(settings, 'LOGIN_BLOQUEIO_SEGUNDOS', 900)
+
+
+def login_bloqueado(identificador: str, ip: Optional[str]) -> bool:
+    chaves = _chaves_falhas(identificador, ip)
+    falhas = cache.get_many(chaves.values())
+    limites = {
+        'usuario': getattr(settings, 'LOGIN_MAX_FALHAS', 5),
+        'ip': getattr(settings, 'LOGIN_MAX_FALHAS_IP', 50),
+    }
+    return any(falhas.get(chave, 0) >= limites[tipo] for tipo, chave in chaves.items())
+
+
+def registrar_falha(identificador: str, ip: Optional[str]) -> None:
+    # A janela conta a partir da primeira falha
+    for chave in _chaves_falhas(identificador, ip).values():
+        if not cache.add(chave, 1, get_bloqueio_segundos()):
+            try:
+                cache.incr(chave)
+            except ValueError:
+                cache.set(chave, 1, get_bloqueio_segundos())
+
+
+def limpar_falhas(identificador: str) -> None:
+    cache.delete(_chaves_falhas(identificador, None)['usuario'])
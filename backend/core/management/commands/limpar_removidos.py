@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import RegistroRemovido
+
+
+class Command(BaseCommand):
+    help = 'Remove os registros de exclusão mais antigos que a retenção da fila de validação'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=None,
+            help='Dias de retenção (padrão: FILA_VALIDACAO_RETENCAO_DIAS)'
+        )
+    
+    def handle(self, *args, **options):
+        dias = options['dias'] or getattr(settings, 'FILA_VALIDACAO_RETENCAO_DIAS', 30)
+        limite = timezone.now() - timedelta(days=dias)
+        total, _ = RegistroRemovido.objects.filter(removido_em__lt=limite).delete()
+        self.stdout.write(self.style.SUCCESS(f'{total} exclusão(ões) antiga(s) removida(s)'))
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.revogacao import limpar_e_recarregar
+
+
+class Command(BaseCommand):
+    help = 'Remove em lotes os refresh tokens expirados (emitidos e revogados)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=getattr(settings, 'TOKEN_LIMPEZA_LOTE', 1000),
+            help='Tokens apagados por transação (padrão: TOKEN_LIMPEZA_LOTE)'
+        )
+        parser.add_argument('--loop', action='store_true', help='Repete a limpeza indefinidamente')
+        parser.add_argument(
+            '--intervalo', type=float, default=6 * 3600, help='Segundos entre limpezas no modo --loop'
+        )
+    
+    def handle(self, *args, **options):
+        while True:
+            total = limpar_e_recarregar(options['lote'])
+            self.stdout.write(self.style.SUCCESS(f'{total} token(s) expirado(s) removido(s)'))
+            
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
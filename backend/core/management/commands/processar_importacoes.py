@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Processa as importações de CSV pendentes (útil como worker separado ou após reiniciar o servidor)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Continua verificando a fila indefinidamente')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos entre verificações no modo --loop')
+    
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending_jobs()
+            if count:
+                self.stdout.write(self.style.SUCCESS(f'{count} importação(ões) processada(s)'))
+            
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.resumos import reconstruir_resumos
+
+
+def parse_data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Data inválida: {valor} (use YYYY-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o resumo diário de equipamentos a partir dos registros (todo o histórico ou um período)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', type=parse_data, help='Primeiro dia a recalcular (YYYY-MM-DD)')
+        parser.add_argument('--fim', type=parse_data, help='Último dia a recalcular (YYYY-MM-DD)')
+    
+    def handle(self, *args, **options):
+        total = reconstruir_resumos(options['inicio'], options['fim'])
+        self.stdout.write(self.style.SUCCESS(f'{total} resumo(s) diário(s) recalculado(s)'))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_categoriaatividade_atividadeequipe_atividade_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoCSV',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50, verbose_name='Tipo')),
+                ('arquivo', models.FileField(upload_to='importacoes/%Y/%m/', verbose_name='Arquivo')),
+                ('tamanho_arquivo', models.BigIntegerField(default=0, verbose_name='Tamanho do Arquivo (bytes)')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Status')),
+                ('linhas_processadas', models.IntegerField(default=0, verbose_name='Linhas Processadas')),
+                ('bytes_processados', models.BigIntegerField(default=0, verbose_name='Bytes Processados')),
+                ('sucesso', models.IntegerField(default=0, verbose_name='Sucesso')),
+                ('erros', models.IntegerField(default=0, verbose_name='Erros')),
+                ('ignorados', models.IntegerField(default=0, verbose_name='Ignorados')),
+                ('resultado', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('mensagem_erro', models.TextField(blank=True, verbose_name='Mensagem de Erro')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('finalizado_em', models.DateTimeField(blank=True, null=True, verbose_name='Finalizado em')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='importacoes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importação de CSV',
+                'verbose_name_plural': 'Importações de CSV',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
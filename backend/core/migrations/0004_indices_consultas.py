@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_importacaocsv'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='atividadeequipe',
+            index=models.Index(fields=['encarregado', 'data', 'hora_inicio'], name='ativeq_encarregado_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='atividadeequipe',
+            index=models.Index(fields=['encarregado', 'status'], name='ativeq_encarregado_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='atividadeequipe',
+            index=models.Index(fields=['obra', 'data', 'hora_inicio'], name='ativeq_obra_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='atividadeequipe',
+            index=models.Index(fields=['status', 'data', 'hora_inicio'], name='ativeq_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroequipamento',
+            index=models.Index(fields=['data', 'created_at'], name='regeq_data_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroequipamento',
+            index=models.Index(fields=['motorista', 'data', 'created_at'], name='regeq_motorista_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroequipamento',
+            index=models.Index(condition=models.Q(('validado', False)), fields=['data', 'created_at'], name='regeq_pendente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroequipamento',
+            index=models.Index(condition=models.Q(('validado', False)), fields=['motorista'], name='regeq_pendente_motorista_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaoobra',
+            index=models.Index(fields=['data', 'created_at'], name='regmo_data_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaoobra',
+            index=models.Index(fields=['obra', 'data', 'created_at'], name='regmo_obra_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaoobra',
+            index=models.Index(fields=['apontador', 'data', 'created_at'], name='regmo_apontador_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaoobra',
+            index=models.Index(condition=models.Q(('validado', False)), fields=['data', 'created_at'], name='regmo_pendente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaoobra',
+            index=models.Index(condition=models.Q(('validado', False)), fields=['apontador'], name='regmo_pendente_apontador_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioEquipamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('horas_trabalhadas', models.FloatField(default=0, verbose_name='Horas Trabalhadas')),
+                ('horimetro_trabalhado', models.DecimalField(decimal_places=1, default=0, max_digits=12, verbose_name='Horímetro Trabalhado')),
+                ('total_registros', models.IntegerField(default=0, verbose_name='Total de Registros')),
+                ('registros_validados', models.IntegerField(default=0, verbose_name='Registros Validados')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_diarios', to='core.equipamento')),
+                ('obra', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumos_equipamentos', to='core.obra')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Equipamento',
+                'verbose_name_plural': 'Resumos Diários de Equipamentos',
+                'ordering': ['-data'],
+                'indexes': [models.Index(fields=['obra', 'data'], name='resumo_obra_data_idx'), models.Index(fields=['data'], name='resumo_data_idx')],
+                'unique_together': {('equipamento', 'data')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_resumodiarioequipamento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroequipamento',
+            index=models.Index(condition=models.Q(('validado', False)), fields=['equipamento', 'updated_at'], name='regeq_fila_validacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroequipamento',
+            index=models.Index(fields=['updated_at'], name='regeq_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaoobra',
+            index=models.Index(condition=models.Q(('validado', False)), fields=['obra', 'updated_at'], name='regmo_fila_validacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registromaoobra',
+            index=models.Index(fields=['updated_at'], name='regmo_updated_idx'),
+        ),
+    ]
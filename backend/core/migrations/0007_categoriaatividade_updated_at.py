@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indices_fila_validacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoriaatividade',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def preencher_mensais(apps, schema_editor):
+    """Consolida os resumos diários já existentes por mês"""
+    ResumoDiarioEquipamento = apps.get_model('core', 'ResumoDiarioEquipamento')
+    ResumoMensalEquipamento = apps.get_model('core', 'ResumoMensalEquipamento')
+    linhas = ResumoDiarioEquipamento.objects.order_by().annotate(mes=TruncMonth('data')).values(
+        'equipamento_id', 'obra_id', 'mes'
+    ).annotate(
+        dias=Count('id'),
+        soma_horas=Sum('horas_trabalhadas'),
+        soma_horimetro=Sum('horimetro_trabalhado'),
+        soma_registros=Sum('total_registros'),
+        soma_validados=Sum('registros_validados'),
+    )
+    ResumoMensalEquipamento.objects.bulk_create([
+        ResumoMensalEquipamento(
+            equipamento_id=linha['equipamento_id'],
+            obra_id=linha['obra_id'],
+            mes=linha['mes'],
+            dias=linha['dias'],
+            horas_trabalhadas=linha['soma_horas'],
+            horimetro_trabalhado=linha['soma_horimetro'],
+            total_registros=linha['soma_registros'],
+            registros_validados=linha['soma_validados'],
+        )
+        for linha in linhas
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_categoriaatividade_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensalEquipamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês')),
+                ('dias', models.IntegerField(default=0, verbose_name='Dias Trabalhados')),
+                ('horas_trabalhadas', models.FloatField(default=0, verbose_name='Horas Trabalhadas')),
+                ('horimetro_trabalhado', models.DecimalField(decimal_places=1, default=0, max_digits=14, verbose_name='Horímetro Trabalhado')),
+                ('total_registros', models.IntegerField(default=0, verbose_name='Total de Registros')),
+                ('registros_validados', models.IntegerField(default=0, verbose_name='Registros Validados')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='core.equipamento')),
+                ('obra', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumos_mensais_equipamentos', to='core.obra')),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal de Equipamento',
+                'verbose_name_plural': 'Resumos Mensais de Equipamentos',
+                'ordering': ['-mes'],
+                'indexes': [models.Index(fields=['obra', 'mes'], name='resumo_mensal_obra_mes_idx'), models.Index(fields=['mes'], name='resumo_mensal_mes_idx')],
+                'unique_together': {('equipamento', 'obra', 'mes')},
+            },
+        ),
+        migrations.RunPython(preencher_mensais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_resumomensalequipamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroRemovido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('equipamento', 'Registro de Equipamento'), ('mao_obra', 'Registro de Mão de Obra')], max_length=20, verbose_name='Tipo')),
+                ('registro_id', models.BigIntegerField(verbose_name='ID do Registro')),
+                ('obra_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID da Obra')),
+                ('removido_em', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Removido em')),
+            ],
+            options={
+                'verbose_name': 'Registro Removido',
+                'verbose_name_plural': 'Registros Removidos',
+                'ordering': ['-removido_em'],
+            },
+        ),
+    ]
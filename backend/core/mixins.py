@@ -0,0 +1,157 @@
+"""
+Mixins para as views genéricas do DRF
+"""
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    GET condicional (ETag / Last-Modified) para listagens e detalhes
+
+    O validador da listagem vem de uma única agregação sobre o queryset já
+    filtrado: quantidade de linhas e maior `updated_at`, incluindo o dos
+    relacionamentos exibidos pelo serializer (`etag_dependencies`). O detalhe
+    usa a mesma agregação restrita ao objeto quando há dependências. Se o
+    cliente envia If-None-Match (ou, só no detalhe, If-Modified-Since) e nada
+    mudou, a resposta é 304 sem consultar nem serializar a página.
+
+    A listagem envia apenas ETag: excluir uma linha não avança o maior
+    `updated_at` das restantes, então Last-Modified não serve de validador.
+    """
+
+    last_modified_field = 'updated_at'
+    # Campos updated_at de relacionamentos cujos dados aparecem na resposta
+    etag_dependencies = []
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        validador, _ = self.get_validador(queryset)
+        # Sem Last-Modified: a quantidade de linhas do ETag é que capta exclusões
+        return self.conditional_response(
+            request, validador, None,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if self.etag_dependencies:
+            # Os relacionamentos exibidos também invalidam o detalhe
+            queryset = type(instance)._default_manager.filter(pk=instance.pk)
+            validador, last_modified = self.get_validador(queryset)
+        else:
+            last_modified = getattr(instance, self.last_modified_field)
+            validador = [last_modified]
+        return self.conditional_response(
+            request, [instance.pk] + validador, last_modified,
+            lambda: Response(self.get_serializer(instance).data)
+        )
+
+    def get_validador(self, queryset):
+        """Quantidade de linhas e maiores updated_at (próprio e das dependências) em uma consulta"""
+        estado = queryset.order_by().aggregate(
+            total=Count('pk'),
+            ultima=Max(self.last_modified_field),
+            **{f'dep_{i}': Max(campo) for i, campo in enumerate(self.etag_dependencies)}
+        )
+        datas = [data for chave, data in estado.items() if chave != 'total' and data]
+        last_modified = max(datas) if datas else None
+
+        validador = [estado['total']] + [estado[chave] for chave in sorted(estado) if chave != 'total']
+        return validador, last_modified
+
+    def conditional_response(self, request, validador, last_modified, build_response):
+        # O ETag depende também da URL (filtros, página) e do formato da resposta
+        chave = '|'.join(
+            [request.get_full_path(), request.accepted_media_type or '']
+            + [str(valor) for valor in validador]
+        )
+        etag = quote_etag(hashlib.md5(chave.encode('utf-8')).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = build_response()
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Permite guardar a resposta, mas sempre revalidando com o servidor
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class SparseQuerysetMixin:
+    """
+    Ajusta o queryset aos campos pedidos em ?fields= / ?expand=
+
+    Trabalha junto com SparseFieldsMixin (core/serializers.py): a partir dos
+    campos que o serializer vai exibir, busca só as colunas necessárias
+    (.only()) e mantém apenas os joins e prefetches usados por esses campos.
+    Sem `fields` o queryset da view é usado como está.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        if getattr(serializer, 'sparse_fields', None) is None:
+            return queryset
+        return self.trim_queryset(queryset, serializer)
+
+    def trim_queryset(self, queryset, serializer):
+        model = queryset.model
+        colunas = {model._meta.pk.name}
+        joins = set()
+        prefetches = set()
+
+        def incluir(caminho):
+            """Registra o que o caminho (ex.: ['obra', 'nome']) exige do banco"""
+            try:
+                campo = model._meta.get_field(caminho[0])
+            except FieldDoesNotExist:
+                return False
+            if campo.many_to_many or campo.one_to_many:
+                prefetches.add(caminho[0])
+            elif campo.is_relation and campo.concrete:
+                colunas.add(caminho[0])
+                if len(caminho) > 1:
+                    joins.add(caminho[0])
+                    colunas.add(f'{caminho[0]}__{caminho[1]}')
+            elif campo.concrete:
+                colunas.add(caminho[0])
+            return True
+
+        dependencias = getattr(serializer, 'sparse_dependencies', {})
+        for nome, campo in serializer.fields.items():
+            if campo.source != '*' and incluir(campo.source_attrs):
+                continue
+            for caminho in dependencias.get(nome, []):
+                incluir(caminho.split('__'))
+
+        # Campos lidos fora do serializer: Last-Modified e cursor da paginação
+        extras = [getattr(self, 'last_modified_field', None)]
+        extras += [campo.lstrip('-') for campo in getattr(self.paginator, 'ordering', None) or []]
+        for campo in filter(None, extras):
+            incluir([campo])
+
+        # Prefetches da view (com seus querysets) para os relacionamentos
+        # pedidos; os demais são descartados
+        lookups = []
+        for lookup in queryset._prefetch_related_lookups:
+            caminho = getattr(lookup, 'prefetch_through', lookup)
+            if caminho.split('__')[0] in prefetches:
+                lookups.append(lookup)
+        cobertos = {getattr(lookup, 'prefetch_through', lookup).split('__')[0] for lookup in lookups}
+        lookups += sorted(prefetches - cobertos)
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        if lookups:
+            queryset = queryset.prefetch_related(*lookups)
+        return queryset.only(*colunas)
@@ -267,6 +267,8 @@ class CategoriaAtividade(models.Model):
     nome = models.CharField('Nome', max_length=100, unique=True)
     descricao = models.TextField('Descrição', blank=True)
     
+    updated_at = models.DateTimeField(auto_now=True)
+    
     class Meta:
         verbose_name = 'Categoria de Atividade'
         verbose_name_plural = 'Categorias de Atividades'
@@ -310,6 +312,27 @@ class Atividade(models.Model):
         return f"{self.codigo} - {self.descricao}"
 
 
+class RegistroEquipamentoQuerySet(models.QuerySet):
+    """QuerySet de RegistroEquipamento com os totais calculados no banco"""
+    
+    def com_totais(self):
+        """
+        Anota `duracao` (hora_fim - hora_inicio) e `horimetro_calculado`
+        (horimetro_final - horimetro_inicial), que passam a ser usados por
+        horas_trabalhadas/horimetro_trabalhado e podem ser filtrados/ordenados
+        """
+        return self.annotate(
+            duracao=models.ExpressionWrapper(
+                models.F('hora_fim') - models.F('hora_inicio'),
+                output_field=models.DurationField()
+            ),
+            horimetro_calculado=models.ExpressionWrapper(
+                models.F('horimetro_final') - models.F('horimetro_inicial'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=1)
+            )
+        )
+
+
 class RegistroEquipamento(models.Model):
     """Registro diário de equipamento (pelo apontador ou motorista)"""
     
@@ -337,11 +360,32 @@ class RegistroEquipamento(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = RegistroEquipamentoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Registro de Equipamento'
         verbose_name_plural = 'Registros de Equipamentos'
         ordering = ['-data', '-created_at']
         unique_together = ['equipamento', 'data']
+        # O filtro por equipamento já é atendido pelo índice do unique_together
+        indexes = [
+            models.Index(fields=['data', 'created_at'], name='regeq_data_created_idx'),
+            models.Index(fields=['motorista', 'data', 'created_at'], name='regeq_motorista_data_idx'),
+            models.Index(
+                fields=['data', 'created_at'], name='regeq_pendente_data_idx',
+                condition=models.Q(validado=False)
+            ),
+            models.Index(
+                fields=['motorista'], name='regeq_pendente_motorista_idx',
+                condition=models.Q(validado=False)
+            ),
+            # Fila de validação (pendentes por equipamento/obra) e sincronização incremental
+            models.Index(
+                fields=['equipamento', 'updated_at'], name='regeq_fila_validacao_idx',
+                condition=models.Q(validado=False)
+            ),
+            models.Index(fields=['updated_at'], name='regeq_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.equipamento.nome} - {self.data}"
@@ -349,6 +393,8 @@ class RegistroEquipamento(models.Model):
     @property
     def horas_trabalhadas(self):
         """Calcula horas trabalhadas"""
+        if hasattr(self, 'duracao'):
+            return self.duracao.total_seconds() / 3600
         from datetime import datetime, timedelta
         inicio = datetime.combine(datetime.today(), self.hora_inicio)
         fim = datetime.combine(datetime.today(), self.hora_fim)
@@ -358,6 +404,10 @@ class RegistroEquipamento(models.Model):
     @property
     def horimetro_trabalhado(self):
         """Calcula horímetro trabalhado"""
+        if hasattr(self, 'horimetro_calculado'):
+            # No SQLite a subtração é feita em ponto flutuante; volta à
+            # precisão dos campos (uma casa decimal)
+            return float(round(self.horimetro_calculado, 1))
         return float(self.horimetro_final - self.horimetro_inicial)
 
 
@@ -389,6 +439,25 @@ class RegistroMaoObra(models.Model):
         verbose_name = 'Registro de Mão de Obra'
         verbose_name_plural = 'Registros de Mão de Obra'
         ordering = ['-data', '-created_at']
+        indexes = [
+            models.Index(fields=['data', 'created_at'], name='regmo_data_created_idx'),
+            models.Index(fields=['obra', 'data', 'created_at'], name='regmo_obra_data_idx'),
+            models.Index(fields=['apontador', 'data', 'created_at'], name='regmo_apontador_data_idx'),
+            models.Index(
+                fields=['data', 'created_at'], name='regmo_pendente_data_idx',
+                condition=models.Q(validado=False)
+            ),
+            models.Index(
+                fields=['apontador'], name='regmo_pendente_apontador_idx',
+                condition=models.Q(validado=False)
+            ),
+            # Fila de validação (pendentes por obra) e sincronização incremental
+            models.Index(
+                fields=['obra', 'updated_at'], name='regmo_fila_validacao_idx',
+                condition=models.Q(validado=False)
+            ),
+            models.Index(fields=['updated_at'], name='regmo_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Mão de Obra - {self.data}"
@@ -440,6 +509,12 @@ class AtividadeEquipe(models.Model):
         verbose_name = 'Atividade da Equipe'
         verbose_name_plural = 'Atividades da Equipe'
         ordering = ['-data', '-hora_inicio']
+        indexes = [
+            models.Index(fields=['encarregado', 'data', 'hora_inicio'], name='ativeq_encarregado_data_idx'),
+            models.Index(fields=['encarregado', 'status'], name='ativeq_encarregado_status_idx'),
+            models.Index(fields=['obra', 'data', 'hora_inicio'], name='ativeq_obra_data_idx'),
+            models.Index(fields=['status', 'data', 'hora_inicio'], name='ativeq_status_data_idx'),
+        ]
     
     def __str__(self):
         return f"{self.descricao} - {self.data}"
@@ -480,3 +555,166 @@ class DiarioObra(models.Model):
     
     def __str__(self):
         return f"RDO - {self.obra.codigo} - {self.data}"
+
+
+class ImportacaoCSV(models.Model):
+    """Importação de CSV executada em segundo plano"""
+    
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    ]
+    
+    tipo = models.CharField('Tipo', max_length=50)
+    arquivo = models.FileField('Arquivo', upload_to='importacoes/%Y/%m/')
+    tamanho_arquivo = models.BigIntegerField('Tamanho do Arquivo (bytes)', default=0)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, related_name='importacoes')
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pendente')
+    
+    # Progresso
+    linhas_processadas = models.IntegerField('Linhas Processadas', default=0)
+    bytes_processados = models.BigIntegerField('Bytes Processados', default=0)
+    sucesso = models.IntegerField('Sucesso', default=0)
+    erros = models.IntegerField('Erros', default=0)
+    ignorados = models.IntegerField('Ignorados', default=0)
+    
+    # Resultado
+    resultado = models.JSONField('Resultado', null=True, blank=True)
+    mensagem_erro = models.TextField('Mensagem de Erro', blank=True)
+    
+    iniciado_em = models.DateTimeField('Iniciado em', null=True, blank=True)
+    finalizado_em = models.DateTimeField('Finalizado em', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Importação de CSV'
+        verbose_name_plural = 'Importações de CSV'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Importação {self.tipo} #{self.pk} ({self.get_status_display()})"
+    
+    @property
+    def progresso(self):
+        """Fração do arquivo já lida (0 a 1)"""
+        if self.status == 'concluida':
+            return 1.0
+        if not self.tamanho_arquivo:
+            return 0.0
+        return min(self.bytes_processados / self.tamanho_arquivo, 1.0)
+    
+    @property
+    def eta_segundos(self):
+        """Estimativa de segundos restantes, baseada na velocidade de leitura do arquivo"""
+        if self.status != 'processando' or not self.iniciado_em:
+            return None
+        progresso = self.progresso
+        if progresso <= 0:
+            return None
+        decorrido = (timezone.now() - self.iniciado_em).total_seconds()
+        return round(decorrido * (1 - progresso) / progresso, 1)
+
+
+class ResumoDiarioEquipamento(models.Model):
+    """
+    Consolidado diário de uso de equipamento (equipamento × obra × dia)
+    
+    Mantido a partir de RegistroEquipamento (ver core/resumos.py) para que
+    relatórios de horas e horímetro não precisem carregar cada registro.
+    A obra é a do equipamento no momento em que o resumo foi calculado.
+    
+    A chave é a mesma do registro (equipamento, data): cada linha guarda as
+    horas já calculadas e só as colunas numéricas. Serve as consultas por dia
+    e é a base do ResumoMensalEquipamento, que é quem reduz o volume lido.
+    """
+    
+    equipamento = models.ForeignKey(Equipamento, on_delete=models.CASCADE, related_name='resumos_diarios')
+    obra = models.ForeignKey(Obra, on_delete=models.SET_NULL, null=True, blank=True, related_name='resumos_equipamentos')
+    data = models.DateField('Data')
+    
+    horas_trabalhadas = models.FloatField('Horas Trabalhadas', default=0)
+    horimetro_trabalhado = models.DecimalField('Horímetro Trabalhado', max_digits=12, decimal_places=1, default=0)
+    total_registros = models.IntegerField('Total de Registros', default=0)
+    registros_validados = models.IntegerField('Registros Validados', default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Resumo Diário de Equipamento'
+        verbose_name_plural = 'Resumos Diários de Equipamentos'
+        ordering = ['-data']
+        unique_together = ['equipamento', 'data']
+        indexes = [
+            models.Index(fields=['obra', 'data'], name='resumo_obra_data_idx'),
+            models.Index(fields=['data'], name='resumo_data_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Resumo {self.equipamento_id} - {self.data}"
+
+
+class ResumoMensalEquipamento(models.Model):
+    """
+    Consolidado mensal de uso de equipamento (equipamento × obra × mês)
+    
+    Recalculado a partir de ResumoDiarioEquipamento para os meses afetados
+    (ver core/resumos.py). Relatórios de períodos com meses inteiros leem
+    uma linha por equipamento/obra/mês em vez de uma por dia.
+    """
+    
+    equipamento = models.ForeignKey(Equipamento, on_delete=models.CASCADE, related_name='resumos_mensais')
+    obra = models.ForeignKey(Obra, on_delete=models.SET_NULL, null=True, blank=True, related_name='resumos_mensais_equipamentos')
+    mes = models.DateField('Mês')  # Primeiro dia do mês
+    
+    dias = models.IntegerField('Dias Trabalhados', default=0)
+    horas_trabalhadas = models.FloatField('Horas Trabalhadas', default=0)
+    horimetro_trabalhado = models.DecimalField('Horímetro Trabalhado', max_digits=14, decimal_places=1, default=0)
+    total_registros = models.IntegerField('Total de Registros', default=0)
+    registros_validados = models.IntegerField('Registros Validados', default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Resumo Mensal de Equipamento'
+        verbose_name_plural = 'Resumos Mensais de Equipamentos'
+        ordering = ['-mes']
+        unique_together = ['equipamento', 'obra', 'mes']
+        indexes = [
+            models.Index(fields=['obra', 'mes'], name='resumo_mensal_obra_mes_idx'),
+            models.Index(fields=['mes'], name='resumo_mensal_mes_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Resumo {self.equipamento_id} - {self.mes:%m/%Y}"
+
+
+class RegistroRemovido(models.Model):
+    """
+    Registro de equipamento ou de mão de obra excluído
+    
+    Permite que a fila de validação (GET /api/validacoes/pendentes?since=)
+    informe exclusões aos clientes que sincronizam de forma incremental.
+    Gravado pelos signals de exclusão; mantido por FILA_VALIDACAO_RETENCAO_DIAS.
+    """
+    
+    TIPO_CHOICES = [
+        ('equipamento', 'Registro de Equipamento'),
+        ('mao_obra', 'Registro de Mão de Obra'),
+    ]
+    
+    tipo = models.CharField('Tipo', max_length=20, choices=TIPO_CHOICES)
+    registro_id = models.BigIntegerField('ID do Registro')
+    # Sem chave estrangeira: a obra pode ser excluída depois
+    obra_id = models.BigIntegerField('ID da Obra', null=True, blank=True)
+    removido_em = models.DateTimeField('Removido em', auto_now_add=True, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Registro Removido'
+        verbose_name_plural = 'Registros Removidos'
+        ordering = ['-removido_em']
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.registro_id} removido"
@@ -0,0 +1,42 @@
+"""
+Parser JSON da API
+
+Usa o orjson quando instalado e o corpo está em UTF-8. Qualquer corpo que o
+orjson recuse é repassado ao JSONParser do DRF, que aceita as mesmas entradas
+de antes (escapes de surrogates, NaN sem STRICT_JSON) e gera as mesmas
+mensagens de erro.
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+# O orjson converte inteiros acima de 64 bits em float; corpos com 19 dígitos
+# seguidos vão direto para o json da biblioteca padrão. A busca é feita sobre
+# o corpo traduzido (dígitos viram 0, o resto espaço), bem mais barata que
+# uma regex
+TABELA_DIGITOS = bytes(ord('0') if byte in b'0123456789' else ord(' ') for byte in range(256))
+NUMERO_GRANDE = b'0' * 19
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser com backend orjson opcional"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if NUMERO_GRANDE in body.translate(TABELA_DIGITOS):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,88 @@
+"""
+Renderer JSON da API
+
+Gera exatamente os mesmos bytes do JSONRenderer do DRF, mas usando o orjson
+quando a biblioteca está instalada. Tipos que o orjson formataria de outro
+jeito (Decimal, date, time, datetime) são entregues ao encoder do DRF, e os
+casos que ele não cobre (indentação, inteiros acima de 64 bits, strings com
+surrogates, floats diferentes de zero com valor absoluto abaixo de 1e-4 ou a
+partir de 1e16) usam o renderer padrão.
+
+Mudança deliberada na API: com o orjson, NaN/Infinito são gravados como null,
+enquanto o renderer padrão (STRICT_JSON) levanta erro e a requisição falha
+com 500. Sem o orjson o comportamento anterior se mantém.
+"""
+import re
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+# Floats a partir de 1e16 ou abaixo de 1e-5 saem como 1e16 no orjson e 1e+16 no
+# json; os de [1e-5, 1e-4) saem como 0.00005 no orjson e 5e-05 no json. As
+# regex começam por literais, o que deixa a busca rápida; o caractere anterior
+# é conferido só nas poucas ocorrências
+EXPOENTE = re.compile(rb'e-?[0-9]')
+DECIMAL_PEQUENO = re.compile(rb'0\.0000[1-9]')
+DIGITOS = frozenset(b'0123456789')
+INICIO_NUMERO = DIGITOS | frozenset(b'.')
+
+# U+2028 / U+2029 em UTF-8
+SEPARADORES_LINHA = re.compile(rb'\xe2\x80[\xa8\xa9]')
+
+
+def tem_float_divergente(ret):
+    """Se algum float saiu em formato diferente do json (ver EXPOENTE / DECIMAL_PEQUENO)"""
+    for encontrado in EXPOENTE.finditer(ret):
+        if encontrado.start() and ret[encontrado.start() - 1] in DIGITOS:
+            return True
+    for encontrado in DECIMAL_PEQUENO.finditer(ret):
+        # 0.00001 sozinho, não parte de 10.00001
+        if not encontrado.start() or ret[encontrado.start() - 1] not in INICIO_NUMERO:
+            return True
+    return False
+
+
+def escapar_separador(encontrado):
+    return b'\\u2028' if encontrado.group() == b'\xe2\x80\xa8' else b'\\u2029'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer com backend orjson opcional e a mesma saída byte a byte"""
+
+    def use_orjson(self, indent):
+        return (
+            orjson is not None
+            and indent is None
+            and not self.ensure_ascii
+            and self.compact
+            and self.strict
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if not self.use_orjson(indent):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if tem_float_divergente(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Mesmo escape do JSONRenderer para manter a saída um subconjunto de JavaScript
+        if SEPARADORES_LINHA.search(ret):
+            ret = SEPARADORES_LINHA.sub(escapar_separador, ret)
+        return ret
@@ -0,0 +1,239 @@
+"""
+Manutenção dos consolidados de equipamentos (ResumoDiarioEquipamento e
+ResumoMensalEquipamento)
+
+O resumo de um (equipamento, dia) é sempre recalculado a partir dos
+registros daquela chave, e o de um (equipamento, mês) a partir dos resumos
+diários do mês, então atualizar a mesma chave várias vezes é idempotente.
+As alterações feitas pelo ORM chegam pelos signals (core/signals.py);
+gravações em massa (bulk_create/update) chamam atualizar_resumos diretamente.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import RegistroEquipamento, ResumoDiarioEquipamento, ResumoMensalEquipamento
+
+Chave = Tuple[int, date]
+
+# Chaves tratadas por consulta: limita os parâmetros dos `__in` e as linhas lidas a mais
+LOTE_CHAVES = 500
+
+CAMPOS_REGISTRO = [
+    'equipamento_id', 'equipamento__obra_id', 'data', 'hora_inicio', 'hora_fim',
+    'horimetro_inicial', 'horimetro_final', 'validado'
+]
+
+CAMPOS_RESUMO = [
+    'obra', 'horas_trabalhadas', 'horimetro_trabalhado',
+    'total_registros', 'registros_validados', 'updated_at'
+]
+
+
+def calcular_resumos(linhas: Iterable[tuple]) -> Dict[Chave, ResumoDiarioEquipamento]:
+    """Soma linhas de CAMPOS_REGISTRO por (equipamento, dia)"""
+    resumos = {}
+    for equipamento_id, obra_id, data, hora_inicio, hora_fim, horimetro_inicial, horimetro_final, validado in linhas:
+        chave = (equipamento_id, data)
+        resumo = resumos.get(chave)
+        if resumo is None:
+            resumo = resumos[chave] = ResumoDiarioEquipamento(
+                equipamento_id=equipamento_id,
+                obra_id=obra_id,
+                data=data,
+                horas_trabalhadas=0,
+                horimetro_trabalhado=Decimal('0'),
+                total_registros=0,
+                registros_validados=0
+            )
+
+        # Mesmo cálculo de RegistroEquipamento.horas_trabalhadas
+        duracao = datetime.combine(data, hora_fim) - datetime.combine(data, hora_inicio)
+        resumo.horas_trabalhadas += duracao.total_seconds() / 3600
+        resumo.horimetro_trabalhado += horimetro_final - horimetro_inicial
+        resumo.total_registros += 1
+        if validado:
+            resumo.registros_validados += 1
+    return resumos
+
+
+def gravar_resumos(resumos: Iterable[ResumoDiarioEquipamento], batch_size: int = 1000) -> None:
+    ResumoDiarioEquipamento.objects.bulk_create(
+        list(resumos),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['equipamento', 'data'],
+        update_fields=CAMPOS_RESUMO
+    )
+
+
+def em_lotes(chaves: Iterable[Chave], tamanho: int = LOTE_CHAVES):
+    """Divide as chaves, em ordem, em listas de até `tamanho`"""
+    chaves = sorted(chaves)
+    for inicio in range(0, len(chaves), tamanho):
+        yield chaves[inicio:inicio + tamanho]
+
+
+def atualizar_resumos(chaves: Iterable[Chave]) -> None:
+    """Recalcula o resumo das chaves (equipamento_id, data) informadas"""
+    campo_data = RegistroEquipamento._meta.get_field('data')
+    chaves: Set[Chave] = {
+        (equipamento_id, campo_data.to_python(data)) for equipamento_id, data in chaves
+    }
+    if not chaves:
+        return
+
+    with transaction.atomic():
+        for lote in em_lotes(chaves):
+            _atualizar_diarios(set(lote))
+        atualizar_mensais({(equipamento_id, inicio_mes(data)) for equipamento_id, data in chaves})
+
+
+def _atualizar_diarios(chaves: Set[Chave]) -> None:
+    # Equipamentos + intervalo de datas no banco; as chaves exatas são
+    # filtradas aqui (um OR por chave estoura a profundidade de expressão do SQLite)
+    equipamentos = {equipamento_id for equipamento_id, data in chaves}
+    periodo = (min(data for _, data in chaves), max(data for _, data in chaves))
+    linhas = [
+        linha for linha in RegistroEquipamento.objects.filter(
+            equipamento_id__in=equipamentos, data__range=periodo
+        ).order_by().values_list(*CAMPOS_REGISTRO)
+        if (linha[0], linha[2]) in chaves
+    ]
+    resumos = calcular_resumos(linhas)
+    if resumos:
+        gravar_resumos(resumos.values())
+
+    # Chaves que ficaram sem registros perdem o resumo
+    vazias = chaves - resumos.keys()
+    if vazias:
+        ResumoDiarioEquipamento.objects.filter(pk__in=[
+            pk for pk, equipamento_id, data in ResumoDiarioEquipamento.objects.filter(
+                equipamento_id__in=equipamentos, data__range=periodo
+            ).values_list('pk', 'equipamento_id', 'data')
+            if (equipamento_id, data) in vazias
+        ]).delete()
+
+
+def inicio_mes(data: date) -> date:
+    return data.replace(day=1)
+
+
+def fim_mes(data: date) -> date:
+    proximo = date(data.year + data.month // 12, data.month % 12 + 1, 1)
+    return date.fromordinal(proximo.toordinal() - 1)
+
+
+def somar_diarios(diarios):
+    """Agrega resumos diários por (equipamento, obra, mês) em ResumoMensalEquipamento"""
+    linhas = diarios.order_by().annotate(mes=TruncMonth('data')).values(
+        'equipamento_id', 'obra_id', 'mes'
+    ).annotate(
+        dias=Count('id'),
+        soma_horas=Sum('horas_trabalhadas'),
+        soma_horimetro=Sum('horimetro_trabalhado'),
+        soma_registros=Sum('total_registros'),
+        soma_validados=Sum('registros_validados'),
+    )
+    for linha in linhas:
+        yield ResumoMensalEquipamento(
+            equipamento_id=linha['equipamento_id'],
+            obra_id=linha['obra_id'],
+            mes=linha['mes'],
+            dias=linha['dias'],
+            horas_trabalhadas=linha['soma_horas'],
+            horimetro_trabalhado=linha['soma_horimetro'],
+            total_registros=linha['soma_registros'],
+            registros_validados=linha['soma_validados'],
+        )
+
+
+def atualizar_mensais(meses: Iterable[Chave]) -> None:
+    """Recalcula o resumo mensal das chaves (equipamento_id, primeiro dia do mês)"""
+    meses = set(meses)
+    if not meses:
+        return
+
+    with transaction.atomic():
+        for lote in em_lotes(meses):
+            _atualizar_mensais(set(lote))
+
+
+def _atualizar_mensais(meses: Set[Chave]) -> None:
+    equipamentos = {equipamento_id for equipamento_id, mes in meses}
+    primeiro = min(mes for _, mes in meses)
+    ultimo = max(mes for _, mes in meses)
+
+    # Apaga e recria: a obra do mês pode ter mudado (nova chave)
+    ResumoMensalEquipamento.objects.filter(pk__in=[
+        pk for pk, equipamento_id, mes in ResumoMensalEquipamento.objects.filter(
+            equipamento_id__in=equipamentos, mes__range=(primeiro, ultimo)
+        ).values_list('pk', 'equipamento_id', 'mes')
+        if (equipamento_id, mes) in meses
+    ]).delete()
+    ResumoMensalEquipamento.objects.bulk_create([
+        resumo for resumo in somar_diarios(ResumoDiarioEquipamento.objects.filter(
+            equipamento_id__in=equipamentos, data__range=(primeiro, fim_mes(ultimo))
+        ))
+        if (resumo.equipamento_id, resumo.mes) in meses
+    ])
+
+
+def reconstruir_mensais(data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                        batch_size: int = 2000) -> int:
+    """Recalcula os resumos mensais dos meses que tocam o período"""
+    mensais = ResumoMensalEquipamento.objects.all()
+    diarios = ResumoDiarioEquipamento.objects.all()
+    if data_inicio:
+        mensais = mensais.filter(mes__gte=inicio_mes(data_inicio))
+        diarios = diarios.filter(data__gte=inicio_mes(data_inicio))
+    if data_fim:
+        mensais = mensais.filter(mes__lte=data_fim)
+        diarios = diarios.filter(data__lte=fim_mes(data_fim))
+
+    with transaction.atomic():
+        mensais.delete()
+        resumos = list(somar_diarios(diarios))
+        ResumoMensalEquipamento.objects.bulk_create(resumos, batch_size=batch_size)
+    return len(resumos)
+
+
+def reconstruir_resumos(data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                        batch_size: int = 2000) -> int:
+    """Apaga e recalcula os resumos do período (ou de todo o histórico)"""
+    registros = RegistroEquipamento.objects.order_by()
+    resumos_existentes = ResumoDiarioEquipamento.objects.all()
+    if data_inicio:
+        registros = registros.filter(data__gte=data_inicio)
+        resumos_existentes = resumos_existentes.filter(data__gte=data_inicio)
+    if data_fim:
+        registros = registros.filter(data__lte=data_fim)
+        resumos_existentes = resumos_existentes.filter(data__lte=data_fim)
+
+    # RegistroEquipamento é único por (equipamento, data), então cada lote
+    # de registros fecha as próprias chaves
+    total = 0
+    with transaction.atomic():
+        resumos_existentes.delete()
+
+        lote = []
+        for linha in registros.values_list(*CAMPOS_REGISTRO).iterator(chunk_size=batch_size):
+            lote.append(linha)
+            if len(lote) >= batch_size:
+                total += _gravar_lote(lote, batch_size)
+                lote = []
+        total += _gravar_lote(lote, batch_size)
+
+        reconstruir_mensais(data_inicio, data_fim, batch_size)
+
+    return total
+
+
+def _gravar_lote(linhas, batch_size: int) -> int:
+    resumos = calcular_resumos(linhas)
+    gravar_resumos(resumos.values(), batch_size)
+    return len(resumos)
@@ -0,0 +1,245 @@
+"""
+Revogação de refresh tokens (token_blacklist do simplejwt)
+
+Consulta rápida: cada processo mantém um bloom filter com os jti revogados.
+Um jti fora do filtro certamente não foi revogado e dispensa o banco; só os
+"talvez" (revogados de fato ou falsos positivos) são confirmados na tabela,
+com o resultado guardado em um LRU. Revogações feitas em outros processos
+entram no filtro por sincronização incremental, no máximo uma vez a cada
+TOKEN_REVOGACAO_SINCRONIZACAO segundos. Os ids são atribuídos no INSERT, mas
+ficam visíveis no COMMIT: uma transação lenta pode publicar um id menor que
+o último já lido. Por isso cada sincronização relê, além dos ids novos, os
+inseridos nos últimos TOKEN_REVOGACAO_SOBREPOSICAO segundos.
+
+Limpeza: tokens expirados não precisam mais constar nas tabelas e são
+apagados em lotes pelo comando `limpar_tokens` (com --loop, como worker
+separado), que é o agendador recomendado. Opcionalmente, com
+TOKEN_LIMPEZA_INTERVALO > 0, cada processo que atende requisições roda a
+limpeza em uma thread daemon, iniciada na primeira requisição do processo
+(sinal request_started). Os jti
+apagados por outro processo continuam no filtro até a próxima reconstrução,
+o que só aumenta os "talvez" confirmados no banco.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Conjunto probabilístico: sem falsos negativos, falsos positivos ~taxa_erro"""
+
+    def __init__(self, capacidade: int, taxa_erro: float):
+        self.capacidade = capacidade
+        self.tamanho = max(64, int(-capacidade * math.log(taxa_erro) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.tamanho / capacidade * math.log(2)))
+        self.bits = bytearray((self.tamanho + 7) // 8)
+        self.total = 0
+
+    def _posicoes(self, valor: str):
+        # Double hashing a partir de um único digest
+        digest = hashlib.blake2b(valor.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.tamanho for i in range(self.hashes)]
+
+    def add(self, valor: str) -> None:
+        for posicao in self._posicoes(valor):
+            self.bits[posicao >> 3] |= 1 << (posicao & 7)
+        self.total += 1
+
+    def __contains__(self, valor: str) -> bool:
+        return all(self.bits[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(valor))
+
+
+class FrenteRevogacao:
+    """Bloom filter + LRU na frente da tabela BlacklistedToken (um por processo)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.ultimo_id = 0
+        self.sincronizado_em = 0.0
+        # (instante, último id lido): de onde reler para cobrir a sobreposição
+        self.marcas = deque()
+        self.confirmados = OrderedDict()
+
+    def carregar(self) -> None:
+        """Reconstrói o filtro com os tokens revogados ainda não expirados"""
+        sobreposicao = getattr(settings, 'TOKEN_REVOGACAO_SOBREPOSICAO', 60)
+        ultimo_id = BlacklistedToken.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+        # Último id anterior à janela: as próximas sincronizações releem a partir dele
+        piso = BlacklistedToken.objects.filter(
+            blacklisted_at__lt=timezone.now() - timedelta(seconds=sobreposicao)
+        ).aggregate(piso=Max('id'))['piso'] or 0
+        revogados = BlacklistedToken.objects.filter(
+            id__lte=ultimo_id, token__expires_at__gt=timezone.now()
+        ).values_list('token__jti', flat=True)
+
+        capacidade = max(getattr(settings, 'TOKEN_REVOGACAO_CAPACIDADE', 100000), revogados.count() * 2)
+        bloom = BloomFilter(capacidade, getattr(settings, 'TOKEN_REVOGACAO_TAXA_ERRO', 0.01))
+        for jti in revogados.iterator(chunk_size=5000):
+            bloom.add(jti)
+
+        agora = time.monotonic()
+        with self.lock:
+            self.bloom = bloom
+            self.ultimo_id = ultimo_id
+            self.sincronizado_em = agora
+            self.marcas = deque([(agora - sobreposicao, min(piso, ultimo_id)), (agora, ultimo_id)])
+            self.confirmados.clear()
+
+    def sincronizar(self) -> None:
+        """Inclui no filtro os tokens revogados desde a última leitura (com sobreposição)"""
+        sobreposicao = getattr(settings, 'TOKEN_REVOGACAO_SOBREPOSICAO', 60)
+        with self.lock:
+            agora = time.monotonic()
+            self.sincronizado_em = agora
+            # Marca mais recente com pelo menos `sobreposicao` segundos
+            while len(self.marcas) > 1 and self.marcas[1][0] <= agora - sobreposicao:
+                self.marcas.popleft()
+            desde = self.marcas[0][1] if self.marcas else self.ultimo_id
+
+        novos = list(BlacklistedToken.objects.filter(id__gt=desde).values_list('id', 'token__jti'))
+
+        with self.lock:
+            for pk, jti in novos:
+                if jti not in self.bloom:
+                    self.bloom.add(jti)
+                if self.confirmados.get(jti) is False:
+                    self.confirmados.pop(jti)
+                self.ultimo_id = max(self.ultimo_id, pk)
+            self.marcas.append((agora, self.ultimo_id))
+            cheio = self.bloom.total > self.bloom.capacidade
+        if cheio:
+            self.carregar()
+
+    def revogado(self, jti: str) -> bool:
+        if self.bloom is None:
+            self.carregar()
+        elif time.monotonic() - self.sincronizado_em >= getattr(settings, 'TOKEN_REVOGACAO_SINCRONIZACAO', 1):
+            self.sincronizar()
+
+        if jti not in self.bloom:
+            return False
+
+        with self.lock:
+            if jti in self.confirmados:
+                self.confirmados.move_to_end(jti)
+                return self.confirmados[jti]
+
+        resultado = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        self._guardar(jti, resultado)
+        return resultado
+
+    def registrar(self, jti: str) -> None:
+        """Revogação feita neste processo: vale imediatamente"""
+        if self.bloom is None:
+            self.carregar()
+        with self.lock:
+            self.bloom.add(jti)
+        self._guardar(jti, True)
+
+    def _guardar(self, jti: str, resultado: bool) -> None:
+        with self.lock:
+            self.confirmados[jti] = resultado
+            self.confirmados.move_to_end(jti)
+            while len(self.confirmados) > getattr(settings, 'TOKEN_REVOGACAO_LRU', 10000):
+                self.confirmados.popitem(last=False)
+
+
+_frente = FrenteRevogacao()
+
+
+def token_revogado(jti: str) -> bool:
+    return _frente.revogado(jti)
+
+
+def registrar_revogacao(jti: str) -> None:
+    _frente.registrar(jti)
+
+
+def reiniciar_frente() -> None:
+    """Descarta o filtro do processo; ele é reconstruído na próxima consulta"""
+    global _frente
+    _frente = FrenteRevogacao()
+
+
+# ========== LIMPEZA DE TOKENS EXPIRADOS ==========
+
+def limpar_tokens_expirados(lote: int = 1000) -> int:
+    """Apaga em lotes os tokens expirados (e suas revogações); retorna quantos"""
+    agora = timezone.now()
+    total = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lt=agora)
+            .order_by('id').values_list('id', flat=True)[:lote]
+        )
+        if not ids:
+            return total
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        total += len(ids)
+
+
+def limpar_e_recarregar(lote: int = 1000) -> int:
+    """Limpa os tokens expirados e reconstrói o filtro deste processo"""
+    total = limpar_tokens_expirados(lote)
+    if total and _frente.bloom is not None:
+        # Os jti apagados deixam de ocupar o filtro
+        _frente.carregar()
+    return total
+
+
+# PID do processo que iniciou a thread: threads não sobrevivem ao fork(), então
+# um worker criado a partir do processo mestre (gunicorn --preload) inicia a sua
+_limpeza_pid = None
+_limpeza_lock = threading.Lock()
+
+
+def iniciar_limpeza_periodica(**kwargs) -> bool:
+    """
+    Inicia (uma vez por processo) a limpeza a cada TOKEN_LIMPEZA_INTERVALO
+    segundos em uma thread daemon. Ligado ao sinal request_started: comandos
+    de gerenciamento e o processo pai do autoreloader não a iniciam.
+    """
+    global _limpeza_pid
+    intervalo = getattr(settings, 'TOKEN_LIMPEZA_INTERVALO', 0)
+    pid = os.getpid()
+    if not intervalo or _limpeza_pid == pid:
+        return False
+    with _limpeza_lock:
+        if _limpeza_pid == pid:
+            return False
+        _limpeza_pid = pid
+    threading.Thread(
+        target=_limpeza_periodica, args=(intervalo,), name='limpeza-tokens', daemon=True
+    ).start()
+    return True
+
+
+def _limpeza_periodica(intervalo: float) -> None:
+    while True:
+        time.sleep(intervalo)
+        try:
+            total = limpar_e_recarregar(getattr(settings, 'TOKEN_LIMPEZA_LOTE', 1000))
+            if total:
+                logger.info('%s token(s) expirado(s) removido(s)', total)
+        except Exception:
+            logger.exception('Falha na limpeza de tokens expirados')
+        finally:
+            close_old_connections()
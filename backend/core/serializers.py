@@ -1,13 +1,76 @@
 from rest_framework import serializers
+from rest_framework.exceptions import Throttled
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from django.contrib.auth import authenticate
 from .models import (
     Usuario, Obra, Equipamento, Contrato, CriterioMedicao,
     CategoriaAtividade, Atividade, RegistroEquipamento, 
-    RegistroMaoObra, ServicoExecutado, AtividadeEquipe, DiarioObra
+    RegistroMaoObra, ServicoExecutado, AtividadeEquipe, DiarioObra,
+    ImportacaoCSV
 )
+from .authentication import UsuarioRefreshToken
+from .login import buscar_usuario, get_bloqueio_segundos, limpar_falhas, login_bloqueado, registrar_falha
 
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Seleção de campos pela query string: ?fields=id,nome&expand=servicos
+
+    Vale apenas para o serializer principal de uma leitura (GET); escritas e
+    serializers aninhados continuam com todos os campos. Sem `fields` a
+    resposta é a completa; com `fields`, os relacionamentos aninhados só
+    entram se forem pedidos em `fields` ou em `expand`. Nomes desconhecidos
+    em qualquer dos dois parâmetros resultam em 400 com a lista dos inválidos.
+    """
+    
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+    # Campos que não são colunas do modelo (propriedades, SerializerMethodField)
+    # e os caminhos de que dependem, para a view montar o .only()
+    sparse_dependencies = {}
+    
+    @property
+    def sparse_fields(self):
+        """Conjunto de campos pedidos, ou None quando a resposta é completa"""
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        
+        parent = self.parent
+        if parent is not None and not (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return None
+        
+        campos = self._parse_param(request, self.fields_query_param)
+        if not campos:
+            return None
+        return campos | self._parse_param(request, self.expand_query_param)
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        selecionados = self.sparse_fields
+        if selecionados is None:
+            return fields
+        
+        # Campos só de escrita (ex.: password) nunca aparecem na leitura
+        legiveis = {nome for nome, campo in fields.items() if not campo.write_only}
+        request = self.context['request']
+        erros = {}
+        for param in (self.fields_query_param, self.expand_query_param):
+            invalidos = self._parse_param(request, param) - legiveis
+            if invalidos:
+                erros[param] = f"Campos inválidos: {', '.join(sorted(invalidos))}"
+        if erros:
+            raise serializers.ValidationError(erros)
+        
+        return {nome: campo for nome, campo in fields.items() if nome in selecionados}
+    
+    @staticmethod
+    def _parse_param(request, param):
+        valor = request.query_params.get(param) or ''
+        return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
+class UsuarioSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo Usuario"""
     
     password = serializers.CharField(write_only=True, required=False)
@@ -45,37 +108,44 @@ class UsuarioSerializer(serializers.ModelSerializer):
 
 
 class LoginSerializer(serializers.Serializer):
-    """Serializer para login (email para admin, matrícula para outros)"""
+    """
+    Serializer para login - aceita email OU matrícula
+    Baseado nos 4 tipos de login do frontend:
+    - Admin: email + senha
+    - Apontador/Encarregado/Motorista: matrícula + senha
+    """
     
     email = serializers.EmailField(required=False, allow_blank=True)
     matricula = serializers.CharField(required=False, allow_blank=True)
-    password = serializers.CharField(write_only=True)
+    password = serializers.CharField(write_only=True, style={'input_type': 'password'})
     
     def validate(self, data):
         email = data.get('email')
         matricula = data.get('matricula')
         password = data.get('password')
         
-        # Precisa fornecer email OU matrícula
         if not email and not matricula:
-            raise serializers.ValidationError('Forneça email ou matrícula para login')
+            raise serializers.ValidationError(
+                'É necessário fornecer email ou matrícula para login'
+            )
         
-        # Busca usuário por email ou matrícula
-        user = None
-        if email:
-            try:
-                user = Usuario.objects.get(email=email)
-            except Usuario.DoesNotExist:
-                raise serializers.ValidationError('Credenciais inválidas')
-        elif matricula:
-            try:
-                user = Usuario.objects.get(matricula=matricula)
-            except Usuario.DoesNotExist:
-                raise serializers.ValidationError('Credenciais inválidas')
+        campo, identificador = ('email', email) if email else ('matricula', matricula)
+        request = self.context.get('request')
+        ip = request.META.get('REMOTE_ADDR') if request else None
+        
+        # O limite de tentativas é verificado antes da busca e do hash
+        if login_bloqueado(identificador, ip):
+            raise Throttled(
+                wait=get_bloqueio_segundos(),
+                detail='Muitas tentativas de login. Tente novamente mais tarde.'
+            )
         
-        # Valida senha
-        if user and not user.check_password(password):
+        # check_password recalcula o hash se ele não usa o hasher preferido
+        user = buscar_usuario(campo, identificador)
+        if user is None or not user.check_password(password):
+            registrar_falha(identificador, ip)
             raise serializers.ValidationError('Credenciais inválidas')
+        limpar_falhas(identificador)
         
         if not user.is_active:
             raise serializers.ValidationError('Usuário inativo')
@@ -84,11 +154,22 @@ class LoginSerializer(serializers.Serializer):
         return data
 
 
+class RefreshSerializer(TokenRefreshSerializer):
+    """
+    Renovação do access token (com rotação do refresh token)
+    A revogação é conferida pelo filtro em memória de core/revogacao.py
+    """
+    
+    token_class = UsuarioRefreshToken
+
+
 class RegistroSerializer(serializers.ModelSerializer):
-    """Serializer para registro de novos usuários"""
+    """
+    Serializer para registro de novos usuários
+    """
     
-    password = serializers.CharField(write_only=True)
-    password_confirm = serializers.CharField(write_only=True)
+    password = serializers.CharField(write_only=True, min_length=6)
+    password_confirm = serializers.CharField(write_only=True, min_length=6)
     
     class Meta:
         model = Usuario
@@ -98,22 +179,22 @@ class RegistroSerializer(serializers.ModelSerializer):
         ]
     
     def validate(self, data):
-        # Validação de senhas
+        """Valida se as senhas conferem"""
         if data['password'] != data['password_confirm']:
-            raise serializers.ValidationError('As senhas não coincidem')
-        
-        # Validação baseada no tipo de usuário
-        tipo = data.get('tipo_usuario')
+            raise serializers.ValidationError({'password': 'As senhas não conferem'})
         
-        if tipo == 'admin' and not data.get('email'):
-            raise serializers.ValidationError('Admin precisa fornecer email')
+        # Valida se admin tem email
+        if data['tipo_usuario'] == 'admin' and not data.get('email'):
+            raise serializers.ValidationError({'email': 'Administrador deve ter email'})
         
-        if tipo in ['apontador', 'encarregado', 'motorista'] and not data.get('matricula'):
-            raise serializers.ValidationError(f'{tipo.capitalize()} precisa fornecer matrícula')
+        # Valida se outros tipos têm matrícula
+        if data['tipo_usuario'] != 'admin' and not data.get('matricula'):
+            raise serializers.ValidationError({'matricula': f"{data['tipo_usuario'].capitalize()} deve ter matrícula"})
         
         return data
     
     def create(self, validated_data):
+        """Cria usuário com senha hash"""
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
         
@@ -124,18 +205,22 @@ class RegistroSerializer(serializers.ModelSerializer):
         return usuario
 
 
-class ObraSerializer(serializers.ModelSerializer):
-    """Serializer para modelo Obra"""
+class ObraSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer para o modelo Obra"""
     
     responsavel_nome = serializers.CharField(source='responsavel.nome', read_only=True)
     
     class Meta:
         model = Obra
-        fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
+        fields = [
+            'id', 'nome', 'codigo', 'local', 'km_inicial', 'km_final',
+            'data_inicio', 'data_prevista_fim', 'responsavel', 'responsavel_nome',
+            'status', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class EquipamentoSerializer(serializers.ModelSerializer):
+class EquipamentoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo Equipamento"""
     
     obra_nome = serializers.CharField(source='obra.nome', read_only=True)
@@ -147,7 +232,7 @@ class EquipamentoSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class ContratoSerializer(serializers.ModelSerializer):
+class ContratoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo Contrato"""
     
     obra_nome = serializers.CharField(source='obra.nome', read_only=True)
@@ -158,7 +243,7 @@ class ContratoSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class CriterioMedicaoSerializer(serializers.ModelSerializer):
+class CriterioMedicaoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo CriterioMedicao"""
     
     obra_nome = serializers.CharField(source='obra.nome', read_only=True)
@@ -169,7 +254,7 @@ class CriterioMedicaoSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class CategoriaAtividadeSerializer(serializers.ModelSerializer):
+class CategoriaAtividadeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo CategoriaAtividade"""
     
     class Meta:
@@ -177,7 +262,7 @@ class CategoriaAtividadeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class AtividadeSerializer(serializers.ModelSerializer):
+class AtividadeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo Atividade"""
     
     obra_nome = serializers.CharField(source='obra.nome', read_only=True)
@@ -189,7 +274,7 @@ class AtividadeSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class RegistroEquipamentoSerializer(serializers.ModelSerializer):
+class RegistroEquipamentoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo RegistroEquipamento"""
     
     equipamento_nome = serializers.CharField(source='equipamento.nome', read_only=True)
@@ -198,13 +283,18 @@ class RegistroEquipamentoSerializer(serializers.ModelSerializer):
     horas_trabalhadas = serializers.ReadOnlyField()
     horimetro_trabalhado = serializers.ReadOnlyField()
     
+    sparse_dependencies = {
+        'horas_trabalhadas': ['hora_inicio', 'hora_fim'],
+        'horimetro_trabalhado': ['horimetro_inicial', 'horimetro_final'],
+    }
+    
     class Meta:
         model = RegistroEquipamento
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at', 'validado_por', 'data_validacao']
 
 
-class ServicoExecutadoSerializer(serializers.ModelSerializer):
+class ServicoExecutadoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo ServicoExecutado"""
     
     atividade_descricao = serializers.CharField(source='atividade.descricao', read_only=True)
@@ -214,7 +304,7 @@ class ServicoExecutadoSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class RegistroMaoObraSerializer(serializers.ModelSerializer):
+class RegistroMaoObraSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo RegistroMaoObra"""
     
     apontador_nome = serializers.CharField(source='apontador.nome', read_only=True)
@@ -222,6 +312,8 @@ class RegistroMaoObraSerializer(serializers.ModelSerializer):
     servicos = ServicoExecutadoSerializer(many=True, read_only=True)
     funcionarios_nomes = serializers.SerializerMethodField()
     
+    sparse_dependencies = {'funcionarios_nomes': ['funcionarios_presentes']}
+    
     class Meta:
         model = RegistroMaoObra
         fields = '__all__'
@@ -231,13 +323,15 @@ class RegistroMaoObraSerializer(serializers.ModelSerializer):
         return [f.nome for f in obj.funcionarios_presentes.all()]
 
 
-class AtividadeEquipeSerializer(serializers.ModelSerializer):
+class AtividadeEquipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo AtividadeEquipe"""
     
     encarregado_nome = serializers.CharField(source='encarregado.nome', read_only=True)
     obra_nome = serializers.CharField(source='obra.nome', read_only=True)
     funcionarios_nomes = serializers.SerializerMethodField()
     
+    sparse_dependencies = {'funcionarios_nomes': ['funcionarios']}
+    
     class Meta:
         model = AtividadeEquipe
         fields = '__all__'
@@ -247,7 +341,7 @@ class AtividadeEquipeSerializer(serializers.ModelSerializer):
         return [f.nome for f in obj.funcionarios.all()]
 
 
-class DiarioObraSerializer(serializers.ModelSerializer):
+class DiarioObraSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer para modelo DiarioObra"""
     
     encarregado_nome = serializers.CharField(source='encarregado.nome', read_only=True)
@@ -261,105 +355,18 @@ class DiarioObraSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class LoginSerializer(serializers.Serializer):
-    """
-    Serializer para login - aceita email OU matrícula
-    Baseado nos 4 tipos de login do frontend:
-    - Admin: email + senha
-    - Apontador/Encarregado/Motorista: matrícula + senha
-    """
+class ImportacaoCSVSerializer(serializers.ModelSerializer):
+    """Serializer para acompanhar o progresso de uma importação de CSV"""
     
-    email = serializers.EmailField(required=False, allow_blank=True)
-    matricula = serializers.CharField(required=False, allow_blank=True)
-    password = serializers.CharField(write_only=True, style={'input_type': 'password'})
-    
-    def validate(self, data):
-        email = data.get('email')
-        matricula = data.get('matricula')
-        password = data.get('password')
-        
-        if not email and not matricula:
-            raise serializers.ValidationError(
-                'É necessário fornecer email ou matrícula para login'
-            )
-        
-        # Tenta autenticar com email ou matrícula
-        user = None
-        
-        if email:
-            try:
-                user = Usuario.objects.get(email=email)
-            except Usuario.DoesNotExist:
-                raise serializers.ValidationError('Credenciais inválidas')
-        elif matricula:
-            try:
-                user = Usuario.objects.get(matricula=matricula)
-            except Usuario.DoesNotExist:
-                raise serializers.ValidationError('Credenciais inválidas')
-        
-        # Verifica senha
-        if user and not user.check_password(password):
-            raise serializers.ValidationError('Credenciais inválidas')
-        
-        if not user.is_active:
-            raise serializers.ValidationError('Usuário inativo')
-        
-        data['user'] = user
-        return data
-
-
-class RegistroSerializer(serializers.ModelSerializer):
-    """
-    Serializer para registro de novos usuários
-    """
-    
-    password = serializers.CharField(write_only=True, min_length=6)
-    password_confirm = serializers.CharField(write_only=True, min_length=6)
-    
-    class Meta:
-        model = Usuario
-        fields = [
-            'email', 'matricula', 'nome', 'cpf', 'telefone',
-            'tipo_usuario', 'funcao', 'cargo', 'password', 'password_confirm'
-        ]
-    
-    def validate(self, data):
-        """Valida se as senhas conferem"""
-        if data['password'] != data['password_confirm']:
-            raise serializers.ValidationError({'password': 'As senhas não conferem'})
-        
-        # Valida se admin tem email
-        if data['tipo_usuario'] == 'admin' and not data.get('email'):
-            raise serializers.ValidationError({'email': 'Administrador deve ter email'})
-        
-        # Valida se outros tipos têm matrícula
-        if data['tipo_usuario'] != 'admin' and not data.get('matricula'):
-            raise serializers.ValidationError({'matricula': f"{data['tipo_usuario'].capitalize()} deve ter matrícula"})
-        
-        return data
-    
-    def create(self, validated_data):
-        """Cria usuário com senha hash"""
-        validated_data.pop('password_confirm')
-        password = validated_data.pop('password')
-        
-        usuario = Usuario.objects.create(**validated_data)
-        usuario.set_password(password)
-        usuario.save()
-        
-        return usuario
-
-
-class ObraSerializer(serializers.ModelSerializer):
-    """Serializer para o modelo Obra"""
-    
-    responsavel_nome = serializers.CharField(source='responsavel.nome', read_only=True)
+    progresso = serializers.ReadOnlyField()
+    eta_segundos = serializers.ReadOnlyField()
     
     class Meta:
-        model = Obra
+        model = ImportacaoCSV
         fields = [
-            'id', 'nome', 'codigo', 'local', 'km_inicial', 'km_final',
-            'data_inicio', 'data_prevista_fim', 'responsavel', 'responsavel_nome',
-            'status', 'created_at', 'updated_at'
+            'id', 'tipo', 'status', 'tamanho_arquivo', 'linhas_processadas',
+            'bytes_processados', 'sucesso', 'erros', 'ignorados', 'progresso',
+            'eta_segundos', 'resultado', 'mensagem_erro', 'iniciado_em',
+            'finalizado_em', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = fields
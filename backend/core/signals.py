@@ -0,0 +1,139 @@
+"""
+Signals do app core
+
+Invalidação do cache do dashboard: as estatísticas ficam em cache por
+usuário (ver DashboardStatsView). Qualquer alteração nas tabelas contadas
+incrementa uma versão global, o que torna obsoletas todas as entradas de uma
+vez sem precisar saber quais usuários foram afetados. A versão fica no cache
+padrão: com o LocMemCache só o processo que gravou enxerga a invalidação e os
+demais workers servem números antigos por até DASHBOARD_CACHE_TIMEOUT
+segundos. Com mais de um processo, configure um cache compartilhado (o
+`check --deploy` avisa).
+
+Resumo diário de equipamentos: cada gravação ou exclusão de
+RegistroEquipamento recalcula o resumo do (equipamento, dia) afetado.
+
+Exclusões de registros de equipamento e de mão de obra ficam em
+RegistroRemovido, para que a fila de validação as informe na sincronização
+incremental.
+
+Autenticação: o estado do usuário usado pela autenticação JWT
+(core/authentication.py) fica em cache e é descartado quando o usuário é
+alterado ou excluído.
+"""
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import descartar_estado_usuario
+from .models import (
+    Usuario, Obra, Equipamento, Contrato, RegistroEquipamento,
+    RegistroMaoObra, AtividadeEquipe, DiarioObra, RegistroRemovido
+)
+from .resumos import atualizar_resumos
+
+DASHBOARD_VERSION_KEY = 'dashboard:versao'
+
+CACHES_POR_PROCESSO = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_dashboard_cache_key(user) -> str:
+    versao = cache.get_or_set(DASHBOARD_VERSION_KEY, 1, None)
+    return f'dashboard:{versao}:{user.tipo_usuario}:{user.pk}'
+
+
+def get_dashboard_timeout() -> int:
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 30)
+
+
+def verificar_cache_dashboard(app_configs, **kwargs):
+    """Deploy check: a invalidação do dashboard precisa de um cache compartilhado"""
+    if settings.CACHES['default']['BACKEND'] not in CACHES_POR_PROCESSO:
+        return []
+    return [checks.Warning(
+        'O cache padrão não é compartilhado entre processos: alterações feitas em um worker '
+        'não invalidam o dashboard em cache dos outros',
+        hint='Com mais de um processo, configure Redis, Memcached ou DatabaseCache em CACHES, '
+             'ou reduza DASHBOARD_CACHE_TIMEOUT.',
+        id='core.W001',
+    )]
+
+
+def invalidate_dashboard() -> None:
+    """Descarta as estatísticas em cache de todos os usuários"""
+    try:
+        cache.incr(DASHBOARD_VERSION_KEY)
+    except ValueError:
+        cache.set(DASHBOARD_VERSION_KEY, 1, None)
+
+
+@receiver([post_save, post_delete], sender=RegistroMaoObra)
+@receiver([post_save, post_delete], sender=RegistroEquipamento)
+@receiver([post_save, post_delete], sender=AtividadeEquipe)
+@receiver([post_save, post_delete], sender=DiarioObra)
+@receiver([post_save, post_delete], sender=Obra)
+@receiver([post_save, post_delete], sender=Equipamento)
+@receiver([post_save, post_delete], sender=Contrato)
+def dashboard_data_changed(sender, **kwargs):
+    invalidate_dashboard()
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+def dashboard_usuarios_changed(sender, created=False, signal=None, **kwargs):
+    # total_usuarios só muda com cadastro ou exclusão, não a cada last_login
+    if created or signal is post_delete:
+        invalidate_dashboard()
+
+
+# ========== RESUMO DIÁRIO DE EQUIPAMENTOS ==========
+
+@receiver(pre_save, sender=RegistroEquipamento)
+def registro_equipamento_pre_save(sender, instance, **kwargs):
+    # Guarda a chave antiga para recalcular o dia/equipamento de origem
+    # quando o registro for movido
+    instance._chave_resumo_anterior = None
+    if instance.pk:
+        instance._chave_resumo_anterior = RegistroEquipamento.objects.filter(
+            pk=instance.pk
+        ).values_list('equipamento_id', 'data').first()
+
+
+@receiver(post_save, sender=RegistroEquipamento)
+def registro_equipamento_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    chaves = {(instance.equipamento_id, instance.data)}
+    anterior = getattr(instance, '_chave_resumo_anterior', None)
+    if anterior:
+        chaves.add(anterior)
+    atualizar_resumos(chaves)
+
+
+@receiver(post_delete, sender=RegistroEquipamento)
+def registro_equipamento_post_delete(sender, instance, **kwargs):
+    atualizar_resumos([(instance.equipamento_id, instance.data)])
+
+
+# ========== EXCLUSÕES PARA A FILA DE VALIDAÇÃO ==========
+
+@receiver(post_delete, sender=RegistroEquipamento)
+def registro_equipamento_removido(sender, instance, **kwargs):
+    obra_id = Equipamento.objects.filter(pk=instance.equipamento_id).values_list('obra_id', flat=True).first()
+    RegistroRemovido.objects.create(tipo='equipamento', registro_id=instance.pk, obra_id=obra_id)
+
+
+@receiver(post_delete, sender=RegistroMaoObra)
+def registro_mao_obra_removido(sender, instance, **kwargs):
+    RegistroRemovido.objects.create(tipo='mao_obra', registro_id=instance.pk, obra_id=instance.obra_id)
+
+
+# ========== ESTADO DO USUÁRIO NA AUTENTICAÇÃO ==========
+
+@receiver([post_save, post_delete], sender=Usuario)
+def usuario_changed(sender, instance, **kwargs):
+    descartar_estado_usuario(instance.pk)
@@ -1,3 +1,1517 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core import checks
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .jobs import ProgressReporter, fail_stale_jobs, run_job, run_pending_jobs
+from .importers import (
+    EquipamentoCSVImporter, MultiCSVImporter, ObraCSVImporter, RegistroEquipamentoCSVImporter,
+    RegistroMaoObraCSVImporter, UsuarioCSVImporter
+)
+from .pagination import KeysetPagination
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer, orjson
+from .resumos import atualizar_resumos, reconstruir_resumos
+from .signals import verificar_cache_dashboard
+from .revogacao import iniciar_limpeza_periodica, reiniciar_frente, token_revogado
+from .models import (
+    Usuario, Obra, Equipamento, CategoriaAtividade, Atividade, RegistroEquipamento,
+    RegistroMaoObra, ServicoExecutado, AtividadeEquipe, DiarioObra,
+    ResumoDiarioEquipamento, ResumoMensalEquipamento, ImportacaoCSV
+)
+
+
+class CoreTestCase(TestCase):
+    """Base dos testes: usuários, obra e equipamento padrão e cliente autenticado"""
+    
+    def criar_usuario(self, matricula, tipo_usuario, nome=None, **kwargs):
+        """Usuário com senha 'senha123'; o nome padrão é o tipo (ex.: 'Motorista')"""
+        return Usuario.objects.create_user(
+            matricula=matricula, nome=nome or tipo_usuario.capitalize(),
+            tipo_usuario=tipo_usuario, password='senha123', **kwargs
+        )
+    
+    def criar_obra(self, **kwargs):
+        """Obra 'Obra Teste' (OBR-001, BR-101); kwargs substituem os campos padrão"""
+        return Obra.objects.create(**{
+            'nome': 'Obra Teste', 'codigo': 'OBR-001', 'local': 'BR-101',
+            'km_inicial': 0, 'km_final': 10,
+            'data_inicio': '2025-01-01', 'data_prevista_fim': '2025-12-31',
+            **kwargs
+        })
+    
+    def criar_outra_obra(self, **kwargs):
+        return self.criar_obra(**{'nome': 'Outra Obra', 'codigo': 'OBR-002', 'local': 'BR-116', **kwargs})
+    
+    def criar_equipamento(self, obra, **kwargs):
+        """Caminhão ABC1234 da obra; kwargs substituem os campos padrão"""
+        return Equipamento.objects.create(**{
+            'nome': 'Caminhão', 'tipo': 'caminhao', 'modelo': 'Atego', 'placa': 'ABC1234',
+            'fabricante': 'Mercedes', 'ano': 2020, 'obra': obra,
+            **kwargs
+        })
+    
+    def autenticar(self, usuario):
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+
+class RegistroMaoObraListQueryTest(CoreTestCase):
+    """A listagem de registros de mão de obra não deve crescer em consultas por linha"""
+    
+    def setUp(self):
+        self.apontador = self.criar_usuario('AP001', 'apontador')
+        self.funcionarios = [
+            self.criar_usuario(f'F{i:03d}', 'motorista', nome=f'Funcionário {i}')
+            for i in range(3)
+        ]
+        self.obra = self.criar_obra()
+        self.atividade = Atividade.objects.create(
+            codigo='ATV-001', descricao='Terraplanagem', unidade='m3',
+            preco_unitario=10, obra=self.obra
+        )
+        self.autenticar(self.apontador)
+    
+    def criar_registros(self, quantidade):
+        for i in range(quantidade):
+            registro = RegistroMaoObra.objects.create(
+                apontador=self.apontador, obra=self.obra, data=f'2025-01-{i + 1:02d}',
+                hora_inicio='07:00', hora_fim='17:00', total_funcionarios=3, local='Trecho'
+            )
+            registro.funcionarios_presentes.set(self.funcionarios)
+            ServicoExecutado.objects.create(registro=registro, atividade=self.atividade, quantidade=10, unidade='m3')
+    
+    def listar(self):
+        response = self.client.get('/api/registros-mao-obra')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+    
+    def test_consultas_constantes_por_pagina(self):
+        self.criar_registros(1)
+        with self.assertNumQueries(4):
+            results = self.listar()
+        self.assertEqual(len(results), 1)
+        
+        self.criar_registros(20)
+        with self.assertNumQueries(4):
+            results = self.listar()
+        self.assertEqual(len(results), 21)
+        self.assertEqual(len(results[0]['funcionarios_nomes']), 3)
+        self.assertEqual(results[0]['servicos'][0]['atividade_descricao'], 'Terraplanagem')
+
+
+class DiarioObraQueryTest(CoreTestCase):
+    """O RDO com atividades e equipamentos aninhados deve carregar em consultas fixas"""
+    
+    def setUp(self):
+        self.encarregado = self.criar_usuario('EN001', 'encarregado')
+        self.motorista = self.criar_usuario('MT001', 'motorista')
+        self.obra = self.criar_obra()
+        self.equipamento = self.criar_equipamento(self.obra)
+        self.autenticar(self.encarregado)
+    
+    def criar_diarios(self, inicio, quantidade):
+        for dia in range(inicio, inicio + quantidade):
+            data = f'2025-01-{dia:02d}'
+            atividade = AtividadeEquipe.objects.create(
+                encarregado=self.encarregado, obra=self.obra, descricao='Compactação',
+                data=data, hora_inicio='07:00', local='Trecho'
+            )
+            atividade.funcionarios.set([self.motorista])
+            registro = RegistroEquipamento.objects.create(
+                equipamento=self.equipamento, motorista=self.motorista, apontador=self.encarregado,
+                data=data, horimetro_inicial=100, horimetro_final=108,
+                hora_inicio='07:00', hora_fim='15:00', atividade_principal='Transporte', local='Trecho'
+            )
+            diario = DiarioObra.objects.create(
+                encarregado=self.encarregado, obra=self.obra, data=data,
+                total_funcionarios=5, funcionarios_presentes=4,
+                condicoes_climaticas='Sol', observacoes=''
+            )
+            diario.atividades.set([atividade])
+            diario.equipamentos.set([registro])
+    
+    def test_consultas_constantes_na_listagem(self):
+        self.criar_diarios(1, 1)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/diarios-obra')
+        self.assertEqual(len(response.data['results']), 1)
+        
+        self.criar_diarios(2, 15)
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/diarios-obra?obra={self.obra.id}')
+        results = response.data['results']
+        self.assertEqual(len(results), 16)
+        self.assertEqual(results[0]['atividades_detalhes'][0]['funcionarios_nomes'], ['Motorista'])
+        self.assertEqual(results[0]['equipamentos_detalhes'][0]['equipamento_nome'], 'Caminhão')
+    
+    def test_consultas_constantes_no_detalhe(self):
+        self.criar_diarios(1, 1)
+        diario = DiarioObra.objects.get()
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/diarios-obra/{diario.id}')
+        self.assertEqual(response.data['equipamentos_detalhes'][0]['motorista_nome'], 'Motorista')
+
+
+class KeysetPaginationTest(CoreTestCase):
+    """Navegação por cursor nas listagens de registros"""
+    
+    def setUp(self):
+        self.motorista = self.criar_usuario('MT001', 'motorista')
+        self.obra = self.criar_obra()
+        for i in range(8):
+            equipamento = self.criar_equipamento(self.obra, nome=f'Caminhão {i}', placa=f'ABC{i:04d}')
+            RegistroEquipamento.objects.create(
+                equipamento=equipamento, motorista=self.motorista,
+                data=f'2025-01-{i // 3 + 1:02d}', horimetro_inicial=100, horimetro_final=108,
+                hora_inicio='07:00', hora_fim='15:00', atividade_principal='Transporte', local='Trecho'
+            )
+        self.autenticar(self.motorista)
+    
+    def test_paginacao_padrao_mantida(self):
+        response = self.client.get('/api/registros-equipamentos')
+        self.assertEqual(response.data['count'], 8)
+    
+    @mock.patch.object(KeysetPagination, 'page_size', 3)
+    def test_percorre_paginas_sem_contagem(self):
+        esperado = list(RegistroEquipamento.objects.values_list('id', flat=True))
+        
+        response = self.client.get('/api/registros-equipamentos?paginacao=cursor')
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        
+        ids = [r['id'] for r in response.data['results']]
+        paginas = [response.data]
+        while response.data['next']:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(response.data['next'])
+            self.assertFalse(any('COUNT(' in q['sql'] or 'OFFSET' in q['sql'] for q in queries))
+            ids += [r['id'] for r in response.data['results']]
+            paginas.append(response.data)
+        self.assertEqual(ids, esperado)
+        self.assertEqual(len(paginas), 3)
+        
+        response = self.client.get(paginas[-1]['previous'])
+        self.assertEqual(response.data['results'], paginas[-2]['results'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.data['results'], paginas[0]['results'])
+        self.assertIsNone(response.data['previous'])
+    
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/registros-equipamentos?cursor=invalido')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_cursor_recusa_ordenar(self):
+        response = self.client.get('/api/registros-equipamentos?paginacao=cursor&ordenar=horas')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordenar', response.data)
+
+
+class DashboardStatsTest(CoreTestCase):
+    """Estatísticas do dashboard agregadas e em cache por usuário"""
+    
+    def setUp(self):
+        cache.clear()
+        self.motorista = self.criar_usuario('MT001', 'motorista')
+        self.obra = self.criar_obra()
+        self.equipamento = self.criar_equipamento(self.obra, motorista_atual=self.motorista)
+        self.autenticar(self.motorista)
+    
+    def criar_registro(self, data):
+        return RegistroEquipamento.objects.create(
+            equipamento=self.equipamento, motorista=self.motorista,
+            data=data, horimetro_inicial=100, horimetro_final=108,
+            hora_inicio='07:00', hora_fim='15:00', atividade_principal='Transporte', local='Trecho'
+        )
+    
+    def test_motorista_com_cache_e_invalidacao(self):
+        self.criar_registro(timezone.now().date())
+        self.criar_registro('2025-01-01')
+        
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/dashboard/stats')
+        self.assertEqual(response.data, {
+            'registros_hoje': 1,
+            'registros_pendentes': 2,
+            'total_registros': 2,
+            'equipamento_atual': 'Caminhão',
+        })
+        
+        with self.assertNumQueries(0):
+            self.client.get('/api/dashboard/stats')
+        
+        self.criar_registro('2025-01-02')
+        response = self.client.get('/api/dashboard/stats')
+        self.assertEqual(response.data['total_registros'], 3)
+    
+    def test_admin_e_encarregado(self):
+        admin = self.criar_usuario('AD001', 'admin')
+        self.client.force_authenticate(admin)
+        total = self.client.get('/api/dashboard/stats').data['total_usuarios']
+        self.criar_usuario('AP001', 'apontador')
+        self.assertEqual(self.client.get('/api/dashboard/stats').data['total_usuarios'], total + 1)
+        
+        # registros_validar conta só as obras do encarregado
+        encarregado = self.criar_usuario('EN001', 'encarregado')
+        self.obra.responsavel = encarregado
+        self.obra.save()
+        for obra in [self.obra, self.criar_outra_obra()]:
+            RegistroMaoObra.objects.create(
+                apontador=admin, obra=obra, data='2025-01-02',
+                hora_inicio='07:00', hora_fim='17:00', total_funcionarios=3, local='Trecho'
+            )
+        self.client.force_authenticate(encarregado)
+        self.assertEqual(self.client.get('/api/dashboard/stats').data['registros_validar'], 1)
+    
+    def test_aviso_de_cache_por_processo(self):
+        avisos = checks.run_checks(include_deployment_checks=True)
+        self.assertIn('core.W001', [aviso.id for aviso in avisos])
+        self.assertNotIn('core.W001', [aviso.id for aviso in checks.run_checks()])
+        
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'
+        }}):
+            self.assertFalse(verificar_cache_dashboard(None))
+
+
+class ResumoDiarioEquipamentoTest(CoreTestCase):
+    """Consolidado diário mantido a partir dos registros de equipamento"""
+    
+    def setUp(self):
+        self.motorista = self.criar_usuario('MT001', 'motorista')
+        self.obra = self.criar_obra()
+        self.equipamento = self.criar_equipamento(self.obra)
+    
+    def criar_registro(self, data, hora_fim='15:30'):
+        return RegistroEquipamento.objects.create(
+            equipamento=self.equipamento, motorista=self.motorista,
+            data=data, horimetro_inicial=100, horimetro_final=108.5,
+            hora_inicio='07:00', hora_fim=hora_fim, atividade_principal='Transporte', local='Trecho'
+        )
+    
+    def resumos(self):
+        return list(ResumoDiarioEquipamento.objects.order_by('data').values_list(
+            'data', 'obra_id', 'horas_trabalhadas', 'horimetro_trabalhado', 'total_registros', 'registros_validados'
+        ))
+    
+    def test_atualizado_ao_salvar_e_excluir(self):
+        registro = self.criar_registro('2025-01-10')
+        self.assertEqual(self.resumos(), [(date(2025, 1, 10), self.obra.id, 8.5, Decimal('8.5'), 1, 0)])
+        
+        registro.validado = True
+        registro.data = date(2025, 1, 11)
+        registro.save()
+        self.assertEqual(self.resumos(), [(date(2025, 1, 11), self.obra.id, 8.5, Decimal('8.5'), 1, 1)])
+        
+        registro.delete()
+        self.assertEqual(self.resumos(), [])
+    
+    def test_mais_de_mil_chaves(self):
+        # 90 equipamentos x 12 meses: um OR por chave estouraria a profundidade do SQLite
+        equipamentos = [
+            self.criar_equipamento(self.obra, placa=f'EQP{i:04d}') for i in range(90)
+        ]
+        RegistroEquipamento.objects.bulk_create([
+            RegistroEquipamento(
+                equipamento=equipamento, motorista=self.motorista,
+                data=date(2025, mes, 5), horimetro_inicial=100, horimetro_final=108,
+                hora_inicio='07:00', hora_fim='15:00', atividade_principal='Transporte', local='Trecho'
+            )
+            for equipamento in equipamentos for mes in range(1, 13)
+        ])
+        encarregado = self.criar_usuario('EN001', 'encarregado')
+        self.autenticar(encarregado)
+        response = self.client.post('/api/registros-equipamentos/validar-lote', {
+            'obra': self.obra.id, 'data_inicio': '2025-01-01', 'data_fim': '2025-12-31'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['validados'], 1080)
+        self.assertEqual(ResumoDiarioEquipamento.objects.filter(registros_validados=1).count(), 1080)
+        self.assertEqual(ResumoMensalEquipamento.objects.filter(registros_validados=1).count(), 1080)
+        
+        # Chaves sem registros (dia 6) junto com as existentes: 2160 chaves
+        RegistroEquipamento.objects.filter(equipamento__in=equipamentos[:45]).delete()
+        atualizar_resumos(
+            (equipamento.id, date(2025, mes, dia))
+            for equipamento in equipamentos for mes in range(1, 13) for dia in (5, 6)
+        )
+        self.assertEqual(ResumoDiarioEquipamento.objects.count(), 540)
+        self.assertEqual(ResumoMensalEquipamento.objects.count(), 540)
+    
+    def mensais(self):
+        return list(ResumoMensalEquipamento.objects.order_by('mes', 'obra_id').values_list(
+            'mes', 'obra_id', 'dias', 'horas_trabalhadas', 'total_registros'
+        ))
+    
+    def test_resumo_mensal(self):
+        self.criar_registro('2025-01-10')
+        self.criar_registro('2025-01-11', hora_fim='17:00')
+        self.criar_registro('2025-02-03')
+        self.assertEqual(self.mensais(), [
+            (date(2025, 1, 1), self.obra.id, 2, 18.5, 2),
+            (date(2025, 2, 1), self.obra.id, 1, 8.5, 1),
+        ])
+        
+        # Equipamento transferido no meio do mês: uma linha por obra
+        outra = self.criar_outra_obra()
+        self.equipamento.obra = outra
+        self.equipamento.save()
+        self.criar_registro('2025-01-20')
+        self.assertEqual(self.mensais()[:2], [
+            (date(2025, 1, 1), self.obra.id, 2, 18.5, 2),
+            (date(2025, 1, 1), outra.id, 1, 8.5, 1),
+        ])
+        
+        ResumoMensalEquipamento.objects.all().delete()
+        reconstruir_resumos(date(2025, 1, 15), date(2025, 1, 31))
+        self.assertEqual(len(self.mensais()), 2)
+    
+    def test_importacao_e_reconstrucao(self):
+        csv = (
+            'equipamento_placa,motorista_matricula,data,horimetro_inicial,horimetro_final,hora_inicio,hora_fim,atividade_principal,local\n'
+            'ABC1234,MT001,01/02/2025,100,110,07:00,17:00,Transporte,Trecho\n'
+            'ABC1234,MT001,02/02/2025,110,118,07:00,15:00,Transporte,Trecho\n'
+        )
+        result = RegistroEquipamentoCSVImporter(io.BytesIO(csv.encode('utf-8'))).import_data()
+        self.assertEqual(result['success'], 2)
+        esperado = [
+            (date(2025, 2, 1), self.obra.id, 10.0, Decimal('10.0'), 1, 0),
+            (date(2025, 2, 2), self.obra.id, 8.0, Decimal('8.0'), 1, 0),
+        ]
+        self.assertEqual(self.resumos(), esperado)
+        
+        ResumoDiarioEquipamento.objects.all().delete()
+        self.assertEqual(reconstruir_resumos(), 2)
+        self.assertEqual(self.resumos(), esperado)
+    
+    def test_api_agrupada(self):
+        self.criar_registro('2025-01-10')
+        self.criar_registro('2025-01-11', hora_fim='17:00')
+        self.autenticar(self.motorista)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/resumos-equipamentos?agrupar=obra&data_inicio=2025-01-01')
+        self.assertEqual(response.status_code, 200)
+        grupo = response.data['results'][0]
+        self.assertEqual(grupo['obra__nome'], 'Obra Teste')
+        self.assertEqual(grupo['dias'], 2)
+        self.assertEqual(grupo['horas_trabalhadas'], 18.5)
+        
+        # Meses inteiros vêm do consolidado mensal; períodos parciais, do diário
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/resumos-equipamentos?agrupar=mes&data_inicio=2025-01-01&data_fim=2025-01-31')
+        self.assertIn('core_resumomensalequipamento', queries[0]['sql'])
+        self.assertEqual(response.data['results'][0]['dias'], 2)
+        self.assertEqual(response.data['results'][0]['horas_trabalhadas'], 18.5)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/resumos-equipamentos?agrupar=mes&data_inicio=2025-01-11')
+        self.assertIn('core_resumodiarioequipamento', queries[0]['sql'])
+        self.assertEqual(response.data['results'][0]['dias'], 1)
+        
+        response = self.client.get('/api/resumos-equipamentos?agrupar=semana')
+        self.assertEqual(response.status_code, 400)
+
+
+class RegistroEquipamentoHorasTest(CoreTestCase):
+    """Horas e horímetro trabalhados calculados no banco"""
+    
+    def setUp(self):
+        self.motorista = self.criar_usuario('MT001', 'motorista')
+        self.obra = self.criar_obra()
+        self.equipamento = self.criar_equipamento(self.obra)
+        for dia, hora_fim, horimetro_final in [(1, '11:00', '104.1'), (2, '15:30', '108.5'), (3, '17:00', '110.0')]:
+            RegistroEquipamento.objects.create(
+                equipamento=self.equipamento, motorista=self.motorista,
+                data=f'2025-01-{dia:02d}', horimetro_inicial='100.0', horimetro_final=horimetro_final,
+                hora_inicio='07:00', hora_fim=hora_fim, atividade_principal='Transporte', local='Trecho'
+            )
+        self.autenticar(self.motorista)
+    
+    def test_anotacoes_iguais_ao_calculo_em_python(self):
+        for registro in RegistroEquipamento.objects.com_totais():
+            puro = RegistroEquipamento.objects.get(pk=registro.pk)
+            self.assertEqual(registro.horas_trabalhadas, puro.horas_trabalhadas)
+            self.assertEqual(registro.horimetro_trabalhado, puro.horimetro_trabalhado)
+    
+    def test_filtro_e_ordenacao_por_horas(self):
+        response = self.client.get('/api/registros-equipamentos?min_horas=8,5&ordenar=horas')
+        results = response.data['results']
+        self.assertEqual([r['horas_trabalhadas'] for r in results], [8.5, 10.0])
+        self.assertEqual([r['horimetro_trabalhado'] for r in results], [8.5, 10.0])
+        
+        for valor in ['abc', 'nan', 'inf', '-inf', '1e999', '1e20']:
+            response = self.client.get(f'/api/registros-equipamentos?max_horas={valor}')
+            self.assertEqual(response.status_code, 400, valor)
+            self.assertIn('max_horas', response.data)
+
+
+class ValidarLoteTest(CoreTestCase):
+    """Validação de vários registros com um único UPDATE"""
+    
+    def setUp(self):
+        self.encarregado = self.criar_usuario('EN001', 'encarregado')
+        self.motorista = self.criar_usuario('MT001', 'motorista')
+        self.obra = self.criar_obra()
+        self.equipamento = self.criar_equipamento(self.obra)
+        self.registros = [
+            RegistroEquipamento.objects.create(
+                equipamento=self.equipamento, motorista=self.motorista,
+                data=f'2025-01-{dia:02d}', horimetro_inicial=100, horimetro_final=108,
+                hora_inicio='07:00', hora_fim='15:00', atividade_principal='Transporte', local='Trecho'
+            )
+            for dia in range(1, 6)
+        ]
+        self.autenticar(self.encarregado)
+    
+    def test_valida_por_ids(self):
+        ids = [r.id for r in self.registros[:3]]
+        RegistroEquipamento.objects.filter(pk=ids[0]).update(validado=True)
+        
+        response = self.client.post(
+            '/api/registros-equipamentos/validar-lote', {'ids': ids + [9999]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'validados': 2,
+            'ids': ids[1:],
+            'ja_validados': 1,
+            'nao_encontrados': [9999],
+        })
+        registro = RegistroEquipamento.objects.get(pk=ids[1])
+        self.assertEqual(registro.validado_por, self.encarregado)
+        self.assertIsNotNone(registro.data_validacao)
+        self.assertEqual(ResumoDiarioEquipamento.objects.get(data=registro.data).registros_validados, 1)
+    
+    def test_valida_por_filtro(self):
+        response = self.client.post(
+            '/api/registros-equipamentos/validar-lote',
+            {'obra': self.obra.id, 'data_inicio': '2025-01-02', 'data_fim': '2025-01-04'},
+            format='json'
+        )
+        self.assertEqual(response.data['validados'], 3)
+        self.assertNotIn('ids', response.data)
+        self.assertEqual(RegistroEquipamento.objects.filter(validado=True).count(), 3)
+    
+    def test_um_update_sem_lista_de_ids(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as contexto:
+            self.client.post('/api/registros-mao-obra/validar-lote', {'obra': self.obra.id}, format='json')
+        updates = [q['sql'] for q in contexto.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('SELECT', updates[0].split('WHERE')[0])
+        
+        response = self.client.post(
+            '/api/registros-equipamentos/validar-lote', {'ids': list(range(1, 1002))}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+    
+    def test_exige_criterio_e_permissao(self):
+        response = self.client.post('/api/registros-mao-obra/validar-lote', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        for corpo in [[self.registros[0].id], 5, 'ids']:
+            response = self.client.post('/api/registros-equipamentos/validar-lote', corpo, format='json')
+            self.assertEqual(response.status_code, 400, corpo)
+
+        self.client.force_authenticate(self.motorista)
+        response = self.client.post(
+            '/api/registros-equipamentos/validar-lote', {'ids': [self.registros[0].id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(FILA_VALIDACAO_SOBREPOSICAO=0)
+class FilaValidacaoTest(CoreTestCase):
+    """Fila de pendentes por encarregado com sincronização incremental"""
+    
+    def setUp(self):
+        self.encarregado = self.criar_usuario('EN001', 'encarregado')
+        self.apontador = self.criar_usuario('AP001', 'apontador')
+        self.obra = self.criar_obra(responsavel=self.encarregado)
+        self.outra_obra = self.criar_outra_obra()
+        self.equipamento = self.criar_equipamento(self.obra)
+        self.registro_equipamento = RegistroEquipamento.objects.create(
+            equipamento=self.equipamento, motorista=self.apontador,
+            data='2025-01-02', horimetro_inicial=100, horimetro_final=108,
+            hora_inicio='07:00', hora_fim='15:00', atividade_principal='Transporte', local='Trecho'
+        )
+        self.registro_mao_obra = self.criar_mao_obra(self.obra, '2025-01-01')
+        self.criar_mao_obra(self.outra_obra, '2025-01-01')
+        self.autenticar(self.encarregado)
+    
+    def criar_mao_obra(self, obra, data):
+        return RegistroMaoObra.objects.create(
+            apontador=self.apontador, obra=obra, data=data,
+            hora_inicio='07:00', hora_fim='17:00', total_funcionarios=3, local='Trecho'
+        )
+    
+    def test_fila_escopada_e_incremental(self):
+        response = self.client.get('/api/validacoes/pendentes')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['tipo'], item['id']) for item in response.data['pendentes']],
+            [('mao_obra', self.registro_mao_obra.id), ('equipamento', self.registro_equipamento.id)]
+        )
+        self.assertNotIn('removidos', response.data)
+        
+        since = response.data['sincronizado_em'].isoformat()
+        self.registro_mao_obra.validado = True
+        self.registro_mao_obra.save()
+        novo = self.criar_mao_obra(self.obra, '2025-01-03')
+        
+        response = self.client.get('/api/validacoes/pendentes', {'since': since})
+        self.assertEqual([item['id'] for item in response.data['pendentes']], [novo.id])
+        self.assertEqual(response.data['removidos'], [{'tipo': 'mao_obra', 'id': self.registro_mao_obra.id}])
+    
+    @override_settings(FILA_VALIDACAO_SOBREPOSICAO=60)
+    def test_commit_atrasado_reentregue(self):
+        # Linha gravada antes da leitura, mas só visível depois dela
+        antes = timezone.now()
+        response = self.client.get('/api/validacoes/pendentes')
+        self.assertLess(response.data['sincronizado_em'], antes)
+        atrasado = self.criar_mao_obra(self.obra, '2025-01-03')
+        RegistroMaoObra.objects.filter(pk=atrasado.pk).update(updated_at=antes)
+        
+        response = self.client.get(
+            '/api/validacoes/pendentes', {'since': response.data['sincronizado_em'].isoformat()}
+        )
+        # Os itens dentro da sobreposição voltam; o cliente deduplica por id
+        self.assertIn(('mao_obra', atrasado.id), [(item['tipo'], item['id']) for item in response.data['pendentes']])
+    
+    def test_exclusoes_informadas(self):
+        since = self.client.get('/api/validacoes/pendentes').data['sincronizado_em'].isoformat()
+        registro_id = self.registro_equipamento.id
+        self.registro_equipamento.delete()
+        # Exclusões de obras fora do escopo não aparecem
+        RegistroMaoObra.objects.filter(obra=self.outra_obra).delete()
+        
+        response = self.client.get('/api/validacoes/pendentes', {'since': since})
+        self.assertEqual(response.data['pendentes'], [])
+        self.assertEqual(response.data['removidos'], [{'tipo': 'equipamento', 'id': registro_id}])
+        
+        # since anterior à retenção: fila completa, sem removidos
+        with override_settings(FILA_VALIDACAO_RETENCAO_DIAS=0):
+            response = self.client.get('/api/validacoes/pendentes', {'since': since})
+        self.assertNotIn('removidos', response.data)
+        self.assertEqual(len(response.data['pendentes']), 1)
+    
+    def test_paginacao(self):
+        novo = self.criar_mao_obra(self.obra, '2025-01-02')
+        vistos, sincronizacoes = [], set()
+        url, params = '/api/validacoes/pendentes', {'limite': 1}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['pendentes']), 1)
+            vistos += [(item['tipo'], item['id']) for item in response.data['pendentes']]
+            sincronizacoes.add(response.data['sincronizado_em'])
+            url, params = response.data['proximo'], None
+        
+        self.assertEqual(vistos, [
+            ('mao_obra', self.registro_mao_obra.id),
+            ('equipamento', self.registro_equipamento.id),
+            ('mao_obra', novo.id),
+        ])
+        # Todas as páginas devolvem o sincronizado_em da primeira
+        self.assertEqual(len(sincronizacoes), 1)
+        
+        response = self.client.get('/api/validacoes/pendentes', {'cursor': 'x'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_parametros_invalidos(self):
+        for parametros in [
+            {'since': '2025-13-01T00:00'}, {'since': '2025-02-30T10:00:00'}, {'since': 'ontem'},
+            {'obra': 'abc'}, {'limite': '0'},
+        ]:
+            response = self.client.get('/api/validacoes/pendentes', parametros)
+            self.assertEqual(response.status_code, 400, parametros)
+            self.assertIn('error', response.data)
+    
+    def test_apenas_encarregados_e_admins(self):
+        self.client.force_authenticate(self.apontador)
+        response = self.client.get('/api/validacoes/pendentes')
+        self.assertEqual(response.status_code, 403)
+
+
+class ConditionalGetTest(CoreTestCase):
+    """ETag / Last-Modified nas listagens e detalhes de cadastros"""
+    
+    def setUp(self):
+        self.usuario = self.criar_usuario('EN001', 'encarregado')
+        self.obra = self.criar_obra()
+        self.autenticar(self.usuario)
+    
+    def test_listagem_retorna_304_ate_mudar(self):
+        response = self.client.get('/api/obras')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/obras', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        # Filtros diferentes geram outro ETag
+        response = self.client.get('/api/obras?page=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        
+        self.criar_outra_obra()
+        response = self.client.get('/api/obras', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+    
+    def test_listagem_revalida_exclusao(self):
+        outra = self.criar_outra_obra()
+        response = self.client.get('/api/obras')
+        # Listagem sem Last-Modified: If-Modified-Since não produz 304
+        self.assertNotIn('Last-Modified', response)
+        desde = http_date(timezone.now().timestamp() + 60)
+        
+        outra.delete()
+        response = self.client.get('/api/obras', HTTP_IF_MODIFIED_SINCE=desde)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+    
+    def test_detalhe_e_dependencias(self):
+        categoria = CategoriaAtividade.objects.create(nome='Terraplanagem')
+        atividade = Atividade.objects.create(
+            codigo='ATV-001', descricao='Escavação', unidade='m3',
+            preco_unitario=10, obra=self.obra, categoria=categoria
+        )
+        
+        response = self.client.get(f'/api/atividades/{atividade.id}')
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(
+            f'/api/atividades/{atividade.id}', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        
+        etag = self.client.get('/api/atividades')['ETag']
+        etag_detalhe = response['ETag']
+        categoria.nome = 'Drenagem'
+        categoria.save()
+        response = self.client.get('/api/atividades', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['categoria_nome'], 'Drenagem')
+        
+        response = self.client.get(f'/api/atividades/{atividade.id}', HTTP_IF_NONE_MATCH=etag_detalhe)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['categoria_nome'], 'Drenagem')
+
+
+class SparseFieldsetTest(CoreTestCase):
+    """?fields= / ?expand= reduzem a resposta e as consultas"""
+    
+    def setUp(self):
+        self.apontador = self.criar_usuario('AP001', 'apontador')
+        self.obra = self.criar_obra()
+        atividade = Atividade.objects.create(
+            codigo='ATV-001', descricao='Terraplanagem', unidade='m3',
+            preco_unitario=10, obra=self.obra
+        )
+        for i in range(5):
+            registro = RegistroMaoObra.objects.create(
+                apontador=self.apontador, obra=self.obra, data=f'2025-01-{i + 1:02d}',
+                hora_inicio='07:00', hora_fim='17:00', total_funcionarios=3, local='Trecho'
+            )
+            registro.funcionarios_presentes.set([self.apontador])
+            ServicoExecutado.objects.create(registro=registro, atividade=atividade, quantidade=10, unidade='m3')
+        self.autenticar(self.apontador)
+    
+    def test_campos_selecionados(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/registros-mao-obra?fields=id,data,obra_nome')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"local"', queries[-1]['sql'])
+        self.assertEqual(set(response.data['results'][0]), {'id', 'data', 'obra_nome'})
+        self.assertEqual(response.data['results'][0]['obra_nome'], 'Obra Teste')
+    
+    def test_expand_relacionamento(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/registros-mao-obra?fields=id&expand=servicos')
+        registro = response.data['results'][0]
+        self.assertEqual(set(registro), {'id', 'servicos'})
+        self.assertEqual(registro['servicos'][0]['atividade_descricao'], 'Terraplanagem')
+    
+    def test_cursor_e_detalhe(self):
+        # Página sem COUNT + prefetch dos funcionários
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/registros-mao-obra?fields=id,funcionarios_nomes&paginacao=cursor')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['funcionarios_nomes'], ['Apontador'])
+        
+        response = self.client.get(f'/api/obras/{self.obra.id}?fields=id,nome')
+        self.assertEqual(response.data, {'id': self.obra.id, 'nome': 'Obra Teste'})
+        self.assertIn('ETag', response)
+    
+    def test_campos_invalidos(self):
+        response = self.client.get('/api/registros-mao-obra?fields=id,bogus,data_x&expand=servicoz')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bogus, data_x', response.data['fields'])
+        self.assertIn('servicoz', response.data['expand'])
+        
+        response = self.client.get(f'/api/obras/{self.obra.id}?fields=nomee')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('nomee', response.data['fields'])
+    
+    def test_escrita_ignora_fields(self):
+        response = self.client.post('/api/obras?fields=id', {
+            'nome': 'Nova Obra', 'codigo': 'OBR-002', 'local': 'BR-116',
+            'km_inicial': 0, 'km_final': 5,
+            'data_inicio': '2025-01-01', 'data_prevista_fim': '2025-12-31'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['nome'], 'Nova Obra')
+
+
+class FastJSONTest(CoreTestCase):
+    """FastJSONRenderer/FastJSONParser devem ser indistinguíveis dos padrões do DRF"""
+    
+    dados = [
+        {'valor': Decimal('12.50'), 'data': date(2025, 1, 2), 'nome': 'Pá carregadeira ção'},
+        {'criado': timezone.now(), 'hora': datetime.time(datetime(2025, 1, 1, 7, 30, 15, 123456))},
+        {'texto': 'linha\u2028separada\u2029', 1: 'chave inteira'},
+        {'grande': 2 ** 70},
+        {'float': 1e16, 'pequeno': 1e-5, 'normal': 8.25, 'lista': (1, None, True)},
+        {'progresso': 4.4771168669661275e-05, 'negativo': -5e-05, 'limite': 1e-4, 'mais': 10.00001},
+        {'minimo': 1e-5}, {'zero': 0.0, 'texto': '0.00001'},
+        [{'duracao': timedelta(hours=8)}, ReturnDict({'a': 1}, serializer=None), ReturnList([1, 2], serializer=None)],
+    ]
+    
+    def test_renderer_igual_ao_padrao(self):
+        for dado in self.dados:
+            self.assertEqual(FastJSONRenderer().render(dado), JSONRenderer().render(dado))
+            self.assertEqual(
+                FastJSONRenderer().render(dado, 'application/json; indent=4'),
+                JSONRenderer().render(dado, 'application/json; indent=4')
+            )
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.dados[0]), JSONRenderer().render(self.dados[0]))
+    
+    def test_nan_como_null(self):
+        # Mudança deliberada: o orjson grava null onde o padrão levanta erro
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'horas': float('nan')})
+        if orjson is not None:
+            self.assertEqual(FastJSONRenderer().render({'horas': float('inf')}), b'{"horas":null}')
+    
+    def test_parser_igual_ao_padrao(self):
+        for corpo in [b'{"a": [1, 2.5, "\\u00e7"], "b": null}', b'{"big": 123456789012345678901234}', b'"\\ud800"']:
+            self.assertEqual(
+                FastJSONParser().parse(io.BytesIO(corpo)), JSONParser().parse(io.BytesIO(corpo))
+            )
+        for corpo in [b'{"a": NaN}', b'{invalido']:
+            with self.assertRaises(ParseError) as esperado:
+                JSONParser().parse(io.BytesIO(corpo))
+            with self.assertRaisesMessage(ParseError, str(esperado.exception)):
+                FastJSONParser().parse(io.BytesIO(corpo))
+    
+    def test_api_usa_renderer(self):
+        self.autenticar(self.criar_usuario('EN001', 'encarregado'))
+        response = self.client.post('/api/categorias-atividades', {'nome': 'Drenagem'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+class LoginTest(CoreTestCase):
+    """Login com recálculo do hash e limite de tentativas"""
+    
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(
+            matricula='MT001', nome='Motorista', tipo_usuario='motorista'
+        )
+        # Senha gravada com o hasher anterior (PBKDF2)
+        Usuario.objects.filter(pk=self.usuario.pk).update(
+            password=make_password('senha123', hasher='pbkdf2_sha256')
+        )
+        self.client = APIClient()
+    
+    def login(self, password='senha123', matricula='MT001'):
+        return self.client.post(
+            '/api/auth/login', {'matricula': matricula, 'password': password}, format='json'
+        )
+    
+    def test_rehash_e_uma_consulta(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data['tokens'])
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.password.startswith('scrypt$'))
+        
+        # Uma única leitura do usuário, pela matrícula
+        with CaptureQueriesContext(connection) as queries:
+            response = self.login()
+        self.assertEqual(response.status_code, 200)
+        consultas = [q['sql'] for q in queries if 'FROM "core_usuario"' in q['sql']]
+        self.assertEqual(len(consultas), 1)
+        self.assertIn('"core_usuario"."matricula" =', consultas[0])
+    
+    def test_senha_alterada_em_outro_processo(self):
+        # update() não dispara signals, como uma alteração feita em outro worker
+        self.assertEqual(self.login().status_code, 200)
+        Usuario.objects.filter(pk=self.usuario.pk).update(password=make_password('nova-senha'))
+        self.assertEqual(self.login().status_code, 400)
+        self.assertEqual(self.login('nova-senha').status_code, 200)
+        
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        self.assertEqual(self.login('nova-senha').status_code, 400)
+    
+    def test_alteracao_vale_no_proximo_login(self):
+        self.login()
+        self.usuario.refresh_from_db()
+        self.usuario.set_password('nova-senha')
+        self.usuario.save()
+        self.assertEqual(self.login().status_code, 400)
+        self.assertEqual(self.login('nova-senha').status_code, 200)
+        
+        self.usuario.matricula = 'MT002'
+        self.usuario.save()
+        self.assertEqual(self.login('nova-senha').status_code, 400)
+        self.assertEqual(self.login('nova-senha', matricula='MT002').status_code, 200)
+    
+    @override_settings(LOGIN_MAX_FALHAS=3)
+    def test_limite_de_falhas_antes_do_hash(self):
+        for _ in range(3):
+            self.assertEqual(self.login('errada').status_code, 400)
+        
+        with mock.patch.object(Usuario, 'check_password') as check_password:
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        check_password.assert_not_called()
+        
+        # Outros usuários não são afetados
+        self.criar_usuario('MT003', 'motorista', nome='Outro')
+        self.assertEqual(self.login(matricula='MT003').status_code, 200)
+
+
+class UsuarioJWTAuthenticationTest(CoreTestCase):
+    """Autenticação pelas claims do token, sem consultar o usuário a cada requisição"""
+    
+    def setUp(self):
+        cache.clear()
+        self.usuario = self.criar_usuario('EN001', 'encarregado', email='enc@tcc.com')
+        self.obra = self.criar_obra(responsavel=self.usuario)
+        self.registro = RegistroMaoObra.objects.create(
+            apontador=self.usuario, obra=self.obra, data='2025-01-02',
+            hora_inicio='07:00', hora_fim='17:00', total_funcionarios=3, local='Trecho'
+        )
+        response = APIClient().post(
+            '/api/auth/login', {'matricula': 'EN001', 'password': 'senha123'}, format='json'
+        )
+        self.tokens = response.data['tokens']
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['tokens']['access']}")
+    
+    def test_outstanding_token_igual_ao_entregue(self):
+        # O refresh gravado já contém as claims de perfil
+        self.assertEqual(OutstandingToken.objects.get().token, self.tokens['refresh'])
+    
+    def consultas_usuario(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, len([q for q in queries if 'FROM "core_usuario"' in q['sql']])
+    
+    def test_sem_consulta_por_requisicao(self):
+        # Apenas a primeira requisição confere o estado do usuário
+        response, consultas = self.consultas_usuario('/api/validacoes/pendentes')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, 1)
+        self.assertEqual(response.data['pendentes'][0]['id'], self.registro.id)
+        
+        response, consultas = self.consultas_usuario('/api/dashboard/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, 0)
+        
+        response = self.client.post(f'/api/registros-mao-obra/{self.registro.id}/validar')
+        self.assertEqual(response.status_code, 200)
+        self.registro.refresh_from_db()
+        self.assertEqual(self.registro.validado_por, self.usuario)
+    
+    @override_settings(JWT_USUARIO_CACHE_TIMEOUT=0)
+    def test_somente_claims(self):
+        response, consultas = self.consultas_usuario('/api/dashboard/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(consultas, 0)
+        
+        # O modelo completo é carregado quando a view precisa dele
+        response, consultas = self.consultas_usuario('/api/auth/me')
+        self.assertEqual(response.data['email'], 'enc@tcc.com')
+        self.assertEqual(consultas, 1)
+    
+    def test_usuario_desativado(self):
+        self.assertEqual(self.client.get('/api/dashboard/stats').status_code, 200)
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.client.get('/api/dashboard/stats').status_code, 401)
+
+
+class TokenRevogacaoTest(CoreTestCase):
+    """Refresh/logout com revogação pelo filtro em memória e limpeza de tokens expirados"""
+    
+    def setUp(self):
+        cache.clear()
+        reiniciar_frente()
+        self.criar_usuario('MOT001', 'motorista')
+        response = APIClient().post(
+            '/api/auth/login', {'matricula': 'MOT001', 'password': 'senha123'}, format='json'
+        )
+        self.tokens = response.data['tokens']
+        self.client = APIClient()
+    
+    def refresh(self, token):
+        return self.client.post('/api/auth/refresh', {'refresh': token}, format='json')
+    
+    def test_refresh_com_rotacao(self):
+        response = self.refresh(self.tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertNotEqual(response.data['refresh'], self.tokens['refresh'])
+        
+        # O refresh usado foi revogado; o novo continua válido
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+    
+    def test_logout_revoga_refresh(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        response = self.client.post('/api/auth/logout', {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+    
+    @override_settings(TOKEN_REVOGACAO_SINCRONIZACAO=60)
+    def test_consulta_sem_banco(self):
+        self.assertFalse(token_revogado('jti-inexistente'))
+        # Com o filtro carregado, um jti não revogado não consulta o banco
+        with self.assertNumQueries(0):
+            self.assertFalse(token_revogado('outro-jti'))
+        
+        # Revogações de outros processos entram na próxima sincronização
+        token = OutstandingToken.objects.get()
+        BlacklistedToken.objects.create(token=token)
+        with override_settings(TOKEN_REVOGACAO_SINCRONIZACAO=0):
+            self.assertTrue(token_revogado(token.jti))
+    
+    @override_settings(TOKEN_REVOGACAO_SINCRONIZACAO=0)
+    def test_revogacao_com_commit_atrasado(self):
+        amanha = timezone.now() + timedelta(days=1)
+        primeiro, atrasado = OutstandingToken.objects.bulk_create([
+            OutstandingToken(jti=f'jti-{i}', token='x', expires_at=amanha) for i in range(2)
+        ])
+        BlacklistedToken.objects.create(id=100, token=primeiro)
+        self.assertTrue(token_revogado('jti-0'))
+        self.assertFalse(token_revogado('jti-1'))
+        
+        # Id menor que o último lido, visível só depois (transação lenta)
+        BlacklistedToken.objects.create(id=50, token=atrasado)
+        self.assertTrue(token_revogado('jti-1'))
+    
+    @override_settings(TOKEN_LIMPEZA_INTERVALO=3600)
+    def test_limpeza_periodica_iniciada_uma_vez_por_processo(self):
+        with mock.patch('core.revogacao._limpeza_pid', None), \
+                mock.patch('core.revogacao.threading.Thread') as thread:
+            # A consulta de revogação não inicia nada
+            token_revogado('jti-inexistente')
+            thread.assert_not_called()
+            
+            # A primeira requisição do processo inicia a thread
+            self.client.get('/api/auth/me')
+            self.assertFalse(iniciar_limpeza_periodica())
+            thread.assert_called_once()
+            self.assertTrue(thread.call_args.kwargs['daemon'])
+            
+            # Worker criado por fork herda a marca do mestre, mas não a thread
+            with mock.patch('core.revogacao.os.getpid', return_value=os.getpid() + 1):
+                self.assertTrue(iniciar_limpeza_periodica())
+            self.assertEqual(thread.call_count, 2)
+        
+        with mock.patch('core.revogacao._limpeza_pid', None), \
+                override_settings(TOKEN_LIMPEZA_INTERVALO=0):
+            self.assertFalse(iniciar_limpeza_periodica())
+    
+    def test_limpeza_em_lotes(self):
+        ontem = timezone.now() - timedelta(days=1)
+        expirados = OutstandingToken.objects.bulk_create([
+            OutstandingToken(jti=f'expirado-{i}', token='x', expires_at=ontem) for i in range(5)
+        ])
+        BlacklistedToken.objects.create(token=expirados[0])
+        
+        saida = io.StringIO()
+        call_command('limpar_tokens', '--lote', '2', stdout=saida)
+        self.assertIn('5 token(s)', saida.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class ImportacaoLotesTest(CoreTestCase):
+    """Gravação em lotes: erros de linha não abrem transação; erros do banco são isolados por bisseção"""
+    
+    def setUp(self):
+        self.apontador = self.criar_usuario('AP001', 'apontador')
+        self.obra = self.criar_obra()
+    
+    def test_linhas_invalidas_sem_bissecao(self):
+        linhas = ['AP001,OBR-001,01/02/2025,5,07:00,17:00,Trecho']
+        linhas += [f'AP001,OBR-999,{dia:02d}/02/2025,5,07:00,17:00,Trecho' for dia in range(2, 16)]
+        linhas += [f'AP001,OBR-001,{dia:02d}/02/2025,cinco,07:00,17:00,Trecho' for dia in range(16, 29)]
+        csv = 'apontador_matricula,obra_codigo,data,total_funcionarios,hora_inicio,hora_fim,local\n'
+        csv += '\n'.join(linhas) + '\n'
+        
+        with CaptureQueriesContext(connection) as queries:
+            result = RegistroMaoObraCSVImporter(io.BytesIO(csv.encode('utf-8'))).import_data()
+        self.assertEqual((result['success'], result['errors']), (1, 27))
+        self.assertEqual(result['error_details'][0]['row'], 3)
+        self.assertIn('OBR-999', result['error_details'][0]['error'])
+        # Só a linha válida chega ao banco, sem reprocessar o lote
+        gravacoes = [q for q in queries if 'core_registromaoobra' in q['sql']]
+        self.assertEqual(len(gravacoes), 2)
+        self.assertLess(len(queries), 15)
+    
+    def test_bissecao_isola_erro_do_banco(self):
+        # A 3ª linha repete o email da 2ª: só o banco percebe (unique)
+        csv = (
+            'nome,email,matricula,cpf,tipo_usuario,funcao\n'
+            'Motorista 1,,MT001,111,motorista,motorista\n'
+            'Motorista 2,m@tcc.com,MT002,222,motorista,motorista\n'
+            'Motorista 3,m@tcc.com,MT003,333,motorista,motorista\n'
+            'Motorista 4,,MT004,444,motorista,motorista\n'
+        )
+        result = UsuarioCSVImporter(io.BytesIO(csv.encode('utf-8'))).import_data()
+        self.assertEqual((result['success'], result['errors']), (3, 1))
+        self.assertEqual(result['error_details'][0]['row'], 4)
+        self.assertEqual(
+            set(Usuario.objects.filter(tipo_usuario='motorista').values_list('matricula', flat=True)),
+            {'MT001', 'MT002', 'MT004'}
+        )
+
+
+class ImportadoresCSVTest(CoreTestCase):
+    """Comportamento dos importadores: relatório por linha, encoding, referências, ZIP e dry_run"""
+    
+    def setUp(self):
+        self.motorista = self.criar_usuario('MOT001', 'motorista')
+        self.apontador = self.criar_usuario('AP001', 'apontador')
+        self.obra = self.criar_obra()
+        self.equipamento = self.criar_equipamento(self.obra)
+    
+    def importar(self, importer_class, csv, encoding='utf-8', **kwargs):
+        return importer_class(io.BytesIO(csv.encode(encoding)), **kwargs).import_data()
+    
+    def test_erros_por_linha(self):
+        csv = (
+            'nome,tipo,modelo,placa,fabricante,ano,horimetro_atual,status,obra_codigo\n'
+            'Escavadeira,escavadeira,320,EXC0001,CAT,2019,100,ativo,OBR-001\n'
+            'Rolo,,CA250,ROL0001,Dynapac,2018,50,ativo,OBR-001\n'
+            'Trator,trator,D6,TRA0001,CAT,dois mil,10,ativo,OBR-001\n'
+            'Pá,carregadeira,950,PAC0001,CAT,2021,0,ativo,\n'
+        )
+        result = self.importar(EquipamentoCSVImporter, csv)
+        self.assertEqual((result['success'], result['errors'], result['skipped'], result['total']), (2, 2, 2, 4))
+        self.assertEqual([erro['row'] for erro in result['error_details']], [3, 4])
+        self.assertEqual(result['error_details'][0]['error'], 'Campo obrigatório ausente: tipo')
+        self.assertIn('dois mil', result['error_details'][1]['error'])
+        self.assertIsNone(Equipamento.objects.get(placa='PAC0001').obra)
+    
+    def test_latin1_e_utf8_com_bom(self):
+        csv = (
+            'codigo,nome,local,km_inicial,km_final,data_inicio,data_prevista_fim\n'
+            '{codigo},Duplicação São João,Região Sul,"0,5",10,01/01/2025,31/12/2025\n'
+        )
+        for codigo, encoding in [('OBR-LAT', 'latin-1'), ('OBR-BOM', 'utf-8-sig')]:
+            result = self.importar(ObraCSVImporter, csv.format(codigo=codigo), encoding)
+            self.assertEqual((result['success'], result['errors']), (1, 0), encoding)
+            obra = Obra.objects.get(codigo=codigo)
+            self.assertEqual((obra.nome, obra.local), ('Duplicação São João', 'Região Sul'))
+            self.assertEqual(obra.km_inicial, Decimal('0.5'))
+    
+    def test_referencias_com_uma_consulta_por_tabela(self):
+        self.criar_usuario('MOT002', 'motorista', nome='Motorista 2')
+        cabecalho = (
+            'equipamento_placa,motorista_matricula,data,horimetro_inicial,horimetro_final,'
+            'hora_inicio,hora_fim,atividade_principal,local\n'
+        )
+        
+        def gerar(linhas):
+            return cabecalho + ''.join(
+                f'{placa},MOT00{i % 2 + 1},{i % 28 + 1:02d}/02/2025,100,108,07:00,15:00,Transporte,Trecho\n'
+                for i, placa in enumerate(['ABC1234', 'XYZ9999'] * (linhas // 2))
+            )
+        
+        # Equipamentos e motoristas, existentes ou não: uma consulta por tabela
+        for linhas in (10, 200):
+            with self.assertNumQueries(2):
+                result = self.importar(RegistroEquipamentoCSVImporter, gerar(linhas), dry_run=True)
+            self.assertEqual((result['success'], result['errors']), (linhas // 2, linhas // 2))
+            self.assertIn('XYZ9999', result['error_details'][0]['error'])
+    
+    def test_falha_nos_resumos_nao_regrava_o_lote(self):
+        csv = (
+            'equipamento_placa,motorista_matricula,data,horimetro_inicial,horimetro_final,'
+            'hora_inicio,hora_fim,atividade_principal,local\n'
+        ) + ''.join(
+            f'ABC1234,MOT001,{dia:02d}/02/2025,100,108,07:00,15:00,Transporte,Trecho\n' for dia in range(1, 6)
+        )
+        with mock.patch('core.importers.atualizar_resumos', side_effect=RuntimeError('resumos')), \
+                mock.patch.object(RegistroEquipamento.objects, 'update_or_create') as update_or_create:
+            with self.assertRaises(RuntimeError):
+                self.importar(RegistroEquipamentoCSVImporter, csv)
+        update_or_create.assert_not_called()
+        self.assertEqual(RegistroEquipamento.objects.count(), 5)
+    
+    def test_lote_recusado_grava_linha_a_linha(self):
+        csv = (
+            'equipamento_placa,motorista_matricula,data,horimetro_inicial,horimetro_final,'
+            'hora_inicio,hora_fim,atividade_principal,local\n'
+            'ABC1234,MOT001,01/02/2025,100,108,07:00,15:00,Transporte,Trecho\n'
+            'ABC1234,MOT001,02/02/2025,100,108,07:00,15:00,Transporte,Trecho\n'
+        )
+        with mock.patch.object(RegistroEquipamento.objects, 'bulk_create', side_effect=RuntimeError('lote')), \
+                mock.patch.object(
+                    RegistroEquipamentoCSVImporter, 'process_row',
+                    autospec=True, side_effect=RegistroEquipamentoCSVImporter.process_row
+                ) as process_row:
+            result = self.importar(RegistroEquipamentoCSVImporter, csv)
+        self.assertEqual((result['success'], result['errors']), (2, 0))
+        self.assertEqual(process_row.call_count, 2)
+        self.assertEqual(ResumoDiarioEquipamento.objects.count(), 2)
+    
+    def test_funcionarios_presentes_e_reimportacao(self):
+        funcionarios = [
+            self.criar_usuario(f'F{i:03d}', 'motorista', nome=f'Funcionário {i}')
+            for i in range(4)
+        ]
+        cabecalho = (
+            'apontador_matricula,obra_codigo,data,total_funcionarios,hora_inicio,hora_fim,local,'
+            'funcionarios_matriculas\n'
+        )
+        csv = cabecalho + (
+            'AP001,OBR-001,01/02/2025,2,07:00,17:00,Trecho,F000;F001\n'
+            'AP001,OBR-001,02/02/2025,2,07:00,17:00,Trecho,F001;F002;NAO-EXISTE\n'
+            # Mesmo registro repetido no arquivo: vale a última linha
+            'AP001,OBR-001,02/02/2025,2,07:00,17:00,Trecho,F002;F003\n'
+        )
+        result = self.importar(RegistroMaoObraCSVImporter, csv)
+        self.assertEqual((result['success'], result['errors']), (3, 0))
+        
+        def presentes(dia):
+            registro = RegistroMaoObra.objects.get(obra=self.obra, data=f'2025-02-{dia:02d}')
+            return set(registro.funcionarios_presentes.values_list('matricula', flat=True))
+        
+        self.assertEqual(RegistroMaoObra.objects.count(), 2)
+        self.assertEqual(presentes(1), {'F000', 'F001'})
+        self.assertEqual(presentes(2), {'F002', 'F003'})
+        
+        # Reimportar substitui a lista (mesma semântica do .set())
+        csv = cabecalho + 'AP001,OBR-001,01/02/2025,2,07:00,17:00,Trecho,F001;F003\n'
+        self.importar(RegistroMaoObraCSVImporter, csv)
+        self.assertEqual(presentes(1), {'F001', 'F003'})
+        self.assertEqual(presentes(2), {'F002', 'F003'})
+        self.assertEqual(RegistroMaoObra.funcionarios_presentes.through.objects.count(), 4)
+    
+    def test_zip_respeita_dependencias(self):
+        arquivos = {
+            'exemplo_registros_equipamentos.csv': (
+                'equipamento_placa,motorista_matricula,data,horimetro_inicial,horimetro_final,'
+                'hora_inicio,hora_fim,atividade_principal,local\n'
+                'NOV0001,MOT100,01/02/2025,10,18,07:00,15:00,Transporte,Trecho\n'
+            ),
+            'equipamentos.csv': (
+                'nome,tipo,modelo,placa,fabricante,ano,horimetro_atual,status,obra_codigo,motorista_matricula\n'
+                'Caminhão Novo,caminhao,Atego,NOV0001,Mercedes,2024,0,ativo,OBR-NOVA,MOT100\n'
+            ),
+            'obras.csv': (
+                'codigo,nome,local,km_inicial,km_final,data_inicio,data_prevista_fim,responsavel_email\n'
+                'OBR-NOVA,Obra Nova,BR-116,0,5,01/01/2025,31/12/2025,resp@tcc.com\n'
+            ),
+            'usuarios.csv': (
+                'nome,email,matricula,cpf,tipo_usuario,funcao\n'
+                'Responsável,resp@tcc.com,ENC100,100,encarregado,encarregado\n'
+                'Motorista Novo,,MOT100,101,motorista,motorista\n'
+            ),
+        }
+        arquivo_zip = io.BytesIO()
+        with zipfile.ZipFile(arquivo_zip, 'w') as archive:
+            for nome, conteudo in arquivos.items():
+                archive.writestr(nome, conteudo)
+        arquivo_zip.seek(0)
+        
+        result = MultiCSVImporter(arquivo_zip).import_data()
+        self.assertEqual(result['ordem'], ['usuarios', 'obras', 'equipamentos', 'registros_equipamentos'])
+        self.assertEqual((result['success'], result['errors'], result['total']), (5, 0, 5))
+        self.assertEqual(result['arquivos']['registros_equipamentos']['arquivo'], 'exemplo_registros_equipamentos.csv')
+        
+        registro = RegistroEquipamento.objects.select_related('equipamento__obra__responsavel').get()
+        self.assertEqual(registro.equipamento.obra.responsavel.matricula, 'ENC100')
+        self.assertEqual(registro.motorista.matricula, 'MOT100')
+    
+    def test_dry_run_nao_grava(self):
+        csv = (
+            'apontador_matricula,obra_codigo,data,total_funcionarios,hora_inicio,hora_fim,local,'
+            'funcionarios_matriculas\n'
+            'AP001,OBR-001,01/02/2025,2,07:00,17:00,Trecho,MOT001\n'
+            'AP001,OBR-999,02/02/2025,2,07:00,17:00,Trecho,\n'
+            'AP001,OBR-001,03/02/2025,,07:00,17:00,Trecho,\n'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            result = self.importar(RegistroMaoObraCSVImporter, csv, dry_run=True)
+        
+        self.assertTrue(result['dry_run'])
+        self.assertEqual((result['success'], result['errors'], result['total']), (1, 2, 3))
+        self.assertEqual([erro['row'] for erro in result['error_details']], [3, 4])
+        self.assertFalse([q['sql'] for q in queries if not q['sql'].startswith('SELECT')])
+        self.assertFalse(RegistroMaoObra.objects.exists())
+
+
+class ExportarCSVTest(CoreTestCase):
+    """A exportação em streaming produz o mesmo CSV da versão que serializava instância por instância"""
+    
+    def setUp(self):
+        self.encarregado = self.criar_usuario('EN001', 'encarregado')
+        self.motorista = self.criar_usuario('MOT001', 'motorista')
+        self.obra = self.criar_obra(km_final=Decimal('10.5'), responsavel=self.encarregado)
+        self.criar_outra_obra(
+            nome='Obra "Sem" Responsável, Ltda', km_inicial=3, km_final=8,
+            data_inicio='2025-02-01', data_prevista_fim='2025-10-31'
+        )
+        self.equipamento = self.criar_equipamento(self.obra, horimetro_atual=Decimal('1234.5'))
+        Equipamento.objects.create(
+            nome='Rolo', tipo='rolo', modelo='CA250', placa='ROL0001', fabricante='Dynapac', ano=2018
+        )
+        for dia in range(1, 4):
+            RegistroEquipamento.objects.create(
+                equipamento=self.equipamento, motorista=self.motorista,
+                data=f'2025-01-{dia:02d}', horimetro_inicial=100, horimetro_final=Decimal('108.5'),
+                hora_inicio='07:00', hora_fim=f'15:{dia * 10}', atividade_principal='Transporte',
+                local='Trecho', validado=dia == 2
+            )
+            RegistroMaoObra.objects.create(
+                apontador=self.encarregado, obra=self.obra, data=f'2025-01-{dia:02d}',
+                hora_inicio='07:00', hora_fim='17:00', total_funcionarios=dia, local='Trecho'
+            )
+            DiarioObra.objects.create(
+                encarregado=self.encarregado, obra=self.obra, data=f'2025-01-{dia:02d}',
+                total_funcionarios=5, funcionarios_presentes=4, atividades_concluidas=dia,
+                condicoes_climaticas='Sol', observacoes='Linha 1\nLinha 2'
+            )
+        self.autenticar(self.encarregado)
+    
+    def exportar_antigo(self, tipo, **filtros):
+        """Saída da exportação anterior, que percorria as instâncias dos modelos"""
+        saida = io.StringIO()
+        saida.write('\ufeff')
+        writer = csv.writer(saida)
+        obra_id = filtros.get('obra')
+        data_inicio = filtros.get('data_inicio')
+        
+        if tipo == 'obras':
+            writer.writerow(['Código', 'Nome', 'Local', 'KM Inicial', 'KM Final', 'Data Início', 'Data Fim', 'Responsável', 'Status'])
+            for obra in Obra.objects.all():
+                writer.writerow([
+                    obra.codigo, obra.nome, obra.local, obra.km_inicial, obra.km_final,
+                    obra.data_inicio.strftime('%d/%m/%Y'), obra.data_prevista_fim.strftime('%d/%m/%Y'),
+                    obra.responsavel.nome if obra.responsavel else '', obra.status
+                ])
+        elif tipo == 'equipamentos':
+            writer.writerow(['Nome', 'Tipo', 'Modelo', 'Placa', 'Fabricante', 'Ano', 'Horímetro', 'Status', 'Obra'])
+            for eq in Equipamento.objects.all():
+                writer.writerow([
+                    eq.nome, eq.tipo, eq.modelo, eq.placa, eq.fabricante, eq.ano,
+                    eq.horimetro_atual, eq.status, eq.obra.nome if eq.obra else ''
+                ])
+        elif tipo == 'registros_equipamentos':
+            writer.writerow(['Data', 'Equipamento', 'Motorista', 'Horímetro Inicial', 'Horímetro Final', 'Horas Trabalhadas', 'Atividade', 'Local', 'Validado'])
+            registros = RegistroEquipamento.objects.filter(equipamento__obra_id=obra_id)
+            if data_inicio:
+                registros = registros.filter(data__gte=data_inicio)
+            for reg in registros:
+                writer.writerow([
+                    reg.data.strftime('%d/%m/%Y'), reg.equipamento.nome, reg.motorista.nome,
+                    reg.horimetro_inicial, reg.horimetro_final, reg.horas_trabalhadas,
+                    reg.atividade_principal, reg.local, 'Sim' if reg.validado else 'Não'
+                ])
+        elif tipo == 'registros_mao_obra':
+            writer.writerow(['Data', 'Obra', 'Apontador', 'Total Funcionários', 'Hora Início', 'Hora Fim', 'Local', 'Validado'])
+            for reg in RegistroMaoObra.objects.all():
+                writer.writerow([
+                    reg.data.strftime('%d/%m/%Y'), reg.obra.nome, reg.apontador.nome, reg.total_funcionarios,
+                    reg.hora_inicio.strftime('%H:%M'), reg.hora_fim.strftime('%H:%M'), reg.local,
+                    'Sim' if reg.validado else 'Não'
+                ])
+        elif tipo == 'diarios_obra':
+            writer.writerow(['Data', 'Obra', 'Encarregado', 'Total Func.', 'Presentes', 'Ativ. Concluídas', 'Condições', 'Observações'])
+            for diario in DiarioObra.objects.all():
+                writer.writerow([
+                    diario.data.strftime('%d/%m/%Y'), diario.obra.nome, diario.encarregado.nome,
+                    diario.total_funcionarios, diario.funcionarios_presentes, diario.atividades_concluidas,
+                    diario.condicoes_climaticas, diario.observacoes
+                ])
+        return saida.getvalue()
+    
+    def exportar(self, tipo, **filtros):
+        response = self.client.get(f'/api/exportar-csv/{tipo}', filtros)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        return b''.join(response.streaming_content).decode('utf-8')
+    
+    def test_mesma_saida_da_exportacao_anterior(self):
+        for tipo in ['obras', 'equipamentos', 'registros_mao_obra', 'diarios_obra']:
+            self.assertEqual(self.exportar(tipo), self.exportar_antigo(tipo), tipo)
+        
+        filtros = {'obra': self.obra.id, 'data_inicio': '2025-01-02'}
+        self.assertEqual(
+            self.exportar('registros_equipamentos', **filtros),
+            self.exportar_antigo('registros_equipamentos', **filtros)
+        )
+    
+    def test_consultas_nao_crescem_com_as_linhas(self):
+        with self.assertNumQueries(1):
+            conteudo = self.exportar('registros_equipamentos')
+        self.assertEqual(len(conteudo.splitlines()), 4)
+        self.assertEqual(self.client.get('/api/exportar-csv/invalido').status_code, 400)
+
+
+class ImportacaoJobTest(CoreTestCase):
+    """Importação em segundo plano: agendamento, execução única, progresso e jobs interrompidos"""
+    
+    CSV = (
+        'nome,email,matricula,cpf,tipo_usuario,funcao\n'
+        'Motorista 1,,MT001,111,motorista,motorista\n'
+        'Motorista 2,,MT002,222,motorista,motorista\n'
+    )
+    
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        
+        self.encarregado = self.criar_usuario('EN001', 'encarregado')
+        self.autenticar(self.encarregado)
+    
+    def enviar(self):
+        arquivo = SimpleUploadedFile('usuarios.csv', self.CSV.encode('utf-8'), content_type='text/csv')
+        with mock.patch('core.jobs.get_executor') as get_executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/importar-csv', {'tipo': 'usuarios', 'arquivo': arquivo})
+        return response, get_executor.return_value.submit
+    
+    def test_agendamento_e_execucao_unica(self):
+        response, submit = self.enviar()
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['importacao']['id']
+        self.assertEqual(response.data['importacao']['status'], 'pendente')
+        # O job só vai para o pool depois do commit
+        submit.assert_called_once()
+        self.assertEqual(submit.call_args.args[1], job_id)
+        
+        self.assertTrue(run_job(job_id))
+        self.assertFalse(run_job(job_id))
+        self.assertEqual(run_pending_jobs(), 0)
+        
+        response = self.client.get(f'/api/importar-csv/{job_id}')
+        self.assertEqual(response.data['status'], 'concluida')
+        self.assertEqual(response.data['sucesso'], 2)
+        self.assertEqual(response.data['progresso'], 1.0)
+        self.assertEqual(response.data['resultado']['total'], 2)
+    
+    def test_arquivo_apagado_ao_finalizar(self):
+        response, submit = self.enviar()
+        job = ImportacaoCSV.objects.get(pk=response.data['importacao']['id'])
+        caminho = job.arquivo.path
+        self.assertTrue(os.path.exists(caminho))
+        
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'concluida')
+        self.assertFalse(job.arquivo)
+        self.assertFalse(os.path.exists(caminho))
+        
+        # Também em caso de erro e de job interrompido
+        response, submit = self.enviar()
+        job = ImportacaoCSV.objects.get(pk=response.data['importacao']['id'])
+        caminho = job.arquivo.path
+        with mock.patch('core.jobs.get_importer', side_effect=ValueError('falhou')):
+            run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'erro')
+        self.assertFalse(os.path.exists(caminho))
+        
+        response, submit = self.enviar()
+        job = ImportacaoCSV.objects.get(pk=response.data['importacao']['id'])
+        caminho = job.arquivo.path
+        ImportacaoCSV.objects.filter(pk=job.pk).update(
+            status='processando', updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(fail_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertFalse(job.arquivo)
+        self.assertFalse(os.path.exists(caminho))
+    
+    def test_progresso_e_eta(self):
+        job = ImportacaoCSV.objects.create(
+            tipo='usuarios', arquivo='x.csv', tamanho_arquivo=100, usuario=self.encarregado,
+            status='processando', iniciado_em=timezone.now() - timedelta(seconds=60)
+        )
+        importer = mock.Mock(total_count=40, bytes_read=25, success_count=39, errors=[{}], skip_count=1)
+        reporter = ProgressReporter(job.pk, interval=60)
+        reporter(importer)
+        importer.bytes_read = 50
+        reporter(importer)  # Dentro do intervalo: não grava
+        
+        job.refresh_from_db()
+        self.assertEqual((job.linhas_processadas, job.sucesso, job.erros), (40, 39, 1))
+        self.assertEqual(job.progresso, 0.25)
+        self.assertAlmostEqual(job.eta_segundos, 180, delta=1)
+    
+    def test_job_interrompido(self):
+        job = ImportacaoCSV.objects.create(
+            tipo='usuarios', arquivo='x.csv', usuario=self.encarregado,
+            status='processando', iniciado_em=timezone.now()
+        )
+        self.assertEqual(self.client.get(f'/api/importar-csv/{job.pk}').data['status'], 'processando')
+        
+        ImportacaoCSV.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        response = self.client.get(f'/api/importar-csv/{job.pk}')
+        self.assertEqual(response.data['status'], 'erro')
+        self.assertIn('interrompida', response.data['mensagem_erro'])
+    
+    def test_status_apenas_do_proprio_usuario(self):
+        response, submit = self.enviar()
+        job_id = response.data['importacao']['id']
+        
+        outro = self.criar_usuario('EN002', 'encarregado', nome='Outro')
+        self.client.force_authenticate(outro)
+        self.assertEqual(self.client.get(f'/api/importar-csv/{job_id}').status_code, 404)
+        
+        admin = Usuario.objects.create_user(
+            email='admin@tcc.com', nome='Admin', tipo_usuario='admin', password='senha123'
+        )
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(f'/api/importar-csv/{job_id}').status_code, 200)
@@ -6,6 +6,7 @@ urlpatterns = [
     path('auth/registro', views.RegistroView.as_view(), name='registro'),
     path('auth/login', views.LoginView.as_view(), name='login'),
     path('auth/logout', views.LogoutView.as_view(), name='logout'),
+    path('auth/refresh', views.RefreshView.as_view(), name='refresh'),
     path('auth/me', views.MeView.as_view(), name='me'),
     
     # ========== USUÁRIOS ==========
@@ -40,11 +41,16 @@ urlpatterns = [
     path('registros-equipamentos', views.RegistroEquipamentoListCreateView.as_view(), name='registro-equipamento-list-create'),
     path('registros-equipamentos/<int:pk>', views.RegistroEquipamentoDetailView.as_view(), name='registro-equipamento-detail'),
     path('registros-equipamentos/<int:pk>/validar', views.ValidarRegistroEquipamentoView.as_view(), name='registro-equipamento-validar'),
+    path('registros-equipamentos/validar-lote', views.ValidarRegistroEquipamentoLoteView.as_view(), name='registro-equipamento-validar-lote'),
     
     # ========== REGISTROS DE MÃO DE OBRA ==========
     path('registros-mao-obra', views.RegistroMaoObraListCreateView.as_view(), name='registro-mao-obra-list-create'),
     path('registros-mao-obra/<int:pk>', views.RegistroMaoObraDetailView.as_view(), name='registro-mao-obra-detail'),
     path('registros-mao-obra/<int:pk>/validar', views.ValidarRegistroMaoObraView.as_view(), name='registro-mao-obra-validar'),
+    path('registros-mao-obra/validar-lote', views.ValidarRegistroMaoObraLoteView.as_view(), name='registro-mao-obra-validar-lote'),
+    
+    # ========== FILA DE VALIDAÇÃO ==========
+    path('validacoes/pendentes', views.FilaValidacaoView.as_view(), name='fila-validacao'),
     
     # ========== ATIVIDADES DA EQUIPE ==========
     path('atividades-equipe', views.AtividadeEquipeListCreateView.as_view(), name='atividade-equipe-list-create'),
@@ -56,9 +62,11 @@ urlpatterns = [
     
     # ========== DASHBOARD ==========
     path('dashboard/stats', views.DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('resumos-equipamentos', views.ResumoEquipamentosView.as_view(), name='resumos-equipamentos'),
     
     # ========== IMPORTAÇÃO/EXPORTAÇÃO CSV ==========
     path('importar-csv', views.ImportarCSVView.as_view(), name='importar-csv'),
+    path('importar-csv/<int:pk>', views.ImportacaoCSVStatusView.as_view(), name='importar-csv-status'),
     path('modelo-csv/<str:tipo>', views.DownloadModeloCSVView.as_view(), name='modelo-csv'),
     path('exportar-csv/<str:tipo>', views.ExportarCSVView.as_view(), name='exportar-csv'),
 ]
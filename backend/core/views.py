@@ -1,25 +1,45 @@
+import base64
+import json
+from collections.abc import Mapping
+
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_simplejwt.views import TokenRefreshView
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.cache import cache
+from django.db.models import Count, F, Prefetch, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.core.files import File
+from django.db import transaction
 from django.utils import timezone
 
 from .models import (
     Usuario, Obra, Equipamento, Contrato, CriterioMedicao,
     CategoriaAtividade, Atividade, RegistroEquipamento,
-    RegistroMaoObra, ServicoExecutado, AtividadeEquipe, DiarioObra
+    RegistroMaoObra, ServicoExecutado, AtividadeEquipe, DiarioObra,
+    ImportacaoCSV, ResumoDiarioEquipamento, ResumoMensalEquipamento, RegistroRemovido
 )
 from .serializers import (
-    UsuarioSerializer, LoginSerializer, RegistroSerializer,
+    UsuarioSerializer, LoginSerializer, RefreshSerializer, RegistroSerializer,
     ObraSerializer, EquipamentoSerializer, ContratoSerializer,
     CriterioMedicaoSerializer, CategoriaAtividadeSerializer,
     AtividadeSerializer, RegistroEquipamentoSerializer,
     RegistroMaoObraSerializer, ServicoExecutadoSerializer,
-    AtividadeEquipeSerializer, DiarioObraSerializer
+    AtividadeEquipeSerializer, DiarioObraSerializer, ImportacaoCSVSerializer
 )
-from .importers import get_importer, CSVImportError
+from .authentication import UsuarioRefreshToken, get_usuario
+from .importers import get_importer, bundle_files, CSVImportError, MultiCSVImporter, MULTIPLO
+from .jobs import enqueue, fail_stale_jobs
+from .mixins import ConditionalGetMixin, SparseQuerysetMixin
+from .pagination import KeysetPagination
+from .resumos import atualizar_resumos, fim_mes, inicio_mes
+from .signals import get_dashboard_cache_key, get_dashboard_timeout, invalidate_dashboard
 
 User = get_user_model()
 
@@ -53,7 +73,7 @@ class RegistroView(APIView):
             usuario = serializer.save()
             
             # Gera tokens JWT
-            refresh = RefreshToken.for_user(usuario)
+            refresh = UsuarioRefreshToken.for_user(usuario)
             
             return Response({
                 'message': 'Usuário criado com sucesso',
@@ -90,13 +110,13 @@ class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={'request': request})
         
         if serializer.is_valid():
             user = serializer.validated_data['user']
             
             # Gera tokens JWT
-            refresh = RefreshToken.for_user(user)
+            refresh = UsuarioRefreshToken.for_user(user)
             
             return Response({
                 'message': 'Login realizado com sucesso',
@@ -134,7 +154,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data.get('refresh')
-            token = RefreshToken(refresh_token)
+            token = UsuarioRefreshToken(refresh_token)
             token.blacklist()
             
             return Response({
@@ -146,6 +166,22 @@ class LogoutView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class RefreshView(TokenRefreshView):
+    """
+    API para renovar o access token
+    POST /api/auth/refresh
+    
+    Body:
+    {
+        "refresh": "refresh_token_aqui"
+    }
+    
+    Retorna um novo access e um novo refresh; o refresh usado é revogado
+    """
+    
+    serializer_class = RefreshSerializer
+
+
 class MeView(APIView):
     """
     API para obter dados do usuário logado
@@ -155,11 +191,11 @@ class MeView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        serializer = UsuarioSerializer(request.user)
+        serializer = UsuarioSerializer(get_usuario(request.user))
         return Response(serializer.data)
 
 
-class UsuarioListCreateView(generics.ListCreateAPIView):
+class UsuarioListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar usuários (apenas admin)
     GET/POST /api/usuarios
@@ -180,7 +216,7 @@ class UsuarioListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class UsuarioDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UsuarioDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de usuário
     GET/PUT/PATCH/DELETE /api/usuarios/<id>
@@ -191,7 +227,7 @@ class UsuarioDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ObraListCreateView(generics.ListCreateAPIView):
+class ObraListCreateView(SparseQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar obras
     GET/POST /api/obras
@@ -200,9 +236,10 @@ class ObraListCreateView(generics.ListCreateAPIView):
     queryset = Obra.objects.all()
     serializer_class = ObraSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_dependencies = ['responsavel__updated_at']
 
 
-class ObraDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ObraDetailView(SparseQuerysetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de obra
     GET/PUT/PATCH/DELETE /api/obras/<id>
@@ -211,11 +248,12 @@ class ObraDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Obra.objects.all()
     serializer_class = ObraSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_dependencies = ['responsavel__updated_at']
 
 
 # ========== EQUIPAMENTOS ==========
 
-class EquipamentoListCreateView(generics.ListCreateAPIView):
+class EquipamentoListCreateView(SparseQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar equipamentos
     GET/POST /api/equipamentos
@@ -224,6 +262,7 @@ class EquipamentoListCreateView(generics.ListCreateAPIView):
     queryset = Equipamento.objects.all()
     serializer_class = EquipamentoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_dependencies = ['obra__updated_at', 'motorista_atual__updated_at']
     
     def get_queryset(self):
         queryset = Equipamento.objects.all()
@@ -243,7 +282,7 @@ class EquipamentoListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class EquipamentoDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EquipamentoDetailView(SparseQuerysetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de equipamento
     GET/PUT/PATCH/DELETE /api/equipamentos/<id>
@@ -252,11 +291,12 @@ class EquipamentoDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Equipamento.objects.all()
     serializer_class = EquipamentoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_dependencies = ['obra__updated_at', 'motorista_atual__updated_at']
 
 
 # ========== CONTRATOS ==========
 
-class ContratoListCreateView(generics.ListCreateAPIView):
+class ContratoListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar contratos
     GET/POST /api/contratos
@@ -276,7 +316,7 @@ class ContratoListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class ContratoDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ContratoDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de contrato
     GET/PUT/PATCH/DELETE /api/contratos/<id>
@@ -289,7 +329,7 @@ class ContratoDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ========== CRITÉRIOS DE MEDIÇÃO ==========
 
-class CriterioMedicaoListCreateView(generics.ListCreateAPIView):
+class CriterioMedicaoListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar critérios de medição
     GET/POST /api/criterios-medicao
@@ -309,7 +349,7 @@ class CriterioMedicaoListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class CriterioMedicaoDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CriterioMedicaoDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de critério de medição
     GET/PUT/PATCH/DELETE /api/criterios-medicao/<id>
@@ -322,7 +362,7 @@ class CriterioMedicaoDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ========== CATEGORIAS DE ATIVIDADES ==========
 
-class CategoriaAtividadeListCreateView(generics.ListCreateAPIView):
+class CategoriaAtividadeListCreateView(SparseQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar categorias de atividades
     GET/POST /api/categorias-atividades
@@ -333,7 +373,7 @@ class CategoriaAtividadeListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class CategoriaAtividadeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoriaAtividadeDetailView(SparseQuerysetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de categoria de atividade
     GET/PUT/PATCH/DELETE /api/categorias-atividades/<id>
@@ -346,7 +386,7 @@ class CategoriaAtividadeDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ========== ATIVIDADES ==========
 
-class AtividadeListCreateView(generics.ListCreateAPIView):
+class AtividadeListCreateView(SparseQuerysetMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar atividades
     GET/POST /api/atividades
@@ -355,6 +395,7 @@ class AtividadeListCreateView(generics.ListCreateAPIView):
     queryset = Atividade.objects.all()
     serializer_class = AtividadeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_dependencies = ['obra__updated_at', 'categoria__updated_at']
     
     def get_queryset(self):
         queryset = Atividade.objects.all()
@@ -373,7 +414,7 @@ class AtividadeListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class AtividadeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AtividadeDetailView(SparseQuerysetMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de atividade
     GET/PUT/PATCH/DELETE /api/atividades/<id>
@@ -382,11 +423,12 @@ class AtividadeDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Atividade.objects.all()
     serializer_class = AtividadeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_dependencies = ['obra__updated_at', 'categoria__updated_at']
 
 
 # ========== REGISTROS DE EQUIPAMENTOS ==========
 
-class RegistroEquipamentoListCreateView(generics.ListCreateAPIView):
+class RegistroEquipamentoListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar registros de equipamentos
     GET/POST /api/registros-equipamentos
@@ -395,14 +437,28 @@ class RegistroEquipamentoListCreateView(generics.ListCreateAPIView):
     queryset = RegistroEquipamento.objects.all()
     serializer_class = RegistroEquipamentoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    
+    # Ordenações aceitas em ?ordenar= (o modo cursor usa sempre a data e
+    # recusa ?ordenar= com 400)
+    ORDENACOES = {
+        'horas': 'duracao',
+        '-horas': '-duracao',
+        'horimetro': 'horimetro_calculado',
+        '-horimetro': '-horimetro_calculado',
+    }
     
     def get_queryset(self):
-        queryset = RegistroEquipamento.objects.all()
+        # Horas e horímetro trabalhados calculados no banco
+        queryset = RegistroEquipamento.objects.com_totais()
         
         equipamento_id = self.request.query_params.get('equipamento', None)
         motorista_id = self.request.query_params.get('motorista', None)
         data = self.request.query_params.get('data', None)
         validado = self.request.query_params.get('validado', None)
+        min_horas = self.request.query_params.get('min_horas', None)
+        max_horas = self.request.query_params.get('max_horas', None)
+        ordenar = self.request.query_params.get('ordenar', None)
         
         if equipamento_id:
             queryset = queryset.filter(equipamento_id=equipamento_id)
@@ -412,11 +468,27 @@ class RegistroEquipamentoListCreateView(generics.ListCreateAPIView):
             queryset = queryset.filter(data=data)
         if validado is not None:
             queryset = queryset.filter(validado=(validado.lower() == 'true'))
+        if min_horas:
+            queryset = queryset.filter(duracao__gte=self.parse_horas('min_horas', min_horas))
+        if max_horas:
+            queryset = queryset.filter(duracao__lte=self.parse_horas('max_horas', max_horas))
+        if ordenar and self.paginator.use_keyset(self.request):
+            raise ValidationError({'ordenar': 'Não disponível com paginacao=cursor, que ordena sempre por data'})
+        if ordenar in self.ORDENACOES:
+            queryset = queryset.order_by(self.ORDENACOES[ordenar], '-data', '-created_at')
         
         return queryset
+    
+    def parse_horas(self, param, value):
+        from datetime import timedelta
+        try:
+            return timedelta(hours=float(value.replace(',', '.')))
+        except (ValueError, OverflowError):
+            # OverflowError: inf, 1e999 ou mais horas do que um timedelta comporta
+            raise ValidationError({param: 'Informe um número de horas válido'})
 
 
-class RegistroEquipamentoDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RegistroEquipamentoDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de registro de equipamento
     GET/PUT/PATCH/DELETE /api/registros-equipamentos/<id>
@@ -446,7 +518,7 @@ class ValidarRegistroEquipamentoView(APIView):
                 }, status=status.HTTP_403_FORBIDDEN)
             
             registro.validado = True
-            registro.validado_por = request.user
+            registro.validado_por_id = request.user.pk
             registro.data_validacao = timezone.now()
             registro.save()
             
@@ -459,20 +531,151 @@ class ValidarRegistroEquipamentoView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
+class ValidarLoteView(APIView):
+    """
+    Base para validação em lote: um único UPDATE para todos os registros
+    pendentes que casam com `ids` ou com os filtros enviados no corpo
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    model = None
+    # Limite de `ids` por requisição (parâmetros de uma consulta IN)
+    max_ids = 1000
+    # Filtro do corpo da requisição -> lookup do ORM
+    filtros = {}
+    
+    def post(self, request):
+        from datetime import datetime
+        
+        # Verifica se o usuário pode validar (encarregado ou admin)
+        if not (request.user.is_encarregado or request.user.is_admin):
+            return Response({
+                'error': 'Apenas encarregados e admins podem validar registros'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        if not isinstance(request.data, Mapping):
+            return Response({
+                'error': 'Envie um objeto JSON com ids ou filtros'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        ids = request.data.get('ids')
+        queryset = self.model.objects.order_by()
+        
+        if ids is not None:
+            if not isinstance(ids, list):
+                return Response({
+                    'error': 'ids deve ser uma lista de IDs'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = {int(pk) for pk in ids}
+            except (TypeError, ValueError):
+                return Response({
+                    'error': 'ids deve conter apenas números'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if len(ids) > self.max_ids:
+                return Response({
+                    'error': f'Envie no máximo {self.max_ids} ids por vez ou use os filtros'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(pk__in=ids)
+        
+        criterios = {
+            lookup: request.data[campo]
+            for campo, lookup in self.filtros.items()
+            if request.data.get(campo) not in (None, '')
+        }
+        if ids is None and not criterios:
+            return Response({
+                'error': f'Informe ids ou ao menos um filtro: {", ".join(self.filtros)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            for lookup, value in criterios.items():
+                if lookup.startswith('data'):
+                    value = datetime.strptime(value, '%Y-%m-%d').date()
+                queryset = queryset.filter(**{lookup: value})
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'Filtro inválido. Datas no formato YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # O instante da validação identifica depois as linhas alteradas por este UPDATE
+        agora = timezone.now()
+        resposta = {}
+        with transaction.atomic():
+            if ids is not None:
+                # Trava as linhas pedidas: o relatório abaixo e o UPDATE veem o mesmo estado
+                list(queryset.select_for_update().values_list('pk', flat=True))
+            validados = queryset.filter(validado=False).update(**self.campos_validacao(request.user, agora))
+            if validados:
+                # UPDATE em massa não dispara post_save
+                self.after_update(queryset.filter(validado=True, updated_at=agora))
+            if ids is not None:
+                encontrados = dict(queryset.values_list('pk', 'updated_at'))
+                resposta['ids'] = sorted(pk for pk, updated_at in encontrados.items() if updated_at == agora)
+                resposta['ja_validados'] = len(encontrados) - validados
+                resposta['nao_encontrados'] = sorted(ids - encontrados.keys())
+        
+        return Response({'validados': validados, **resposta})
+    
+    def campos_validacao(self, user, agora):
+        return {
+            'validado': True,
+            'validado_por_id': user.pk,
+            'updated_at': agora,
+        }
+    
+    def after_update(self, validados):
+        invalidate_dashboard()
+
+
+class ValidarRegistroEquipamentoLoteView(ValidarLoteView):
+    """
+    API para validar vários registros de equipamentos de uma vez
+    POST /api/registros-equipamentos/validar-lote
+    
+    Body (JSON): {"ids": [1, 2, 3]} ou filtros: equipamento, motorista,
+    obra, data, data_inicio, data_fim (YYYY-MM-DD)
+    """
+    
+    model = RegistroEquipamento
+    filtros = {
+        'equipamento': 'equipamento_id',
+        'motorista': 'motorista_id',
+        'obra': 'equipamento__obra_id',
+        'data': 'data',
+        'data_inicio': 'data__gte',
+        'data_fim': 'data__lte',
+    }
+    
+    def campos_validacao(self, user, agora):
+        campos = super().campos_validacao(user, agora)
+        campos['data_validacao'] = agora
+        return campos
+    
+    def after_update(self, validados):
+        super().after_update(validados)
+        atualizar_resumos(validados.values_list('equipamento_id', 'data').distinct())
+
+
 # ========== REGISTROS DE MÃO DE OBRA ==========
 
-class RegistroMaoObraListCreateView(generics.ListCreateAPIView):
+class RegistroMaoObraListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar registros de mão de obra
     GET/POST /api/registros-mao-obra
     """
     
-    queryset = RegistroMaoObra.objects.all()
+    queryset = RegistroMaoObra.objects.select_related('apontador', 'obra').prefetch_related(
+        'funcionarios_presentes',
+        Prefetch('servicos', queryset=ServicoExecutado.objects.select_related('atividade'))
+    )
     serializer_class = RegistroMaoObraSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        queryset = RegistroMaoObra.objects.all()
+        queryset = super().get_queryset()
         
         obra_id = self.request.query_params.get('obra', None)
         apontador_id = self.request.query_params.get('apontador', None)
@@ -491,13 +694,13 @@ class RegistroMaoObraListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class RegistroMaoObraDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RegistroMaoObraDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de registro de mão de obra
     GET/PUT/PATCH/DELETE /api/registros-mao-obra/<id>
     """
     
-    queryset = RegistroMaoObra.objects.all()
+    queryset = RegistroMaoObraListCreateView.queryset
     serializer_class = RegistroMaoObraSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -521,7 +724,7 @@ class ValidarRegistroMaoObraView(APIView):
                 }, status=status.HTTP_403_FORBIDDEN)
             
             registro.validado = True
-            registro.validado_por = request.user
+            registro.validado_por_id = request.user.pk
             registro.save()
             
             serializer = RegistroMaoObraSerializer(registro)
@@ -533,9 +736,225 @@ class ValidarRegistroMaoObraView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
+class ValidarRegistroMaoObraLoteView(ValidarLoteView):
+    """
+    API para validar vários registros de mão de obra de uma vez
+    POST /api/registros-mao-obra/validar-lote
+    
+    Body (JSON): {"ids": [1, 2, 3]} ou filtros: obra, apontador, data,
+    data_inicio, data_fim (YYYY-MM-DD)
+    """
+    
+    model = RegistroMaoObra
+    filtros = {
+        'obra': 'obra_id',
+        'apontador': 'apontador_id',
+        'data': 'data',
+        'data_inicio': 'data__gte',
+        'data_fim': 'data__lte',
+    }
+
+
+# ========== FILA DE VALIDAÇÃO ==========
+
+def obras_do_encarregado(user):
+    """Obras em que o encarregado é responsável ou tem atividades ou diários"""
+    return Obra.objects.filter(
+        Q(responsavel_id=user.pk)
+        | Q(atividades_equipe__encarregado_id=user.pk)
+        | Q(diarios__encarregado_id=user.pk)
+    )
+
+
+class FilaValidacaoView(APIView):
+    """
+    Fila de registros pendentes de validação (equipamentos e mão de obra)
+    GET /api/validacoes/pendentes
+    
+    Query params opcionais:
+    - obra: ID da obra
+    - since: data/hora ISO 8601 (valor de `sincronizado_em` da chamada
+      anterior); retorna só o que mudou desde então, e em `removidos` os
+      registros validados ou excluídos. `sincronizado_em` fica
+      FILA_VALIDACAO_SOBREPOSICAO segundos antes da leitura, para cobrir
+      transações que commitam depois dela: itens podem se repetir entre
+      sincronizações e o cliente deduplica por (tipo, id)
+    - limite: itens por página (padrão 200, máximo 1000); quando há mais,
+      `proximo` traz a URL da página seguinte
+    
+    Encarregados veem as obras em que são responsáveis ou têm atividades
+    ou diários; admins veem todas.
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    limite_padrao = 200
+    limite_maximo = 1000
+    
+    def get(self, request):
+        import re
+        from datetime import timedelta
+        from django.utils.dateparse import parse_datetime
+        
+        user = request.user
+        if not (user.is_encarregado or user.is_admin):
+            return Response({
+                'error': 'Apenas encarregados e admins podem validar registros'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        since = request.query_params.get('since', None)
+        if since:
+            # Um '+' do fuso não codificado na URL chega como espaço
+            try:
+                since = parse_datetime(re.sub(r' (\d{2}:?\d{2})$', r'+\1', since))
+            except ValueError:
+                # Bem formado, mas impossível (ex.: mês 13)
+                since = None
+            if since is None:
+                return Response({
+                    'error': 'since inválido. Use data/hora ISO 8601'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            # Exclusões mais antigas que a retenção já foram descartadas:
+            # o cliente recebe a fila completa (sem `removidos`)
+            retencao = getattr(settings, 'FILA_VALIDACAO_RETENCAO_DIAS', 30)
+            if since < timezone.now() - timedelta(days=retencao):
+                since = None
+        
+        try:
+            limite = min(int(request.query_params.get('limite', self.limite_padrao)), self.limite_maximo)
+            if limite < 1:
+                raise ValueError
+        except ValueError:
+            return Response({
+                'error': 'limite deve ser um inteiro positivo'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        cursor = request.query_params.get('cursor', None)
+        if cursor:
+            try:
+                sincronizado_em, posicao = self.decode_cursor(cursor)
+            except (TypeError, ValueError):
+                return Response({
+                    'error': 'Cursor inválido'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            # Recua a marca do início da leitura: uma linha com updated_at
+            # anterior a ela pode só ficar visível depois (commit atrasado)
+            sobreposicao = getattr(settings, 'FILA_VALIDACAO_SOBREPOSICAO', 60)
+            sincronizado_em, posicao = timezone.now() - timedelta(seconds=sobreposicao), None
+        
+        obras = Obra.objects.all() if user.is_admin else obras_do_encarregado(user)
+        obra_id = request.query_params.get('obra', None)
+        if obra_id:
+            try:
+                obras = obras.filter(id=int(obra_id))
+            except ValueError:
+                return Response({
+                    'error': 'obra deve ser um número'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        obras = obras.order_by().values('id').distinct()
+        
+        equipamentos = RegistroEquipamento.objects.order_by().filter(equipamento__obra__in=obras)
+        mao_obra = RegistroMaoObra.objects.order_by().filter(obra__in=obras)
+        if since:
+            equipamentos = equipamentos.filter(updated_at__gt=since)
+            mao_obra = mao_obra.filter(updated_at__gt=since)
+        
+        # Cada tabela contribui com até limite + 1 itens na ordem da fila
+        filas = {
+            'equipamento': equipamentos.filter(validado=False).values(
+                'id', 'data', 'updated_at',
+                obra_id=F('equipamento__obra_id'),
+                obra_nome=F('equipamento__obra__nome'),
+                titulo=F('equipamento__nome'),
+                responsavel=F('motorista__nome'),
+            ),
+            'mao_obra': mao_obra.filter(validado=False).values(
+                'id', 'data', 'obra_id', 'updated_at',
+                obra_nome=F('obra__nome'),
+                titulo=F('local'),
+                responsavel=F('apontador__nome'),
+            ),
+        }
+        pendentes = []
+        try:
+            for tipo, fila in filas.items():
+                if posicao:
+                    fila = fila.filter(self.depois_de(posicao, tipo))
+                pendentes += [
+                    {'tipo': tipo, **item}
+                    for item in fila.order_by('data', 'updated_at', 'id')[:limite + 1]
+                ]
+        except (DjangoValidationError, TypeError, ValueError):
+            return Response({
+                'error': 'Cursor inválido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        pendentes.sort(key=lambda item: (item['data'], item['updated_at'], item['tipo'], item['id']))
+        
+        proximo = None
+        if len(pendentes) > limite:
+            pendentes = pendentes[:limite]
+            proximo = replace_query_param(
+                request.build_absolute_uri(), 'cursor', self.encode_cursor(sincronizado_em, pendentes[-1])
+            )
+        
+        resposta = {
+            'sincronizado_em': sincronizado_em,
+            'pendentes': pendentes,
+            'proximo': proximo,
+        }
+        if since and not cursor:
+            # Itens que saíram da fila desde a última sincronização
+            resposta['removidos'] = [
+                {'tipo': 'equipamento', 'id': pk}
+                for pk in equipamentos.filter(validado=True).values_list('id', flat=True)
+            ] + [
+                {'tipo': 'mao_obra', 'id': pk}
+                for pk in mao_obra.filter(validado=True).values_list('id', flat=True)
+            ] + [
+                {'tipo': tipo, 'id': pk}
+                for tipo, pk in RegistroRemovido.objects.filter(
+                    removido_em__gt=since, obra_id__in=obras
+                ).order_by('removido_em').values_list('tipo', 'registro_id')
+            ]
+        return Response(resposta)
+    
+    @staticmethod
+    def depois_de(posicao, tipo):
+        """Itens do tipo depois da posição (data, updated_at, tipo, id) na ordem da fila"""
+        data, updated_at, tipo_posicao, pk = posicao
+        condicao = Q(data__gt=data) | Q(data=data, updated_at__gt=updated_at)
+        if tipo > tipo_posicao:
+            condicao |= Q(data=data, updated_at=updated_at)
+        elif tipo == tipo_posicao:
+            condicao |= Q(data=data, updated_at=updated_at, id__gt=pk)
+        return condicao
+    
+    @staticmethod
+    def encode_cursor(sincronizado_em, item):
+        payload = json.dumps([
+            sincronizado_em.isoformat(),
+            [item['data'].isoformat(), item['updated_at'].isoformat(), item['tipo'], item['id']],
+        ], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """Retorna (sincronizado_em da primeira página, posição do último item)"""
+        from django.utils.dateparse import parse_datetime
+        
+        sincronizado_em, posicao = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        sincronizado_em = parse_datetime(sincronizado_em)
+        if sincronizado_em is None or not isinstance(posicao, list) or len(posicao) != 4:
+            raise ValueError('Cursor inválido')
+        return sincronizado_em, posicao
+
+
 # ========== ATIVIDADES DA EQUIPE ==========
 
-class AtividadeEquipeListCreateView(generics.ListCreateAPIView):
+class AtividadeEquipeListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar atividades da equipe
     GET/POST /api/atividades-equipe
@@ -565,7 +984,7 @@ class AtividadeEquipeListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class AtividadeEquipeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AtividadeEquipeDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de atividade da equipe
     GET/PUT/PATCH/DELETE /api/atividades-equipe/<id>
@@ -578,18 +997,29 @@ class AtividadeEquipeDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ========== DIÁRIOS DE OBRA ==========
 
-class DiarioObraListCreateView(generics.ListCreateAPIView):
+class DiarioObraListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     API para listar e criar diários de obra (RDO)
     GET/POST /api/diarios-obra
     """
     
-    queryset = DiarioObra.objects.all()
+    # Carrega toda a árvore do RDO (atividades e equipamentos aninhados) em
+    # um número fixo de consultas, independente do tamanho da página
+    queryset = DiarioObra.objects.select_related('encarregado', 'obra').prefetch_related(
+        Prefetch(
+            'atividades',
+            queryset=AtividadeEquipe.objects.select_related('encarregado', 'obra').prefetch_related('funcionarios')
+        ),
+        Prefetch(
+            'equipamentos',
+            queryset=RegistroEquipamento.objects.select_related('equipamento', 'motorista', 'apontador')
+        )
+    )
     serializer_class = DiarioObraSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        queryset = DiarioObra.objects.all()
+        queryset = super().get_queryset()
         
         obra_id = self.request.query_params.get('obra', None)
         encarregado_id = self.request.query_params.get('encarregado', None)
@@ -605,13 +1035,13 @@ class DiarioObraListCreateView(generics.ListCreateAPIView):
         return queryset
 
 
-class DiarioObraDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DiarioObraDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     API para detalhes, edição e exclusão de diário de obra
     GET/PUT/PATCH/DELETE /api/diarios-obra/<id>
     """
     
-    queryset = DiarioObra.objects.all()
+    queryset = DiarioObraListCreateView.queryset
     serializer_class = DiarioObraSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -629,63 +1059,158 @@ class DashboardStatsView(APIView):
     def get(self, request):
         user = request.user
         
+        cache_key = get_dashboard_cache_key(user)
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = self.get_stats(user)
+            cache.set(cache_key, stats, get_dashboard_timeout())
+        
+        return Response(stats)
+    
+    def get_stats(self, user):
+        """Uma consulta com agregados condicionais por tabela"""
+        hoje = timezone.now().date()
+        
         # Estatísticas baseadas no tipo de usuário
         stats = {}
         
         if user.is_admin:
+            obras = Obra.objects.aggregate(
+                total=Count('id'),
+                ativas=Count('id', filter=Q(status='em_andamento'))
+            )
+            equipamentos = Equipamento.objects.aggregate(
+                total=Count('id'),
+                ativos=Count('id', filter=Q(status='ativo'))
+            )
             stats = {
-                'total_obras': Obra.objects.count(),
-                'obras_ativas': Obra.objects.filter(status='em_andamento').count(),
-                'total_equipamentos': Equipamento.objects.count(),
-                'equipamentos_ativos': Equipamento.objects.filter(status='ativo').count(),
+                'total_obras': obras['total'],
+                'obras_ativas': obras['ativas'],
+                'total_equipamentos': equipamentos['total'],
+                'equipamentos_ativos': equipamentos['ativos'],
                 'total_usuarios': Usuario.objects.count(),
                 'total_contratos': Contrato.objects.filter(ativo=True).count(),
             }
         
         elif user.is_apontador:
-            stats = {
-                'registros_hoje': RegistroMaoObra.objects.filter(
-                    apontador=user,
-                    data=timezone.now().date()
-                ).count(),
-                'registros_pendentes': RegistroMaoObra.objects.filter(
-                    apontador=user,
-                    validado=False
-                ).count(),
-                'total_registros': RegistroMaoObra.objects.filter(apontador=user).count(),
-            }
+            stats = RegistroMaoObra.objects.filter(apontador_id=user.pk).aggregate(
+                registros_hoje=Count('id', filter=Q(data=hoje)),
+                registros_pendentes=Count('id', filter=Q(validado=False)),
+                total_registros=Count('id'),
+            )
         
         elif user.is_encarregado:
-            stats = {
-                'atividades_hoje': AtividadeEquipe.objects.filter(
-                    encarregado=user,
-                    data=timezone.now().date()
-                ).count(),
-                'atividades_pendentes': AtividadeEquipe.objects.filter(
-                    encarregado=user,
-                    status='planejada'
-                ).count(),
-                'diarios_criados': DiarioObra.objects.filter(encarregado=user).count(),
-                'registros_validar': RegistroMaoObra.objects.filter(
-                    validado=False
-                ).count(),
-            }
+            stats = AtividadeEquipe.objects.filter(encarregado_id=user.pk).aggregate(
+                atividades_hoje=Count('id', filter=Q(data=hoje)),
+                atividades_pendentes=Count('id', filter=Q(status='planejada')),
+            )
+            stats['diarios_criados'] = DiarioObra.objects.filter(encarregado_id=user.pk).count()
+            # Pendentes das obras do encarregado (mesmo escopo da fila de validação)
+            stats['registros_validar'] = RegistroMaoObra.objects.filter(
+                validado=False, obra__in=obras_do_encarregado(user).order_by().values('id').distinct()
+            ).count()
         
         elif user.is_motorista:
-            stats = {
-                'registros_hoje': RegistroEquipamento.objects.filter(
-                    motorista=user,
-                    data=timezone.now().date()
-                ).count(),
-                'registros_pendentes': RegistroEquipamento.objects.filter(
-                    motorista=user,
-                    validado=False
-                ).count(),
-                'total_registros': RegistroEquipamento.objects.filter(motorista=user).count(),
-                'equipamento_atual': user.equipamentos_operando.first().nome if user.equipamentos_operando.first() else None,
-            }
+            stats = RegistroEquipamento.objects.filter(motorista_id=user.pk).aggregate(
+                registros_hoje=Count('id', filter=Q(data=hoje)),
+                registros_pendentes=Count('id', filter=Q(validado=False)),
+                total_registros=Count('id'),
+            )
+            stats['equipamento_atual'] = Equipamento.objects.filter(
+                motorista_atual_id=user.pk
+            ).values_list('nome', flat=True).first()
         
-        return Response(stats)
+        return stats
+
+
+# ========== RESUMO DE EQUIPAMENTOS ==========
+
+class ResumoEquipamentosView(APIView):
+    """
+    API de utilização da frota, lida dos consolidados diário e mensal
+    GET /api/resumos-equipamentos
+    
+    Query params opcionais:
+    - obra: ID da obra
+    - equipamento: ID do equipamento
+    - data_inicio / data_fim: período (formato: YYYY-MM-DD)
+    - agrupar: equipamento (padrão), obra, dia ou mes
+    
+    Quando o período cobre meses inteiros (ou não é informado) e o
+    agrupamento não é por dia, os totais vêm do consolidado mensal.
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    AGRUPAMENTOS = {
+        'equipamento': ['equipamento_id', 'equipamento__nome'],
+        'obra': ['obra_id', 'obra__nome'],
+        'dia': ['data'],
+        'mes': ['mes'],
+    }
+    
+    def get(self, request):
+        from datetime import datetime
+        
+        agrupar = request.query_params.get('agrupar', 'equipamento')
+        if agrupar not in self.AGRUPAMENTOS:
+            return Response({
+                'error': f'Agrupamento inválido. Opções: {", ".join(self.AGRUPAMENTOS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        obra_id = request.query_params.get('obra', None)
+        equipamento_id = request.query_params.get('equipamento', None)
+        
+        try:
+            data_inicio = request.query_params.get('data_inicio', None)
+            data_fim = request.query_params.get('data_fim', None)
+            if data_inicio:
+                data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+            if data_fim:
+                data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({
+                'error': 'Data inválida. Use o formato YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        meses_inteiros = (
+            agrupar != 'dia'
+            and (not data_inicio or data_inicio == inicio_mes(data_inicio))
+            and (not data_fim or data_fim == fim_mes(data_fim))
+        )
+        if meses_inteiros:
+            resumos = ResumoMensalEquipamento.objects.order_by()
+            campo_data = 'mes'
+            dias = Sum('dias')
+        else:
+            resumos = ResumoDiarioEquipamento.objects.order_by()
+            campo_data = 'data'
+            dias = Count('id')
+            if agrupar == 'mes':
+                resumos = resumos.annotate(mes=TruncMonth('data'))
+        
+        if data_inicio:
+            resumos = resumos.filter(**{f'{campo_data}__gte': data_inicio})
+        if data_fim:
+            resumos = resumos.filter(**{f'{campo_data}__lte': data_fim})
+        if obra_id:
+            resumos = resumos.filter(obra_id=obra_id)
+        if equipamento_id:
+            resumos = resumos.filter(equipamento_id=equipamento_id)
+        
+        campos = self.AGRUPAMENTOS[agrupar]
+        results = resumos.values(*campos).annotate(
+            dias=dias,
+            horas_trabalhadas=Sum('horas_trabalhadas'),
+            horimetro_trabalhado=Sum('horimetro_trabalhado'),
+            total_registros=Sum('total_registros'),
+            registros_validados=Sum('registros_validados'),
+        ).order_by(*campos)
+        
+        return Response({
+            'agrupar': agrupar,
+            'results': list(results)
+        })
 
 
 # ========== IMPORTAÇÃO DE CSV ==========
@@ -698,6 +1223,16 @@ class ImportarCSVView(APIView):
     Form-data:
     - tipo: obras, equipamentos, usuarios, atividades, registros_equipamentos, registros_mao_obra, diarios_obra
     - arquivo: arquivo CSV
+    
+    Para importar vários tipos de uma vez, envie em `arquivo` um ZIP ou em
+    `arquivos` vários CSVs, nomeados pelo tipo (ex.: usuarios.csv, obras.csv).
+    Os arquivos são importados na ordem das dependências entre os tipos.
+    
+    Com `dry_run=true` o CSV é apenas validado (campos obrigatórios, formatos e
+    referências), sem gravar nada, e o relatório é devolvido na própria resposta.
+    
+    O arquivo é salvo e processado em segundo plano. A resposta traz o id da
+    importação, cujo progresso é consultado em GET /api/importar-csv/<id>.
     """
     
     permission_classes = [permissions.IsAuthenticated]
@@ -712,6 +1247,15 @@ class ImportarCSVView(APIView):
         
         tipo = request.data.get('tipo')
         arquivo = request.FILES.get('arquivo')
+        arquivos = request.FILES.getlist('arquivos')
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('true', '1')
+        
+        if arquivos or (arquivo and arquivo.name.lower().endswith('.zip')):
+            if dry_run:
+                return Response({
+                    'error': 'Validação (dry_run) disponível apenas para um arquivo CSV por vez'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return self.post_multiplo(request, arquivo, arquivos)
         
         if not tipo:
             return Response({
@@ -730,31 +1274,98 @@ class ImportarCSVView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Obtém o importador correto
+            # Valida o tipo antes de aceitar o arquivo
             ImporterClass = get_importer(tipo)
-            importer = ImporterClass(arquivo)
-            
-            # Executa importação
-            result = importer.import_data()
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if dry_run:
+            try:
+                result = ImporterClass(arquivo, dry_run=True).import_data()
+            except CSVImportError as e:
+                return Response({
+                    'error': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             return Response({
-                'message': f'Importação concluída',
+                'message': 'Validação concluída',
                 'tipo': tipo,
                 'resultado': result
             }, status=status.HTTP_200_OK)
-            
+        
+        job = ImportacaoCSV.objects.create(
+            tipo=tipo,
+            arquivo=arquivo,
+            tamanho_arquivo=arquivo.size,
+            usuario_id=request.user.pk
+        )
+        return self.iniciar(job)
+    
+    def post_multiplo(self, request, arquivo, arquivos):
+        """Importação de vários tipos: ZIP ou vários CSVs (reunidos em um ZIP)"""
+        try:
+            if arquivos:
+                arquivo = File(bundle_files(arquivos), name='importacao.zip')
+            entries = MultiCSVImporter.inspect(arquivo)
         except CSVImportError as e:
             return Response({
                 'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
-        except ValueError as e:
+        
+        job = ImportacaoCSV.objects.create(
+            tipo=MULTIPLO,
+            arquivo=arquivo,
+            # Tamanho descompactado, para o progresso por bytes lidos
+            tamanho_arquivo=sum(info.file_size for info in entries.values()),
+            usuario_id=request.user.pk
+        )
+        return self.iniciar(job, tipos=sorted(entries))
+    
+    def iniciar(self, job, **extra):
+        """Agenda a importação e responde com o id para acompanhamento"""
+        enqueue(job)
+        
+        return Response({
+            'message': 'Importação iniciada',
+            'tipo': job.tipo,
+            **extra,
+            'importacao': ImportacaoCSVSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportacaoCSVStatusView(APIView):
+    """
+    API para acompanhar uma importação de CSV
+    GET /api/importar-csv/<id>
+    
+    Retorna linhas processadas, erros até o momento e estimativa de término
+    (eta_segundos). Quando status = 'concluida', o campo resultado traz o
+    relatório completo com error_details.
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, pk):
+        if not (request.user.is_admin or request.user.is_encarregado):
             return Response({
-                'error': str(e)
-            }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
+                'error': 'Apenas admins e encarregados podem importar dados'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        # Encarregados só acompanham as próprias importações
+        jobs = ImportacaoCSV.objects.filter(pk=pk)
+        if not request.user.is_admin:
+            jobs = jobs.filter(usuario_id=request.user.pk)
+        
+        fail_stale_jobs(jobs)
+        job = jobs.first()
+        if job is None:
             return Response({
-                'error': f'Erro ao importar dados: {str(e)}'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'error': 'Importação não encontrada'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(ImportacaoCSVSerializer(job).data)
 
 
 class DownloadModeloCSVView(APIView):
@@ -817,6 +1428,13 @@ class DownloadModeloCSVView(APIView):
         return response
 
 
+class Echo:
+    """Pseudo-buffer: o csv.writer escreve e a linha formatada é devolvida"""
+    
+    def write(self, value):
+        return value
+
+
 class ExportarCSVView(APIView):
     """
     API para exportar dados para CSV
@@ -826,144 +1444,174 @@ class ExportarCSVView(APIView):
     - obra: ID da obra para filtrar
     - data_inicio: Data de início (formato: YYYY-MM-DD)
     - data_fim: Data de fim (formato: YYYY-MM-DD)
+    
+    O CSV é gerado linha a linha (StreamingHttpResponse) a partir de
+    querysets lidos em blocos, então a memória não cresce com o volume.
     """
     
     permission_classes = [permissions.IsAuthenticated]
     
+    # Linhas buscadas do banco por vez
+    chunk_size = 2000
+    
+    EXPORTS = {
+        'obras': 'export_obras',
+        'equipamentos': 'export_equipamentos',
+        'registros_equipamentos': 'export_registros_equipamentos',
+        'registros_mao_obra': 'export_registros_mao_obra',
+        'diarios_obra': 'export_diarios_obra',
+    }
+    
     def get(self, request, tipo):
         import csv
-        from django.http import HttpResponse
+        from django.http import StreamingHttpResponse
         from datetime import datetime
         
+        if tipo not in self.EXPORTS:
+            return Response({
+                'error': 'Tipo de exportação inválido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         # Filtros
-        obra_id = request.query_params.get('obra')
+        self.obra_id = request.query_params.get('obra')
         data_inicio = request.query_params.get('data_inicio')
         data_fim = request.query_params.get('data_fim')
+        self.data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date() if data_inicio else None
+        self.data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date() if data_fim else None
         
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        header, rows = getattr(self, self.EXPORTS[tipo])()
+        writer = csv.writer(Echo())
+        
+        def stream():
+            # Adiciona BOM UTF-8 para Excel
+            yield '\ufeff'
+            yield writer.writerow(header)
+            for row in rows:
+                yield writer.writerow(row)
+        
+        response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
         response['Content-Disposition'] = f'attachment; filename="export_{tipo}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+        return response
+    
+    def filter_periodo(self, queryset):
+        if self.data_inicio:
+            queryset = queryset.filter(data__gte=self.data_inicio)
+        if self.data_fim:
+            queryset = queryset.filter(data__lte=self.data_fim)
+        return queryset
+    
+    def export_obras(self):
+        header = ['Código', 'Nome', 'Local', 'KM Inicial', 'KM Final', 'Data Início', 'Data Fim', 'Responsável', 'Status']
         
-        # Adiciona BOM UTF-8 para Excel
-        response.write('\ufeff')
+        obras = Obra.objects.all()
+        if self.obra_id:
+            obras = obras.filter(id=self.obra_id)
         
-        writer = csv.writer(response)
+        rows = (
+            [
+                codigo,
+                nome,
+                local,
+                km_inicial,
+                km_final,
+                data_inicio.strftime('%d/%m/%Y'),
+                data_prevista_fim.strftime('%d/%m/%Y'),
+                responsavel_nome or '',
+                status_obra
+            ]
+            for codigo, nome, local, km_inicial, km_final, data_inicio, data_prevista_fim, responsavel_nome, status_obra
+            in obras.values_list(
+                'codigo', 'nome', 'local', 'km_inicial', 'km_final',
+                'data_inicio', 'data_prevista_fim', 'responsavel__nome', 'status'
+            ).iterator(chunk_size=self.chunk_size)
+        )
+        return header, rows
+    
+    def export_equipamentos(self):
+        header = ['Nome', 'Tipo', 'Modelo', 'Placa', 'Fabricante', 'Ano', 'Horímetro', 'Status', 'Obra']
         
-        if tipo == 'obras':
-            writer.writerow(['Código', 'Nome', 'Local', 'KM Inicial', 'KM Final', 'Data Início', 'Data Fim', 'Responsável', 'Status'])
-            
-            obras = Obra.objects.all()
-            if obra_id:
-                obras = obras.filter(id=obra_id)
-            
-            for obra in obras:
-                writer.writerow([
-                    obra.codigo,
-                    obra.nome,
-                    obra.local,
-                    obra.km_inicial,
-                    obra.km_final,
-                    obra.data_inicio.strftime('%d/%m/%Y'),
-                    obra.data_prevista_fim.strftime('%d/%m/%Y'),
-                    obra.responsavel.nome if obra.responsavel else '',
-                    obra.status
-                ])
-        
-        elif tipo == 'equipamentos':
-            writer.writerow(['Nome', 'Tipo', 'Modelo', 'Placa', 'Fabricante', 'Ano', 'Horímetro', 'Status', 'Obra'])
-            
-            equipamentos = Equipamento.objects.all()
-            if obra_id:
-                equipamentos = equipamentos.filter(obra_id=obra_id)
-            
-            for eq in equipamentos:
-                writer.writerow([
-                    eq.nome,
-                    eq.tipo,
-                    eq.modelo,
-                    eq.placa,
-                    eq.fabricante,
-                    eq.ano,
-                    eq.horimetro_atual,
-                    eq.status,
-                    eq.obra.nome if eq.obra else ''
-                ])
-        
-        elif tipo == 'registros_equipamentos':
-            writer.writerow(['Data', 'Equipamento', 'Motorista', 'Horímetro Inicial', 'Horímetro Final', 'Horas Trabalhadas', 'Atividade', 'Local', 'Validado'])
-            
-            registros = RegistroEquipamento.objects.select_related('equipamento', 'motorista').all()
-            
-            if obra_id:
-                registros = registros.filter(equipamento__obra_id=obra_id)
-            if data_inicio:
-                registros = registros.filter(data__gte=datetime.strptime(data_inicio, '%Y-%m-%d').date())
-            if data_fim:
-                registros = registros.filter(data__lte=datetime.strptime(data_fim, '%Y-%m-%d').date())
-            
-            for reg in registros:
-                writer.writerow([
-                    reg.data.strftime('%d/%m/%Y'),
-                    reg.equipamento.nome,
-                    reg.motorista.nome,
-                    reg.horimetro_inicial,
-                    reg.horimetro_final,
-                    reg.horas_trabalhadas,
-                    reg.atividade_principal,
-                    reg.local,
-                    'Sim' if reg.validado else 'Não'
-                ])
-        
-        elif tipo == 'registros_mao_obra':
-            writer.writerow(['Data', 'Obra', 'Apontador', 'Total Funcionários', 'Hora Início', 'Hora Fim', 'Local', 'Validado'])
-            
-            registros = RegistroMaoObra.objects.select_related('obra', 'apontador').all()
-            
-            if obra_id:
-                registros = registros.filter(obra_id=obra_id)
-            if data_inicio:
-                registros = registros.filter(data__gte=datetime.strptime(data_inicio, '%Y-%m-%d').date())
-            if data_fim:
-                registros = registros.filter(data__lte=datetime.strptime(data_fim, '%Y-%m-%d').date())
-            
-            for reg in registros:
-                writer.writerow([
-                    reg.data.strftime('%d/%m/%Y'),
-                    reg.obra.nome,
-                    reg.apontador.nome,
-                    reg.total_funcionarios,
-                    reg.hora_inicio.strftime('%H:%M'),
-                    reg.hora_fim.strftime('%H:%M'),
-                    reg.local,
-                    'Sim' if reg.validado else 'Não'
-                ])
-        
-        elif tipo == 'diarios_obra':
-            writer.writerow(['Data', 'Obra', 'Encarregado', 'Total Func.', 'Presentes', 'Ativ. Concluídas', 'Condições', 'Observações'])
-            
-            diarios = DiarioObra.objects.select_related('obra', 'encarregado').all()
-            
-            if obra_id:
-                diarios = diarios.filter(obra_id=obra_id)
-            if data_inicio:
-                diarios = diarios.filter(data__gte=datetime.strptime(data_inicio, '%Y-%m-%d').date())
-            if data_fim:
-                diarios = diarios.filter(data__lte=datetime.strptime(data_fim, '%Y-%m-%d').date())
-            
-            for diario in diarios:
-                writer.writerow([
-                    diario.data.strftime('%d/%m/%Y'),
-                    diario.obra.nome,
-                    diario.encarregado.nome,
-                    diario.total_funcionarios,
-                    diario.funcionarios_presentes,
-                    diario.atividades_concluidas,
-                    diario.condicoes_climaticas,
-                    diario.observacoes
-                ])
+        equipamentos = Equipamento.objects.all()
+        if self.obra_id:
+            equipamentos = equipamentos.filter(obra_id=self.obra_id)
         
-        else:
-            return Response({
-                'error': 'Tipo de exportação inválido'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        rows = (
+            [*values[:-1], values[-1] or '']
+            for values in equipamentos.values_list(
+                'nome', 'tipo', 'modelo', 'placa', 'fabricante', 'ano',
+                'horimetro_atual', 'status', 'obra__nome'
+            ).iterator(chunk_size=self.chunk_size)
+        )
+        return header, rows
+    
+    def export_registros_equipamentos(self):
+        header = ['Data', 'Equipamento', 'Motorista', 'Horímetro Inicial', 'Horímetro Final', 'Horas Trabalhadas', 'Atividade', 'Local', 'Validado']
         
-        return response
+        registros = RegistroEquipamento.objects.com_totais()
+        if self.obra_id:
+            registros = registros.filter(equipamento__obra_id=self.obra_id)
+        registros = self.filter_periodo(registros)
+        
+        rows = (
+            [
+                data.strftime('%d/%m/%Y'),
+                equipamento_nome,
+                motorista_nome or '',
+                horimetro_inicial,
+                horimetro_final,
+                duracao.total_seconds() / 3600,
+                atividade_principal,
+                local,
+                'Sim' if validado else 'Não'
+            ]
+            for data, equipamento_nome, motorista_nome, horimetro_inicial, horimetro_final, duracao, atividade_principal, local, validado
+            in registros.values_list(
+                'data', 'equipamento__nome', 'motorista__nome', 'horimetro_inicial',
+                'horimetro_final', 'duracao', 'atividade_principal', 'local', 'validado'
+            ).iterator(chunk_size=self.chunk_size)
+        )
+        return header, rows
+    
+    def export_registros_mao_obra(self):
+        header = ['Data', 'Obra', 'Apontador', 'Total Funcionários', 'Hora Início', 'Hora Fim', 'Local', 'Validado']
+        
+        registros = RegistroMaoObra.objects.all()
+        if self.obra_id:
+            registros = registros.filter(obra_id=self.obra_id)
+        registros = self.filter_periodo(registros)
+        
+        rows = (
+            [
+                data.strftime('%d/%m/%Y'),
+                obra_nome,
+                apontador_nome,
+                total_funcionarios,
+                hora_inicio.strftime('%H:%M'),
+                hora_fim.strftime('%H:%M'),
+                local,
+                'Sim' if validado else 'Não'
+            ]
+            for data, obra_nome, apontador_nome, total_funcionarios, hora_inicio, hora_fim, local, validado
+            in registros.values_list(
+                'data', 'obra__nome', 'apontador__nome', 'total_funcionarios',
+                'hora_inicio', 'hora_fim', 'local', 'validado'
+            ).iterator(chunk_size=self.chunk_size)
+        )
+        return header, rows
+    
+    def export_diarios_obra(self):
+        header = ['Data', 'Obra', 'Encarregado', 'Total Func.', 'Presentes', 'Ativ. Concluídas', 'Condições', 'Observações']
+        
+        diarios = DiarioObra.objects.all()
+        if self.obra_id:
+            diarios = diarios.filter(obra_id=self.obra_id)
+        diarios = self.filter_periodo(diarios)
+        
+        rows = (
+            [data.strftime('%d/%m/%Y'), *values]
+            for data, *values in diarios.values_list(
+                'data', 'obra__nome', 'encarregado__nome', 'total_funcionarios',
+                'funcionarios_presentes', 'atividades_concluidas',
+                'condicoes_climaticas', 'observacoes'
+            ).iterator(chunk_size=self.chunk_size)
+        )
+        return header, rows